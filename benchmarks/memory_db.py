@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from scraper.db import PageFingerprints, _download_key, diff_downloads
+from scraper.models import Anime, AnimeDownload, AnimeImage, AnimeIndexEntry, DownloadPageState
+
+
+class MemoryDatabase:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.anime: Dict[str, Anime] = {}
+        self.ids: Dict[str, int] = {}
+        self.downloads: Dict[int, List[Tuple[int, AnimeDownload]]] = {}
+        self.images: Dict[int, AnimeImage] = {}
+        self.pages: Dict[int, Dict[str, str]] = {}
+        self.state: Dict[str, str] = {}
+        self._next_download_id = 1
+
+    def load_anime_index(self) -> Dict[str, AnimeIndexEntry]:
+        with self._lock:
+            return {
+                slug: AnimeIndexEntry(
+                    id=self.ids[slug], status=anime.status, detail_hash=anime.detail_hash, updated_at=None
+                )
+                for slug, anime in self.anime.items()
+            }
+
+    def load_image_index(self) -> Dict[str, AnimeImage]:
+        with self._lock:
+            slugs = {anime_id: slug for slug, anime_id in self.ids.items()}
+            return {slugs[anime_id]: image for anime_id, image in self.images.items()}
+
+    def upsert_anime(self, anime: Anime) -> int:
+        with self._lock:
+            return self._upsert_anime(anime)
+
+    def _upsert_anime(self, anime: Anime) -> int:
+        self.anime[anime.slug] = anime
+        if anime.slug not in self.ids:
+            self.ids[anime.slug] = len(self.ids) + 1
+        return self.ids[anime.slug]
+
+    def upsert_downloads(self, anime_id: int, downloads: Iterable[AnimeDownload]) -> None:
+        with self._lock:
+            self.downloads[anime_id] = []
+            self._insert(anime_id, downloads)
+
+    def sync_downloads(self, anime_id: int, downloads: Iterable[AnimeDownload]) -> Tuple[int, int]:
+        with self._lock:
+            return self._sync(anime_id, downloads)
+
+    def _sync(self, anime_id: int, downloads: Iterable[AnimeDownload]) -> Tuple[int, int]:
+        existing = self.downloads.get(anime_id, [])
+        rows = [(row_id, *_download_key(item)) for row_id, item in existing]
+        to_insert, to_delete = diff_downloads(rows, downloads)
+        deleted = set(to_delete)
+        self.downloads[anime_id] = [(row_id, item) for row_id, item in existing if row_id not in deleted]
+        self._insert(anime_id, [AnimeDownload(*key) for key in to_insert])
+        return len(to_insert), len(to_delete)
+
+    def _insert(self, anime_id: int, downloads: Iterable[AnimeDownload]) -> None:
+        rows = self.downloads.setdefault(anime_id, [])
+        for item in downloads:
+            rows.append((self._next_download_id, item))
+            self._next_download_id += 1
+
+    def upsert_image(self, anime_id: int, image: AnimeImage) -> None:
+        with self._lock:
+            self.images[anime_id] = image
+
+    def write_batch(
+        self,
+        anime: Sequence[Anime],
+        downloads: Dict[str, List[AnimeDownload]],
+        images: Dict[str, AnimeImage],
+        pages: Optional[Dict[str, PageFingerprints]] = None,
+        replace_downloads: bool = False,
+    ) -> Tuple[Dict[str, int], int, int]:
+        added = removed = 0
+        with self._lock:
+            for item in anime:
+                self._upsert_anime(item)
+            for slug, items in downloads.items():
+                if replace_downloads:
+                    removed += len(self.downloads.get(self.ids[slug], []))
+                    self.downloads[self.ids[slug]] = []
+                    items = [AnimeDownload(*key) for key in dict.fromkeys(map(_download_key, items))]
+                    self._insert(self.ids[slug], items)
+                    added += len(items)
+                    continue
+                counts = self._sync(self.ids[slug], items)
+                added += counts[0]
+                removed += counts[1]
+            for slug, page_fingerprints in (pages or {}).items():
+                self._save_pages(self.ids[slug], page_fingerprints)
+            for slug, image in images.items():
+                if slug in self.ids:
+                    self.images[self.ids[slug]] = image
+            return {slug: self.ids[slug] for slug in self.ids}, added, removed
+
+    def load_download_pages(self, anime_id: int, max_age_seconds: float) -> Dict[str, DownloadPageState]:
+        with self._lock:
+            return {
+                page_url: DownloadPageState(fingerprint=fingerprint, fresh=max_age_seconds > 0)
+                for page_url, fingerprint in self.pages.get(anime_id, {}).items()
+            }
+
+    def load_downloads(self, anime_id: int, source_urls: Sequence[str]) -> List[AnimeDownload]:
+        wanted = set(source_urls)
+        with self._lock:
+            return [item for _, item in self.downloads.get(anime_id, []) if item.source_url in wanted]
+
+    def save_download_pages(self, anime_id: int, pages: PageFingerprints) -> None:
+        with self._lock:
+            self._save_pages(anime_id, pages)
+
+    def _save_pages(self, anime_id: int, pages: PageFingerprints) -> None:
+        fetched, current_urls = pages
+        stored = self.pages.setdefault(anime_id, {})
+        stored.update(fetched)
+        current = set(current_urls)
+        for page_url in [page_url for page_url in stored if page_url not in current]:
+            del stored[page_url]
+
+    def get_state(self, key: str) -> Optional[str]:
+        return self.state.get(key)
+
+    def set_state(self, key: str, value: str) -> None:
+        self.state[key] = value
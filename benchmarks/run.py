@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.memory_db import MemoryDatabase
+from scraper.image_pipeline import save_webp
+from scraper.parser_detail import parse_anime_detail, parse_download_page
+from scraper.parser_list import parse_anime_list
+from scraper.soup import BACKENDS, set_backend
+from scraper.synthetic import (
+    LIST_URL,
+    SyntheticFetcher,
+    SyntheticSite,
+    anime_detail_html,
+    anime_list_html,
+    anime_slugs,
+    anime_url,
+    download_page_html,
+    poster_bytes,
+)
+from scraper.updater import Updater
+from scraper.utils import hash_values
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+DEFAULT_THRESHOLD = 0.35
+MIN_SAMPLE = 0.05
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "quick": {"anime": 500, "episodes": 12, "rows": 60, "updater_anime": 20, "posters": 2},
+    "full": {"anime": 5000, "episodes": 24, "rows": 300, "updater_anime": 100, "posters": 5},
+}
+
+CASE_THRESHOLDS: Dict[str, float] = {"updater_loop": 0.5, "save_webp": 0.5, "hash_values": 0.5}
+
+Case = Callable[[], object]
+
+_CALIBRATION_REGEX = re.compile(r"\d+")
+
+
+def calibration_loop() -> None:
+    counts: Dict[str, int] = {}
+    for index in range(20000):
+        key = _CALIBRATION_REGEX.sub("#", f"episode-{index % 97}-part-{index}")
+        counts[key] = counts.get(key, 0) + 1
+    sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def build_cases(scale: Dict[str, int], workdir: Path) -> Dict[str, Tuple[Case, int]]:
+    # name -> (callable, items processed per call)
+    slugs = anime_slugs(scale["anime"])
+    list_html = anime_list_html(slugs)
+    detail_url = anime_url(slugs[0])
+    detail_html = anime_detail_html(slugs[0], scale["episodes"])
+    page_url = "https://otakudesu.best/batch/bench-batch/"
+    page_html = download_page_html("Bench Batch", scale["rows"])
+    lines = [f"{page_url}|Part 1|MP4|480p|{index} MB|Mega|https://mega.example/{index}" for index in range(scale["rows"])]
+    posters = [poster_bytes(600, 850, seed=index) for index in range(scale["posters"])]
+
+    def run_updater() -> None:
+        site = SyntheticSite(scale["updater_anime"], episodes=4, download_rows=scale["rows"] // 4)
+        db = MemoryDatabase()
+        Updater(db, SyntheticFetcher(site), workdir, process_images=False).full_update(site.anime_urls)
+        Updater(db, SyntheticFetcher(site), workdir, process_images=False).daily_update(site.anime_urls)
+
+    def run_webp() -> None:
+        for index, image_bytes in enumerate(posters):
+            save_webp(image_bytes, workdir / f"poster-{index}.webp")
+
+    return {
+        "parse_anime_list": (lambda: parse_anime_list(list_html, LIST_URL), scale["anime"]),
+        "parse_anime_detail": (lambda: parse_anime_detail(detail_html, detail_url), 1),
+        "parse_download_page": (lambda: parse_download_page(page_html, page_url), scale["rows"]),
+        "hash_values": (lambda: hash_values(lines), len(lines)),
+        "save_webp": (run_webp, len(posters)),
+        "updater_loop": (run_updater, scale["updater_anime"] * 2),
+    }
+
+
+def _timed(func: Case, number: int) -> float:
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        return (time.perf_counter() - started) / number
+    finally:
+        gc.enable()
+
+
+def measure(case: Case, repeat: int) -> Tuple[List[float], float]:
+    number = max(1, int(MIN_SAMPLE / max(_timed(case, 1), 1e-9)))
+    timings, calibration = [], []
+    for _ in range(repeat):
+        calibration.append(_timed(calibration_loop, 1))
+        timings.append(_timed(case, number))
+    return timings, min(calibration)
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: Optional[float]) -> List[str]:
+    regressions = []
+    for name, units in results.items():
+        reference = baseline.get(name)
+        limit = threshold if threshold is not None else CASE_THRESHOLDS.get(name, DEFAULT_THRESHOLD)
+        if reference and units > reference * (1 + limit):
+            regressions.append(f"{name}: {units:.4g} vs baseline {reference:.4g} calibration units")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks on a synthetic otakudesu corpus")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=1,
+        help="Run every case this many times and keep the median (use 3 or more with --save-baseline)",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="html.parser")
+    parser.add_argument("--only", action="append", default=None, help="Run only this case (repeatable)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help=f"Fail when a case is this fraction slower than its baseline (default {DEFAULT_THRESHOLD}, "
+        "looser for the cases in CASE_THRESHOLDS)",
+    )
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    set_backend(args.backend)
+    key = f"{args.scale}/{args.backend}"
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = stored.get(key, {})
+
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(SCALES[args.scale], Path(tmp))
+        for name, (case, items) in cases.items():
+            if args.only and name not in args.only:
+                continue
+            samples = [measure(case, args.repeat) for _ in range(args.rounds)]
+            best = statistics.median(min(timings) for timings, _ in samples)
+            timings = [timing for round_timings, _ in samples for timing in round_timings]
+            results[name] = statistics.median(min(timings) / calibration for timings, calibration in samples)
+            reference = baseline.get(name)
+            delta = f"{(results[name] / reference - 1) * 100:+6.1f}%" if reference else "   new"
+            print(
+                f"{name:<22} best {best * 1000:9.2f} ms  median {statistics.median(timings) * 1000:9.2f} ms  "
+                f"{items / best:12.0f} items/s  {results[name]:9.4g} units  {delta}"
+            )
+
+    if args.save_baseline:
+        stored[key] = {**baseline, **{name: float(f"{units:.4g}") for name, units in results.items()}}
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline {key} written to {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,7 +11,31 @@ CREATE TABLE IF NOT EXISTS anime (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     UNIQUE KEY uniq_anime_slug (slug),
-    UNIQUE KEY uniq_anime_source_url (source_url)
+    UNIQUE KEY uniq_anime_source_url (source_url),
+    KEY idx_anime_updated_at (updated_at)
+);
+
+CREATE TABLE IF NOT EXISTS genre (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    slug VARCHAR(100) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    UNIQUE KEY uniq_genre_slug (slug)
+);
+
+CREATE TABLE IF NOT EXISTS anime_genre (
+    anime_id INT NOT NULL,
+    genre_id INT NOT NULL,
+    PRIMARY KEY (anime_id, genre_id),
+    KEY idx_anime_genre_genre_id (genre_id, anime_id),
+    CONSTRAINT fk_anime_genre_anime_id FOREIGN KEY (anime_id) REFERENCES anime(id) ON DELETE CASCADE,
+    CONSTRAINT fk_anime_genre_genre_id FOREIGN KEY (genre_id) REFERENCES genre(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS download_provider (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    slug VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    UNIQUE KEY uniq_download_provider_slug (slug)
 );
 
 CREATE TABLE IF NOT EXISTS anime_download (
@@ -24,9 +48,16 @@ CREATE TABLE IF NOT EXISTS anime_download (
     size VARCHAR(50) NULL,
     provider VARCHAR(255) NULL,
     url VARCHAR(1024) NOT NULL,
+    size_bytes BIGINT UNSIGNED NULL,
+    resolution_px SMALLINT UNSIGNED NULL,
+    provider_id INT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE KEY uniq_anime_download (anime_id, source_url, format, resolution, provider, url),
-    CONSTRAINT fk_anime_download_anime_id FOREIGN KEY (anime_id) REFERENCES anime(id) ON DELETE CASCADE
+    KEY idx_anime_download_format_size (anime_id, format, size_bytes),
+    KEY idx_anime_download_resolution (anime_id, resolution_px),
+    KEY idx_anime_download_provider (provider_id, anime_id),
+    CONSTRAINT fk_anime_download_anime_id FOREIGN KEY (anime_id) REFERENCES anime(id) ON DELETE CASCADE,
+    CONSTRAINT fk_anime_download_provider_id FOREIGN KEY (provider_id) REFERENCES download_provider(id)
 );
 
 CREATE TABLE IF NOT EXISTS anime_image (
@@ -36,9 +67,11 @@ CREATE TABLE IF NOT EXISTS anime_image (
     local_webp_path VARCHAR(512) NOT NULL,
     width INT NOT NULL,
     height INT NOT NULL,
+    source_digest CHAR(64) NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     UNIQUE KEY uniq_anime_image_anime_id (anime_id),
+    KEY idx_anime_image_updated_at (updated_at),
     CONSTRAINT fk_anime_image_anime_id FOREIGN KEY (anime_id) REFERENCES anime(id) ON DELETE CASCADE
 );
 
@@ -49,3 +82,42 @@ CREATE TABLE IF NOT EXISTS scrape_state (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     UNIQUE KEY uniq_scrape_state_key (state_key)
 );
+
+CREATE TABLE IF NOT EXISTS anime_download_page (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    anime_id INT NOT NULL,
+    page_url VARCHAR(512) NOT NULL,
+    fingerprint CHAR(64) NOT NULL,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_anime_download_page (anime_id, page_url),
+    CONSTRAINT fk_anime_download_page_anime_id FOREIGN KEY (anime_id) REFERENCES anime(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS anime_image_variant (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    anime_id INT NOT NULL,
+    variant VARCHAR(50) NOT NULL,
+    local_webp_path VARCHAR(512) NOT NULL,
+    width INT NOT NULL,
+    height INT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_anime_image_variant (anime_id, variant),
+    CONSTRAINT fk_anime_image_variant_anime_id FOREIGN KEY (anime_id) REFERENCES anime(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS crawl_frontier (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL,
+    url VARCHAR(512) NOT NULL,
+    kind VARCHAR(20) NOT NULL DEFAULT 'anime',
+    priority INT NOT NULL DEFAULT 0,
+    `state` VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    lease_owner VARCHAR(128) NULL,
+    lease_expires_at TIMESTAMP NULL,
+    last_error TEXT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_crawl_frontier_url (run_id, url),
+    KEY idx_crawl_frontier_claim (run_id, `state`, next_attempt_at)
+);
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+
+class HtmlArchive:
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        self._blob_dir = root / "blobs"
+        self._blob_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(root / "index.sqlite3"), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, digest TEXT NOT NULL, fetched_at TEXT NOT NULL)"
+            )
+
+    def _blob_path(self, digest: str) -> Path:
+        return self._blob_dir / digest[:2] / f"{digest}.html.gz"
+
+    def put(self, url: str, html: str) -> str:
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_name(f"{blob_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(gzip.compress(body))
+            os.replace(tmp_path, blob_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pages (url, digest, fetched_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET digest=excluded.digest, fetched_at=excluded.fetched_at",
+                (url, digest, datetime.now(timezone.utc).isoformat()),
+            )
+        return digest
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM pages WHERE url=?", (url,)).fetchone()
+        if not row:
+            return None
+        blob_path = self._blob_path(row[0])
+        if not blob_path.exists():
+            return None
+        return gzip.decompress(blob_path.read_bytes()).decode("utf-8")
+
+    def urls(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM pages ORDER BY url").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from scraper.fetcher import Fetcher
+from scraper.ratelimit import TokenBucket, rate_from_interval
+
+T = TypeVar("T")
+
+
+class AsyncFetcher:
+    def __init__(self, fetcher: Fetcher, concurrency: int) -> None:
+        self._fetcher = fetcher
+        self._concurrency = max(1, concurrency)
+        self._rate = rate_from_interval(fetcher.rate_limit_seconds)
+        self._hosts: Dict[str, Tuple[asyncio.Semaphore, Optional[TokenBucket]]] = {}
+
+    def _host_limits(self, url: str) -> Tuple[asyncio.Semaphore, Optional[TokenBucket]]:
+        host = urlsplit(url).netloc
+        limits = self._hosts.get(host)
+        if limits is None:
+            bucket = None if self._fetcher.rate_limiter is not None else TokenBucket(self._rate)
+            limits = (asyncio.Semaphore(self._concurrency), bucket)
+            self._hosts[host] = limits
+        return limits
+
+    async def fetch_html(self, url: str) -> str:
+        return await self._scheduled(self._fetcher.request_html, url)
+
+    async def fetch_if_modified(self, url: str) -> Optional[str]:
+        return await self._scheduled(self._fetcher.request_if_modified, url)
+
+    async def _scheduled(self, request: Callable[[str], T], url: str) -> T:
+        semaphore, bucket = self._host_limits(url)
+        async with semaphore:
+            delay = bucket.reserve() if bucket is not None else 0.0
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await asyncio.to_thread(request, url)
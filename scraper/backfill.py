@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from typing import Callable, Iterable, List, Optional, Sequence, TypeVar
+
+from scraper.config import Config
+from scraper.db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _in_chunks(rows: Iterable[T], write: Callable[[List[T]], None], chunk_size: int, what: str) -> int:
+    done = 0
+    chunk: List[T] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            write(chunk)
+            done += len(chunk)
+            chunk = []
+            LOGGER.info("%s backfilled for %s rows", what, done)
+    if chunk:
+        write(chunk)
+        done += len(chunk)
+    return done
+
+
+def backfill_genres(db: Database, chunk_size: int = 1000) -> int:
+    rows = ((anime_id, anime.genres) for anime_id, anime, _ in db.iter_anime(chunk_size=chunk_size))
+    return _in_chunks(rows, db.write_genres, chunk_size, "Genres")
+
+
+def backfill_downloads(db: Database, chunk_size: int = 1000) -> int:
+    rows = db.iter_download_labels(chunk_size=chunk_size)
+    return _in_chunks(rows, db.write_download_attributes, chunk_size, "Download attributes")
+
+
+JOBS = {"genres": backfill_genres, "downloads": backfill_downloads}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Backfill derived tables from stored anime data")
+    parser.add_argument("job", choices=sorted(JOBS))
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows read and written per transaction")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    config = Config.from_env()
+    db = Database(
+        host=config.db_host,
+        port=config.db_port,
+        user=config.db_user,
+        password=config.db_password,
+        database=config.db_name,
+    )
+    done = JOBS[args.job](db, chunk_size=args.chunk_size)
+    LOGGER.info("Backfill %s finished: %s rows", args.job, done)
+
+
+if __name__ == "__main__":
+    main()
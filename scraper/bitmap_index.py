@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class BitmapIndex:
+    def __init__(self) -> None:
+        self._positions: Dict[int, int] = {}
+        self._ids: List[Optional[int]] = []
+        self._free: List[int] = []
+        self._values: Dict[int, List[str]] = {}
+        self._bitmaps: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._all = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def add(self, doc_id: int, values: Iterable[str]) -> None:
+        self.remove(doc_id)
+        position = self._free.pop() if self._free else len(self._ids)
+        if position == len(self._ids):
+            self._ids.append(doc_id)
+        else:
+            self._ids[position] = doc_id
+        self._positions[doc_id] = position
+        bit = 1 << position
+        keys = []
+        for value in values:
+            key = value.lower()
+            if key in keys:
+                continue
+            keys.append(key)
+            self._names.setdefault(key, value)
+            self._bitmaps[key] = self._bitmaps.get(key, 0) | bit
+        self._values[doc_id] = keys
+        self._all |= bit
+
+    def remove(self, doc_id: int) -> None:
+        position = self._positions.pop(doc_id, None)
+        if position is None:
+            return
+        bit = 1 << position
+        for key in self._values.pop(doc_id, []):
+            bitmap = self._bitmaps[key] & ~bit
+            if bitmap:
+                self._bitmaps[key] = bitmap
+            else:
+                del self._bitmaps[key]
+                del self._names[key]
+        self._all &= ~bit
+        self._ids[position] = None
+        self._free.append(position)
+
+    def mask(self, values: Iterable[str] = ()) -> int:
+        result = self._all
+        for value in values:
+            result &= self._bitmaps.get(value.lower(), 0)
+            if not result:
+                break
+        return result
+
+    def any_mask(self, values: Iterable[str]) -> int:
+        result = 0
+        for value in values:
+            result |= self._bitmaps.get(value.lower(), 0)
+        return result
+
+    def contains(self, mask: int, doc_id: int) -> bool:
+        position = self._positions.get(doc_id)
+        return position is not None and bool(mask >> position & 1)
+
+    def ids(self, mask: int) -> Iterator[int]:
+        while mask:
+            low = mask & -mask
+            doc_id = self._ids[low.bit_length() - 1]
+            if doc_id is not None:
+                yield doc_id
+            mask ^= low
+
+    def counts(self) -> Dict[str, int]:
+        return {self._names[key]: bitmap.bit_count() for key, bitmap in sorted(self._bitmaps.items())}
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, List, Optional, Sequence
+
+LOGGER = logging.getLogger(__name__)
+
+WAIT_CONDITIONS = ("commit", "domcontentloaded", "load", "networkidle")
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = 2,
+        timeout: float = 15,
+        wait_until: str = "domcontentloaded",
+        blocked_resources: Sequence[str] = ("image", "font", "media"),
+    ) -> None:
+        if wait_until not in WAIT_CONDITIONS:
+            raise ValueError(f"Unsupported wait condition: {wait_until}")
+        self._size = max(1, size)
+        self._timeout_ms = int(timeout * 1000)
+        self._wait_until = wait_until
+        self._blocked = frozenset(blocked_resources)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        self._playwright: Any = None
+        self._browser: Any = None
+        self._contexts: List[Any] = []
+        self._pages: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._unavailable = False
+
+    def fetch(self, url: str) -> Optional[str]:
+        if self._unavailable:
+            return None
+        future = asyncio.run_coroutine_threadsafe(self._fetch(url), self._loop)
+        return future.result()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    async def _start(self) -> bool:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._pages is not None:
+                return True
+            try:
+                from playwright.async_api import async_playwright
+            except Exception as exc:  # pragma: no cover - optional dependency
+                LOGGER.warning("Playwright not available: %s", exc)
+                self._unavailable = True
+                return False
+            try:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                pages: asyncio.Queue = asyncio.Queue()
+                for _ in range(self._size):
+                    pages.put_nowait(await self._new_page())
+            except Exception as exc:  # pragma: no cover
+                LOGGER.warning("Could not start browser pool: %s", exc)
+                self._unavailable = True
+                await self._shutdown()
+                return False
+            self._pages = pages
+            LOGGER.info("Browser pool started with %s pages", self._size)
+            return True
+
+    async def _new_page(self) -> Any:
+        context = await self._browser.new_context()
+        self._contexts.append(context)
+        if self._blocked:
+            await context.route("**/*", self._route)
+        return await context.new_page()
+
+    async def _route(self, route) -> None:
+        if route.request.resource_type in self._blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        if not await self._start():
+            return None
+        assert self._pages is not None
+        # None marks a slot whose page was discarded; it is recreated here.
+        page = await self._pages.get()
+        try:
+            if page is None:
+                page = await self._new_page()
+            await page.goto(url, wait_until=self._wait_until, timeout=self._timeout_ms)
+            return await page.content()
+        except Exception as exc:  # pragma: no cover
+            LOGGER.warning("Playwright fetch failed for %s: %s", url, exc)
+            if page is not None:
+                await self._discard_page(page)
+                page = None
+            return None
+        finally:
+            self._pages.put_nowait(page)
+
+    async def _discard_page(self, page) -> None:
+        context = page.context
+        try:
+            await context.close()
+        except Exception:  # pragma: no cover
+            pass
+        if context in self._contexts:
+            self._contexts.remove(context)
+
+    async def _shutdown(self) -> None:
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception:  # pragma: no cover
+                pass
+        self._contexts = []
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._pages = None
@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 
@@ -16,8 +17,40 @@ class Config:
     db_name: str
     image_dir: Path
     mode: str
+    anime_list_url: str
     rate_limit_seconds: float
+    rate_limit_mode: str
+    rate_limit_min_rps: float
+    rate_limit_max_rps: float
     request_timeout: float
+    concurrency: int
+    workers: int
+    http_transport: str
+    http_cache_path: Optional[Path]
+    archive_dir: Optional[Path]
+    parser_backend: str
+    download_sync: str
+    write_batch_size: int
+    write_flush_seconds: float
+    incremental_pages: bool
+    page_refresh_hours: float
+    image_workers: int
+    image_variants: str
+    image_max_bytes: int
+    image_dedup: str
+    image_phash_distance: int
+    use_js: bool
+    browser_pool_size: int
+    js_wait_until: str
+    frontier_batch_size: int
+    frontier_lease_seconds: int
+    frontier_max_attempts: int
+    fetch_workers: int
+    parse_workers: int
+    persist_workers: int
+    stage_queue_size: int
+    metrics_textfile: Optional[Path]
+    report_dir: Optional[Path]
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -29,8 +62,44 @@ class Config:
         db_name = os.getenv("DB_NAME", "anime")
         image_dir = Path(os.getenv("IMAGE_DIR", "./data/images"))
         mode = os.getenv("MODE", "full")
+        anime_list_url = os.getenv("ANIME_LIST_URL", "https://otakudesu.best/anime-list")
         rate_limit_seconds = float(os.getenv("RATE_LIMIT_SECONDS", "0.6"))
+        rate_limit_mode = os.getenv("RATE_LIMIT_MODE", "adaptive")
+        rate_limit_min_rps = float(os.getenv("RATE_LIMIT_MIN_RPS", "0.2"))
+        rate_limit_max_rps = float(os.getenv("RATE_LIMIT_MAX_RPS", "4"))
         request_timeout = float(os.getenv("REQUEST_TIMEOUT", "15"))
+        concurrency = int(os.getenv("CONCURRENCY", "1"))
+        workers = int(os.getenv("WORKERS", "1"))
+        http_transport = os.getenv("HTTP_TRANSPORT", "auto")
+        http_cache = os.getenv("HTTP_CACHE_PATH", "./data/http_cache.sqlite3")
+        http_cache_path = Path(http_cache) if http_cache else None
+        archive = os.getenv("ARCHIVE_DIR", "")
+        archive_dir = Path(archive) if archive else None
+        parser_backend = os.getenv("PARSER_BACKEND", "html.parser")
+        download_sync = os.getenv("DOWNLOAD_SYNC", "diff")
+        write_batch_size = int(os.getenv("WRITE_BATCH_SIZE", "0"))
+        write_flush_seconds = float(os.getenv("WRITE_FLUSH_SECONDS", "5"))
+        incremental_pages = os.getenv("INCREMENTAL_PAGES", "0").lower() in ("1", "true", "yes")
+        page_refresh_hours = float(os.getenv("PAGE_REFRESH_HOURS", "168"))
+        image_workers = int(os.getenv("IMAGE_WORKERS", "4"))
+        image_variants = os.getenv("IMAGE_VARIANTS", "full:0")
+        image_max_bytes = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+        image_dedup = os.getenv("IMAGE_DEDUP", "off")
+        image_phash_distance = int(os.getenv("IMAGE_PHASH_DISTANCE", "-1"))
+        use_js = os.getenv("USE_JS", "0").lower() in ("1", "true", "yes")
+        browser_pool_size = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+        js_wait_until = os.getenv("JS_WAIT_UNTIL", "domcontentloaded")
+        frontier_batch_size = int(os.getenv("FRONTIER_BATCH_SIZE", "20"))
+        frontier_lease_seconds = int(os.getenv("FRONTIER_LEASE_SECONDS", "600"))
+        frontier_max_attempts = int(os.getenv("FRONTIER_MAX_ATTEMPTS", "5"))
+        fetch_workers = int(os.getenv("FETCH_WORKERS", "0"))
+        parse_workers = int(os.getenv("PARSE_WORKERS", "0"))
+        persist_workers = int(os.getenv("PERSIST_WORKERS", "1"))
+        stage_queue_size = int(os.getenv("STAGE_QUEUE_SIZE", "16"))
+        textfile = os.getenv("METRICS_TEXTFILE", "")
+        metrics_textfile = Path(textfile) if textfile else None
+        reports = os.getenv("REPORT_DIR", "./data/reports")
+        report_dir = Path(reports) if reports else None
         return cls(
             db_host=db_host,
             db_port=db_port,
@@ -39,6 +108,38 @@ class Config:
             db_name=db_name,
             image_dir=image_dir,
             mode=mode,
+            anime_list_url=anime_list_url,
             rate_limit_seconds=rate_limit_seconds,
+            rate_limit_mode=rate_limit_mode,
+            rate_limit_min_rps=rate_limit_min_rps,
+            rate_limit_max_rps=rate_limit_max_rps,
             request_timeout=request_timeout,
+            concurrency=concurrency,
+            workers=workers,
+            http_transport=http_transport,
+            http_cache_path=http_cache_path,
+            archive_dir=archive_dir,
+            parser_backend=parser_backend,
+            download_sync=download_sync,
+            write_batch_size=write_batch_size,
+            write_flush_seconds=write_flush_seconds,
+            incremental_pages=incremental_pages,
+            page_refresh_hours=page_refresh_hours,
+            image_workers=image_workers,
+            image_variants=image_variants,
+            image_max_bytes=image_max_bytes,
+            image_dedup=image_dedup,
+            image_phash_distance=image_phash_distance,
+            use_js=use_js,
+            browser_pool_size=browser_pool_size,
+            js_wait_until=js_wait_until,
+            frontier_batch_size=frontier_batch_size,
+            frontier_lease_seconds=frontier_lease_seconds,
+            frontier_max_attempts=frontier_max_attempts,
+            fetch_workers=fetch_workers,
+            parse_workers=parse_workers,
+            persist_workers=persist_workers,
+            stage_queue_size=stage_queue_size,
+            metrics_textfile=metrics_textfile,
+            report_dir=report_dir,
         )
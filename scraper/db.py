@@ -2,16 +2,259 @@ from __future__ import annotations
 
 import contextlib
 import logging
+import threading
+import time
 from dataclasses import asdict
-from typing import Iterable, Optional
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
 import mysql.connector
 from mysql.connector import pooling
 
-from scraper.models import Anime, AnimeDownload, AnimeImage
+from scraper import metrics
+from scraper.models import (
+    Anime,
+    AnimeDownload,
+    AnimeImage,
+    AnimeIndexEntry,
+    CatalogEntry,
+    DownloadPageState,
+    FrontierItem,
+    ImageVariant,
+)
+from scraper.utils import download_attributes, provider_label, slugify, split_genres
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# (fingerprints of the pages fetched this run, every page URL the detail page lists)
+PageFingerprints = Tuple[Sequence[Tuple[str, str]], Sequence[str]]
+
+# Rows per multi-row statement; keeps each packet well below max_allowed_packet.
+BATCH_ROWS = 500
+
+DownloadKey = Tuple[
+    str, Optional[str], Optional[str], Optional[str], Optional[str], Optional[str], str
+]
+
+DOWNLOAD_COLUMNS = (
+    "anime_id, source_url, section_title, format, resolution, size, provider, url, "
+    "size_bytes, resolution_px, provider_id"
+)
+# Read back with the provider slug in place of its id (LEFT JOIN download_provider p).
+DOWNLOAD_SELECT = (
+    "d.source_url, d.section_title, d.format, d.resolution, d.size, d.provider, d.url, "
+    "d.size_bytes, d.resolution_px, p.slug"
+)
+
+
+def _download_key(download: AnimeDownload) -> DownloadKey:
+    return (
+        download.source_url,
+        download.section_title,
+        download.format,
+        download.resolution,
+        download.size,
+        download.provider,
+        download.url,
+    )
+
+
+def _chunks(items: Sequence[T], size: int = BATCH_ROWS) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _values_clause(row_count: int, column_count: int) -> str:
+    row = "(" + ", ".join(["%s"] * column_count) + ")"
+    return ", ".join([row] * row_count)
+
+
+def _save_download_pages(cur, anime_id: int, pages: PageFingerprints) -> None:
+    fetched, current_urls = pages
+    for chunk in _chunks(list(fetched)):
+        cur.execute(
+            "INSERT INTO anime_download_page (anime_id, page_url, fingerprint) "
+            f"VALUES {_values_clause(len(chunk), 3)} "
+            "ON DUPLICATE KEY UPDATE fingerprint=VALUES(fingerprint), fetched_at=CURRENT_TIMESTAMP",
+            [value for page_url, fingerprint in chunk for value in (anime_id, page_url, fingerprint)],
+        )
+    if current_urls:
+        placeholders = ", ".join(["%s"] * len(current_urls))
+        cur.execute(
+            f"DELETE FROM anime_download_page WHERE anime_id=%s AND page_url NOT IN ({placeholders})",
+            [anime_id, *current_urls],
+        )
+    else:
+        cur.execute("DELETE FROM anime_download_page WHERE anime_id=%s", (anime_id,))
+
+
+def _save_image_variants(cur, images: Sequence[Tuple[int, AnimeImage]]) -> None:
+    rows = [
+        (anime_id, variant.name, variant.local_webp_path, variant.width, variant.height)
+        for anime_id, image in images
+        for variant in image.variants
+    ]
+    for chunk in _chunks(rows):
+        cur.execute(
+            "INSERT INTO anime_image_variant (anime_id, variant, local_webp_path, width, height) "
+            f"VALUES {_values_clause(len(chunk), 5)} "
+            "ON DUPLICATE KEY UPDATE local_webp_path=VALUES(local_webp_path), "
+            "width=VALUES(width), height=VALUES(height)",
+            [value for row in chunk for value in row],
+        )
+    for anime_id, image in images:
+        if not image.variants:
+            continue
+        names = [variant.name for variant in image.variants]
+        placeholders = ", ".join(["%s"] * len(names))
+        cur.execute(
+            f"DELETE FROM anime_image_variant WHERE anime_id=%s AND variant NOT IN ({placeholders})",
+            [anime_id, *names],
+        )
+
+
+def genre_links(items: Sequence[Tuple[int, Optional[str]]]) -> Tuple[Dict[str, str], List[Tuple[int, str]]]:
+    # (anime id, comma-joined genres) -> ({genre slug: name}, [(anime id, genre slug)])
+    names: Dict[str, str] = {}
+    links: List[Tuple[int, str]] = []
+    for anime_id, genres in items:
+        seen = set()
+        for name in split_genres(genres):
+            slug = slugify(name)
+            names.setdefault(slug, name)
+            if slug not in seen:
+                seen.add(slug)
+                links.append((anime_id, slug))
+    return names, links
+
+
+def _select_ids(cur, table: str, slugs: Sequence[str]) -> Dict[str, int]:
+    ids: Dict[str, int] = {}
+    for chunk in _chunks(slugs):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cur.execute(f"SELECT id, slug FROM {table} WHERE slug IN ({placeholders})", list(chunk))
+        ids.update({slug: row_id for row_id, slug in cur.fetchall()})
+    return ids
+
+
+def _intern(cur, table: str, names: Dict[str, str]) -> Dict[str, int]:
+    ids = _select_ids(cur, table, list(names))
+    missing = [(slug, name) for slug, name in names.items() if slug not in ids]
+    for chunk in _chunks(missing):
+        cur.execute(
+            f"INSERT IGNORE INTO {table} (slug, name) VALUES {_values_clause(len(chunk), 2)}",
+            [value for row in chunk for value in row],
+        )
+    if missing:
+        ids.update(_select_ids(cur, table, [slug for slug, _ in missing]))
+    return ids
+
+
+def _save_genres(cur, items: Sequence[Tuple[int, Optional[str]]]) -> None:
+    names, links = genre_links(items)
+    genre_ids = _intern(cur, "genre", names)
+    for chunk in _chunks([anime_id for anime_id, _ in items]):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cur.execute(f"DELETE FROM anime_genre WHERE anime_id IN ({placeholders})", list(chunk))
+    pairs = [(anime_id, genre_ids[slug]) for anime_id, slug in links if slug in genre_ids]
+    for chunk in _chunks(pairs):
+        cur.execute(
+            f"INSERT INTO anime_genre (anime_id, genre_id) VALUES {_values_clause(len(chunk), 2)}",
+            [value for row in chunk for value in row],
+        )
+    _count_rows("anime_genre", upserted=len(pairs))
+
+
+def _typed_attributes(
+    cur, labels: Sequence[Tuple[Optional[str], Optional[str], Optional[str]]]
+) -> List[Tuple[Optional[int], Optional[int], Optional[int]]]:
+    attributes = [download_attributes(*label) for label in labels]
+    names: Dict[str, str] = {}
+    for (_, _, provider), (_, _, slug) in zip(labels, attributes):
+        if slug is not None:
+            names.setdefault(slug, provider_label(provider) or slug)
+    provider_ids = _intern(cur, "download_provider", names) if names else {}
+    return [
+        (size_bytes, resolution_px, provider_ids.get(slug) if slug else None)
+        for size_bytes, resolution_px, slug in attributes
+    ]
+
+
+def _typed_download_rows(cur, rows: Sequence[Tuple]) -> List[Tuple]:
+    typed = _typed_attributes(cur, [(row[5], row[4], row[6]) for row in rows])
+    return [(*row, *attributes) for row, attributes in zip(rows, typed)]
+
+
+def _touch_anime(cur, anime_ids: Sequence[int]) -> None:
+    # Bump anime.updated_at so incremental exports pick up download changes.
+    for chunk in _chunks(anime_ids):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cur.execute(f"UPDATE anime SET updated_at=CURRENT_TIMESTAMP WHERE id IN ({placeholders})", list(chunk))
+
+
+def _stream(cur, size: int) -> Iterator[Tuple]:
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def merge_catalog(
+    anime_rows: Iterator[Tuple], download_rows: Iterator[Tuple], chunk_size: int
+) -> Iterator[List[CatalogEntry]]:
+    pending = next(download_rows, None)
+    chunk: List[CatalogEntry] = []
+    for row in anime_rows:
+        entry = CatalogEntry(
+            id=row[0],
+            anime=Anime(*row[1:9]),
+            updated_at=row[9],
+            image=AnimeImage(*row[10:15]) if row[10] is not None else None,
+        )
+        while pending is not None and pending[0] < entry.id:
+            pending = next(download_rows, None)
+        while pending is not None and pending[0] == entry.id:
+            entry.downloads.append(AnimeDownload(*pending[1:]))
+            pending = next(download_rows, None)
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+    for _ in download_rows:
+        pass
+
+
+def _count_rows(table: str, inserted: int = 0, deleted: int = 0, upserted: int = 0) -> None:
+    for action, rows in (("insert", inserted), ("delete", deleted), ("upsert", upserted)):
+        if rows:
+            metrics.inc("db_rows_written_total", rows, table=table, action=action)
+
+
+def diff_downloads(
+    existing_rows: Sequence[Tuple],
+    downloads: Iterable[AnimeDownload],
+) -> Tuple[List[DownloadKey], List[int]]:
+    # Returns (keys to insert, row ids to delete) for (id, *DownloadKey) rows.
+    existing = {}
+    to_delete: List[int] = []
+    for row in existing_rows:
+        key = tuple(row[1:])
+        if key in existing:
+            to_delete.append(row[0])
+        else:
+            existing[key] = row[0]
+    wanted = {}
+    for download in downloads:
+        wanted.setdefault(_download_key(download), None)
+    to_delete.extend(row_id for key, row_id in existing.items() if key not in wanted)
+    to_insert = [key for key in wanted if key not in existing]
+    return to_insert, to_delete
+
 
 class Database:
     def __init__(
@@ -23,6 +266,9 @@ class Database:
         database: str,
         pool_size: int = 5,
     ) -> None:
+        pool_size = min(pool_size, pooling.CNX_POOL_MAXSIZE)
+        # get_connection does not wait for a free connection, so callers do.
+        self._slots = threading.BoundedSemaphore(pool_size)
         self._pool = pooling.MySQLConnectionPool(
             pool_name="anime_pool",
             pool_size=pool_size,
@@ -36,16 +282,18 @@ class Database:
 
     @contextlib.contextmanager
     def connection(self):
-        conn = self._pool.get_connection()
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        with self._slots:
+            conn = self._pool.get_connection()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
 
+    @metrics.timed("db_seconds", op="upsert_anime")
     def upsert_anime(self, anime: Anime) -> int:
         query = (
             "INSERT INTO anime (slug, source_url, title, synopsis, `status`, `type`, genres, detail_hash) "
@@ -63,41 +311,53 @@ class Database:
                 row = cur.fetchone()
                 if row:
                     anime_id = row[0]
+            _save_genres(cur, [(anime_id, anime.genres)])
+        _count_rows("anime", upserted=1)
         return anime_id
 
+    @metrics.timed("db_seconds", op="upsert_downloads")
     def upsert_downloads(self, anime_id: int, downloads: Iterable[AnimeDownload]) -> None:
         delete_query = "DELETE FROM anime_download WHERE anime_id=%s"
-        insert_query = (
-            "INSERT INTO anime_download "
-            "(anime_id, source_url, section_title, format, resolution, size, provider, url) "
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
-        )
+        insert_query = f"INSERT INTO anime_download ({DOWNLOAD_COLUMNS}) VALUES {_values_clause(1, 11)}"
         with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(delete_query, (anime_id,))
-            cur.executemany(
-                insert_query,
-                [
-                    (
-                        anime_id,
-                        download.source_url,
-                        download.section_title,
-                        download.format,
-                        download.resolution,
-                        download.size,
-                        download.provider,
-                        download.url,
-                    )
-                    for download in downloads
-                ],
-            )
+            rows = _typed_download_rows(cur, [(anime_id, *_download_key(download)) for download in downloads])
+            cur.executemany(insert_query, rows)
+            inserted = max(cur.rowcount, 0)
+            _touch_anime(cur, [anime_id])
+        _count_rows("anime_download", inserted=inserted)
 
+    @metrics.timed("db_seconds", op="sync_downloads")
+    def sync_downloads(self, anime_id: int, downloads: Iterable[AnimeDownload]) -> Tuple[int, int]:
+        select_query = (
+            "SELECT id, source_url, section_title, format, resolution, size, provider, url "
+            "FROM anime_download WHERE anime_id=%s FOR UPDATE"
+        )
+        insert_query = f"INSERT INTO anime_download ({DOWNLOAD_COLUMNS}) VALUES {_values_clause(1, 11)}"
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(select_query, (anime_id,))
+            to_insert, to_delete = diff_downloads(cur.fetchall(), downloads)
+            for chunk in _chunks(to_delete):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(f"DELETE FROM anime_download WHERE id IN ({placeholders})", list(chunk))
+            if to_insert:
+                rows = _typed_download_rows(cur, [(anime_id, *key) for key in to_insert])
+                cur.executemany(insert_query, rows)
+            if to_insert or to_delete:
+                _touch_anime(cur, [anime_id])
+        _count_rows("anime_download", inserted=len(to_insert), deleted=len(to_delete))
+        return len(to_insert), len(to_delete)
+
+    @metrics.timed("db_seconds", op="upsert_image")
     def upsert_image(self, anime_id: int, image: AnimeImage) -> None:
         query = (
-            "INSERT INTO anime_image (anime_id, original_url, local_webp_path, width, height) "
-            "VALUES (%s, %s, %s, %s, %s) "
+            "INSERT INTO anime_image (anime_id, original_url, local_webp_path, width, height, source_digest) "
+            "VALUES (%s, %s, %s, %s, %s, %s) "
             "ON DUPLICATE KEY UPDATE original_url=VALUES(original_url), "
-            "local_webp_path=VALUES(local_webp_path), width=VALUES(width), height=VALUES(height)"
+            "local_webp_path=VALUES(local_webp_path), width=VALUES(width), height=VALUES(height), "
+            "source_digest=VALUES(source_digest)"
         )
         with self.connection() as conn:
             cur = conn.cursor()
@@ -109,8 +369,200 @@ class Database:
                     image.local_webp_path,
                     image.width,
                     image.height,
+                    image.source_digest,
                 ),
             )
+            _save_image_variants(cur, [(anime_id, image)])
+        _count_rows("anime_image", upserted=1)
+
+    @metrics.timed("db_seconds", op="load_image_index")
+    def load_image_index(self) -> Dict[str, AnimeImage]:
+        query = (
+            "SELECT a.slug, i.original_url, i.local_webp_path, i.width, i.height, i.source_digest "
+            "FROM anime_image i JOIN anime a ON a.id = i.anime_id"
+        )
+        images: Dict[str, AnimeImage] = {}
+        with self.connection() as conn:
+            cur = conn.cursor(buffered=False)
+            cur.execute(query)
+            for slug, original_url, local_webp_path, width, height, source_digest in cur:
+                images[slug] = AnimeImage(
+                    original_url=original_url,
+                    local_webp_path=local_webp_path,
+                    width=width,
+                    height=height,
+                    source_digest=source_digest,
+                )
+            cur = conn.cursor(buffered=False)
+            cur.execute(
+                "SELECT a.slug, v.variant, v.local_webp_path, v.width, v.height "
+                "FROM anime_image_variant v JOIN anime a ON a.id = v.anime_id"
+            )
+            for slug, name, local_webp_path, width, height in cur:
+                if slug in images:
+                    images[slug].variants.append(
+                        ImageVariant(name=name, local_webp_path=local_webp_path, width=width, height=height)
+                    )
+        return images
+
+    @metrics.timed("db_seconds", op="write_batch")
+    def write_batch(
+        self,
+        anime: Sequence[Anime],
+        downloads: Dict[str, List[AnimeDownload]],
+        images: Dict[str, AnimeImage],
+        pages: Optional[Dict[str, PageFingerprints]] = None,
+        replace_downloads: bool = False,
+    ) -> Tuple[Dict[str, int], int, int]:
+        anime_columns = "slug, source_url, title, synopsis, `status`, `type`, genres, detail_hash"
+        anime_update = (
+            "ON DUPLICATE KEY UPDATE title=VALUES(title), synopsis=VALUES(synopsis), "
+            "`status`=VALUES(`status`), `type`=VALUES(`type`), genres=VALUES(genres), "
+            "detail_hash=VALUES(detail_hash)"
+        )
+        image_update = (
+            "ON DUPLICATE KEY UPDATE original_url=VALUES(original_url), "
+            "local_webp_path=VALUES(local_webp_path), width=VALUES(width), height=VALUES(height), "
+            "source_digest=VALUES(source_digest)"
+        )
+        slugs = list(dict.fromkeys([item.slug for item in anime] + list(downloads) + list(images)))
+        anime_ids: Dict[str, int] = {}
+        added = removed = 0
+        with self.connection() as conn:
+            cur = conn.cursor()
+            for chunk in _chunks(anime):
+                params: List = []
+                for item in chunk:
+                    params.extend(
+                        (
+                            item.slug,
+                            item.source_url,
+                            item.title,
+                            item.synopsis,
+                            item.status,
+                            item.type,
+                            item.genres,
+                            item.detail_hash,
+                        )
+                    )
+                cur.execute(
+                    f"INSERT INTO anime ({anime_columns}) VALUES {_values_clause(len(chunk), 8)} {anime_update}",
+                    params,
+                )
+            for chunk in _chunks(slugs):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(f"SELECT id, slug FROM anime WHERE slug IN ({placeholders})", list(chunk))
+                anime_ids.update({slug: anime_id for anime_id, slug in cur.fetchall()})
+            _save_genres(cur, [(anime_ids[item.slug], item.genres) for item in anime if item.slug in anime_ids])
+
+            sync_ids = [anime_ids[slug] for slug in downloads if slug in anime_ids]
+            existing: Dict[int, List[Tuple]] = {anime_id: [] for anime_id in sync_ids}
+            for chunk in _chunks(sync_ids if not replace_downloads else []):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(
+                    f"SELECT id, anime_id, source_url, section_title, format, resolution, size, provider, url "
+                    f"FROM anime_download WHERE anime_id IN ({placeholders}) FOR UPDATE",
+                    list(chunk),
+                )
+                for row in cur.fetchall():
+                    existing[row[1]].append((row[0], *row[2:]))
+            to_delete: List[int] = []
+            to_insert: List[Tuple] = []
+            changed: List[int] = []
+            replaced = 0
+            if replace_downloads:
+                for chunk in _chunks(sync_ids):
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cur.execute(f"DELETE FROM anime_download WHERE anime_id IN ({placeholders})", list(chunk))
+                    replaced += max(cur.rowcount, 0)
+                changed = list(sync_ids)
+            for slug, items in downloads.items():
+                anime_id = anime_ids.get(slug)
+                if anime_id is None:
+                    continue
+                if replace_downloads:
+                    to_insert.extend((anime_id, *key) for key in dict.fromkeys(map(_download_key, items)))
+                    continue
+                insert_keys, delete_ids = diff_downloads(existing[anime_id], items)
+                to_delete.extend(delete_ids)
+                to_insert.extend((anime_id, *key) for key in insert_keys)
+                if insert_keys or delete_ids:
+                    changed.append(anime_id)
+            for chunk in _chunks(to_delete):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(f"DELETE FROM anime_download WHERE id IN ({placeholders})", list(chunk))
+            for chunk in _chunks(_typed_download_rows(cur, to_insert)):
+                cur.execute(
+                    f"INSERT INTO anime_download ({DOWNLOAD_COLUMNS}) VALUES {_values_clause(len(chunk), 11)}",
+                    [value for row in chunk for value in row],
+                )
+            _touch_anime(cur, changed)
+            added, removed = len(to_insert), len(to_delete) + replaced
+
+            for slug, page_fingerprints in (pages or {}).items():
+                if slug in anime_ids:
+                    _save_download_pages(cur, anime_ids[slug], page_fingerprints)
+
+            image_rows = [
+                (
+                    anime_ids[slug],
+                    image.original_url,
+                    image.local_webp_path,
+                    image.width,
+                    image.height,
+                    image.source_digest,
+                )
+                for slug, image in images.items()
+                if slug in anime_ids
+            ]
+            for chunk in _chunks(image_rows):
+                cur.execute(
+                    "INSERT INTO anime_image (anime_id, original_url, local_webp_path, width, height, source_digest) "
+                    f"VALUES {_values_clause(len(chunk), 6)} {image_update}",
+                    [value for row in chunk for value in row],
+                )
+            _save_image_variants(
+                cur,
+                [(anime_ids[slug], image) for slug, image in images.items() if slug in anime_ids],
+            )
+        _count_rows("anime", upserted=len(anime))
+        _count_rows("anime_download", inserted=added, deleted=removed)
+        _count_rows("anime_image", upserted=len(image_rows))
+        return anime_ids, added, removed
+
+    def load_download_pages(self, anime_id: int, max_age_seconds: float) -> Dict[str, DownloadPageState]:
+        query = (
+            "SELECT page_url, fingerprint, fetched_at >= NOW() - INTERVAL %s SECOND "
+            "FROM anime_download_page WHERE anime_id=%s"
+        )
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(query, (int(max_age_seconds), anime_id))
+            rows = cur.fetchall()
+        return {
+            page_url: DownloadPageState(fingerprint=fingerprint, fresh=bool(fresh))
+            for page_url, fingerprint, fresh in rows
+        }
+
+    def load_downloads(self, anime_id: int, source_urls: Sequence[str]) -> List[AnimeDownload]:
+        downloads: List[AnimeDownload] = []
+        with self.connection() as conn:
+            cur = conn.cursor()
+            for chunk in _chunks(list(source_urls)):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(
+                    f"SELECT {DOWNLOAD_SELECT} FROM anime_download d "
+                    "LEFT JOIN download_provider p ON p.id = d.provider_id "
+                    f"WHERE d.anime_id=%s AND d.source_url IN ({placeholders}) ORDER BY d.id",
+                    [anime_id, *chunk],
+                )
+                downloads.extend(AnimeDownload(*row) for row in cur.fetchall())
+        return downloads
+
+    @metrics.timed("db_seconds", op="save_download_pages")
+    def save_download_pages(self, anime_id: int, pages: PageFingerprints) -> None:
+        with self.connection() as conn:
+            _save_download_pages(conn.cursor(), anime_id, pages)
 
     def get_anime_by_slug(self, slug: str) -> Optional[Anime]:
         query = "SELECT slug, source_url, title, synopsis, `status`, `type`, genres, detail_hash FROM anime WHERE slug=%s"
@@ -131,6 +583,103 @@ class Database:
             detail_hash=row.get("detail_hash"),
         )
 
+    @metrics.timed("db_seconds", op="load_anime_index")
+    def load_anime_index(self, batch_size: int = 5000) -> Dict[str, AnimeIndexEntry]:
+        query = "SELECT slug, id, `status`, detail_hash, updated_at FROM anime"
+        index: Dict[str, AnimeIndexEntry] = {}
+        with self.connection() as conn:
+            cur = conn.cursor(buffered=False)
+            cur.execute(query)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for slug, anime_id, status, detail_hash, updated_at in rows:
+                    index[slug] = AnimeIndexEntry(
+                        id=anime_id,
+                        status=status,
+                        detail_hash=detail_hash,
+                        updated_at=updated_at,
+                    )
+        return index
+
+    @metrics.timed("db_seconds", op="write_genres")
+    def write_genres(self, items: Sequence[Tuple[int, Optional[str]]]) -> None:
+        with self.connection() as conn:
+            _save_genres(conn.cursor(), items)
+
+    def iter_download_labels(
+        self, chunk_size: int = 1000
+    ) -> Iterator[Tuple[int, Optional[str], Optional[str], Optional[str]]]:
+        with self.connection() as conn:
+            cur = conn.cursor(buffered=False)
+            cur.execute("SELECT id, size, resolution, provider FROM anime_download ORDER BY id")
+            yield from _stream(cur, chunk_size)
+
+    @metrics.timed("db_seconds", op="write_download_attributes")
+    def write_download_attributes(
+        self, rows: Sequence[Tuple[int, Optional[str], Optional[str], Optional[str]]]
+    ) -> None:
+        with self.connection() as conn:
+            cur = conn.cursor()
+            typed = _typed_attributes(cur, [row[1:] for row in rows])
+            cur.executemany(
+                "UPDATE anime_download SET size_bytes=%s, resolution_px=%s, provider_id=%s WHERE id=%s",
+                [(*attributes, row[0]) for row, attributes in zip(rows, typed)],
+            )
+
+    def current_timestamp(self) -> datetime:
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT CURRENT_TIMESTAMP")
+            return cur.fetchone()[0]
+
+    def iter_catalog(
+        self, since: Optional[datetime] = None, chunk_size: int = 1000
+    ) -> Iterator[List[CatalogEntry]]:
+        changed = ""
+        params: Tuple = ()
+        if since is not None:
+            changed = (
+                " JOIN (SELECT id AS anime_id FROM anime WHERE updated_at >= %s"
+                " UNION SELECT anime_id FROM anime_image WHERE updated_at >= %s) c ON c.anime_id = a.id"
+            )
+            params = (since, since)
+        anime_query = (
+            "SELECT a.id, a.slug, a.source_url, a.title, a.synopsis, a.`status`, a.`type`, a.genres, "
+            "a.detail_hash, a.updated_at, i.original_url, i.local_webp_path, i.width, i.height, i.source_digest "
+            "FROM anime a" + changed + " LEFT JOIN anime_image i ON i.anime_id = a.id ORDER BY a.id"
+        )
+        download_query = (
+            f"SELECT d.anime_id, {DOWNLOAD_SELECT} FROM anime_download d JOIN anime a ON a.id = d.anime_id"
+            + changed
+            + " LEFT JOIN download_provider p ON p.id = d.provider_id ORDER BY d.anime_id, d.id"
+        )
+        with self.connection() as anime_conn, self.connection() as download_conn:
+            anime_cur = anime_conn.cursor(buffered=False)
+            anime_cur.execute(anime_query, params)
+            download_cur = download_conn.cursor(buffered=False)
+            download_cur.execute(download_query, params)
+            anime_rows = _stream(anime_cur, chunk_size)
+            yield from merge_catalog(anime_rows, _stream(download_cur, chunk_size), chunk_size)
+
+    def iter_anime(
+        self, since: Optional[datetime] = None, chunk_size: int = 1000
+    ) -> Iterator[Tuple[int, Anime, Optional[datetime]]]:
+        query = (
+            "SELECT id, slug, source_url, title, synopsis, `status`, `type`, genres, detail_hash, updated_at "
+            "FROM anime"
+        )
+        params: Tuple = ()
+        if since is not None:
+            query += " WHERE updated_at >= %s"
+            params = (since,)
+        with self.connection() as conn:
+            cur = conn.cursor(buffered=False)
+            cur.execute(query + " ORDER BY id", params)
+            for row in _stream(cur, chunk_size):
+                yield row[0], Anime(*row[1:9]), row[9]
+
     def get_state(self, key: str) -> Optional[str]:
         query = "SELECT state_value FROM scrape_state WHERE state_key=%s"
         with self.connection() as conn:
@@ -147,3 +696,201 @@ class Database:
         with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(query, (key, value))
+
+    def frontier_seed(self, run_id: str, items: Sequence[Tuple[str, str, int]]) -> int:
+        inserted = 0
+        with self.connection() as conn:
+            cur = conn.cursor()
+            for chunk in _chunks(list(items)):
+                cur.execute(
+                    "INSERT IGNORE INTO crawl_frontier (run_id, url, kind, priority) VALUES "
+                    + _values_clause(len(chunk), 4),
+                    [value for url, kind, priority in chunk for value in (run_id, url, kind, priority)],
+                )
+                inserted += cur.rowcount
+        return inserted
+
+    def frontier_claim(
+        self, run_id: str, owner: str, limit: int, lease_seconds: float, max_attempts: int
+    ) -> List[FrontierItem]:
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "UPDATE crawl_frontier SET `state`='dead', lease_owner=NULL, last_error='lease expired' "
+                "WHERE run_id=%s AND `state`='leased' AND lease_expires_at < NOW() AND attempts >= %s",
+                (run_id, max_attempts),
+            )
+            cur.execute(
+                "SELECT id, url, kind, attempts FROM crawl_frontier "
+                "WHERE run_id=%s AND ((`state`='pending' AND next_attempt_at <= NOW()) "
+                "OR (`state`='leased' AND lease_expires_at < NOW())) "
+                "ORDER BY priority DESC, id LIMIT %s FOR UPDATE SKIP LOCKED",
+                (run_id, limit),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return []
+            ids = [row[0] for row in rows]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cur.execute(
+                "UPDATE crawl_frontier SET `state`='leased', lease_owner=%s, "
+                "lease_expires_at=NOW() + INTERVAL %s SECOND, attempts=attempts+1 "
+                f"WHERE id IN ({placeholders})",
+                [owner, int(lease_seconds), *ids],
+            )
+        return [
+            FrontierItem(id=item_id, url=url, kind=kind, attempts=attempts + 1)
+            for item_id, url, kind, attempts in rows
+        ]
+
+    def frontier_complete(self, owner: str, item_ids: Sequence[int]) -> None:
+        with self.connection() as conn:
+            cur = conn.cursor()
+            for chunk in _chunks(list(item_ids)):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cur.execute(
+                    "UPDATE crawl_frontier SET `state`='done', lease_owner=NULL, lease_expires_at=NULL "
+                    f"WHERE lease_owner=%s AND id IN ({placeholders})",
+                    [owner, *chunk],
+                )
+
+    def frontier_fail(self, owner: str, item_id: int, error: str, retry_in_seconds: Optional[float]) -> None:
+        # retry_in_seconds=None moves the item to the dead letter state.
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "UPDATE crawl_frontier SET `state`=%s, lease_owner=NULL, lease_expires_at=NULL, "
+                "next_attempt_at=NOW() + INTERVAL %s SECOND, last_error=%s "
+                "WHERE id=%s AND lease_owner=%s",
+                (
+                    "dead" if retry_in_seconds is None else "pending",
+                    int(retry_in_seconds or 0),
+                    error[:2000],
+                    item_id,
+                    owner,
+                ),
+            )
+
+    def frontier_counts(self, run_id: str) -> Dict[str, int]:
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT `state`, COUNT(*) FROM crawl_frontier WHERE run_id=%s GROUP BY `state`",
+                (run_id,),
+            )
+            return {state: count for state, count in cur.fetchall()}
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        db: Database,
+        max_records: int = 100,
+        max_delay: float = 5.0,
+        on_flush: Optional[Callable[[List[Tuple[int, Anime]]], None]] = None,
+        on_failure: Optional[Callable[[List[Anime]], None]] = None,
+        replace_downloads: bool = False,
+    ) -> None:
+        self._db = db
+        self._max_records = max(1, max_records)
+        self._max_delay = max_delay
+        self._replace_downloads = replace_downloads
+        self._on_flush = on_flush
+        self._on_failure = on_failure
+        self._lock = threading.Lock()
+        self._anime: Dict[str, Anime] = {}
+        self._downloads: Dict[str, List[AnimeDownload]] = {}
+        self._images: Dict[str, AnimeImage] = {}
+        self._pages: Dict[str, PageFingerprints] = {}
+        self._oldest: Optional[float] = None
+        self.downloads_added = 0
+        self.downloads_removed = 0
+        self._closed = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        if max_delay > 0:
+            self._timer = threading.Thread(target=self._flush_when_idle, name="write-behind", daemon=True)
+            self._timer.start()
+
+    def add(
+        self,
+        anime: Anime,
+        downloads: Iterable[AnimeDownload],
+        pages: Optional[PageFingerprints] = None,
+    ) -> None:
+        with self._lock:
+            self._anime[anime.slug] = anime
+            self._downloads[anime.slug] = list(downloads)
+            if pages is not None:
+                self._pages[anime.slug] = pages
+            self._touch()
+            if self._due():
+                self._flush_locked()
+
+    def add_image(self, slug: str, image: AnimeImage) -> None:
+        with self._lock:
+            self._images[slug] = image
+            self._touch()
+            if self._due():
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+
+    def __enter__(self) -> "WriteBehindBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _flush_when_idle(self) -> None:
+        while not self._closed.wait(min(self._max_delay, 1.0)):
+            with self._lock:
+                if not self._due():
+                    continue
+                try:
+                    self._flush_locked()
+                except Exception:
+                    LOGGER.exception("Timed write-behind flush failed")
+
+    def _touch(self) -> None:
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    def _due(self) -> bool:
+        if len(self._anime) + len(self._images) >= self._max_records:
+            return True
+        return self._oldest is not None and time.monotonic() - self._oldest >= self._max_delay
+
+    def _flush_locked(self) -> None:
+        if not self._anime and not self._images:
+            return
+        anime = list(self._anime.values())
+        downloads, images, pages = self._downloads, self._images, self._pages
+        self._anime, self._downloads, self._images, self._pages = {}, {}, {}, {}
+        self._oldest = None
+        try:
+            anime_ids, added, removed = self._db.write_batch(
+                anime, downloads, images, pages, replace_downloads=self._replace_downloads
+            )
+        except Exception:
+            if self._on_failure is not None:
+                self._on_failure(anime)
+            raise
+        self.downloads_added += added
+        self.downloads_removed += removed
+        LOGGER.info(
+            "Flushed %s anime, %s images (%s downloads added, %s removed)",
+            len(anime),
+            len(images),
+            added,
+            removed,
+        )
+        if self._on_flush is not None:
+            self._on_flush([(anime_ids[item.slug], item) for item in anime if item.slug in anime_ids])
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from scraper import metrics
+from scraper.config import Config
+from scraper.db import Database
+from scraper.models import CatalogEntry
+
+LOGGER = logging.getLogger(__name__)
+
+FORMATS = ("jsonl", "parquet", "sqlite")
+
+SUFFIXES = {".jsonl": "jsonl", ".parquet": "parquet", ".sqlite": "sqlite", ".sqlite3": "sqlite", ".db": "sqlite"}
+
+
+IMAGE_FIELDS = ("original_url", "local_webp_path", "width", "height", "source_digest")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS anime (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    source_url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    synopsis TEXT NOT NULL,
+    status TEXT,
+    type TEXT,
+    genres TEXT,
+    detail_hash TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS anime_image (
+    anime_id INTEGER PRIMARY KEY REFERENCES anime(id),
+    original_url TEXT NOT NULL,
+    local_webp_path TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    source_digest TEXT
+);
+CREATE TABLE IF NOT EXISTS anime_download (
+    anime_id INTEGER NOT NULL REFERENCES anime(id),
+    source_url TEXT NOT NULL,
+    section_title TEXT,
+    format TEXT,
+    resolution TEXT,
+    size TEXT,
+    provider TEXT,
+    url TEXT NOT NULL,
+    size_bytes INTEGER,
+    resolution_px INTEGER,
+    provider_slug TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_anime_download_anime_id ON anime_download (anime_id);
+"""
+
+# Added to anime_download after the first snapshots were written; see SqliteWriter.
+SQLITE_DOWNLOAD_UPGRADES = {"size_bytes": "INTEGER", "resolution_px": "INTEGER", "provider_slug": "TEXT"}
+
+
+def entry_record(entry: CatalogEntry) -> Dict[str, Any]:
+    image = None
+    if entry.image is not None:
+        image = {name: getattr(entry.image, name) for name in IMAGE_FIELDS}
+    return {
+        "id": entry.id,
+        **asdict(entry.anime),
+        "updated_at": entry.updated_at,
+        "image": image,
+        "downloads": [asdict(download) for download in entry.downloads],
+    }
+
+
+def format_for(path: Path) -> Optional[str]:
+    return SUFFIXES.get(path.suffix.lower())
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+class JsonlWriter:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._tmp = _tmp_path(path)
+        self._file = self._tmp.open("w", encoding="utf-8")
+
+    def write(self, records: Sequence[Dict[str, Any]]) -> None:
+        for record in records:
+            if record["updated_at"] is not None:
+                record = {**record, "updated_at": record["updated_at"].isoformat()}
+            self._file.write(json.dumps(record, ensure_ascii=False))
+            self._file.write("\n")
+
+    def close(self) -> None:
+        self._file.close()
+        os.replace(self._tmp, self._path)
+
+    def abort(self) -> None:
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class ParquetWriter:
+    def __init__(self, path: Path) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError(f"Parquet export needs pyarrow ({exc}); install it or use --format jsonl") from exc
+        string = pa.string()
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("slug", string),
+                ("source_url", string),
+                ("title", string),
+                ("synopsis", string),
+                ("status", string),
+                ("type", string),
+                ("genres", string),
+                ("detail_hash", string),
+                ("updated_at", pa.timestamp("s")),
+                (
+                    "image",
+                    pa.struct(
+                        [
+                            ("original_url", string),
+                            ("local_webp_path", string),
+                            ("width", pa.int32()),
+                            ("height", pa.int32()),
+                            ("source_digest", string),
+                        ]
+                    ),
+                ),
+                (
+                    "downloads",
+                    pa.list_(
+                        pa.struct(
+                            [
+                                ("source_url", string),
+                                ("section_title", string),
+                                ("format", string),
+                                ("resolution", string),
+                                ("size", string),
+                                ("provider", string),
+                                ("url", string),
+                                ("size_bytes", pa.int64()),
+                                ("resolution_px", pa.int32()),
+                                ("provider_slug", string),
+                            ]
+                        )
+                    ),
+                ),
+            ]
+        )
+        self._path = path
+        self._tmp = _tmp_path(path)
+        self._writer = pq.ParquetWriter(str(self._tmp), self._schema, compression="zstd")
+
+    def write(self, records: Sequence[Dict[str, Any]]) -> None:
+        self._writer.write_table(self._pa.Table.from_pylist(list(records), schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+        os.replace(self._tmp, self._path)
+
+    def abort(self) -> None:
+        self._writer.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class SqliteWriter:
+    def __init__(self, path: Path, incremental: bool = False) -> None:
+        self._path = path
+        self._in_place = incremental and path.exists()
+        self._target = path if self._in_place else _tmp_path(path)
+        if not self._in_place:
+            self._target.unlink(missing_ok=True)
+        self._conn = sqlite3.connect(self._target)
+        self._conn.executescript(SQLITE_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(anime_download)")}
+        for name, kind in SQLITE_DOWNLOAD_UPGRADES.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE anime_download ADD COLUMN {name} {kind}")
+
+    def write(self, records: Sequence[Dict[str, Any]]) -> None:
+        ids = [(record["id"],) for record in records]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO anime "
+                "(id, slug, source_url, title, synopsis, status, type, genres, detail_hash, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record["id"],
+                        record["slug"],
+                        record["source_url"],
+                        record["title"],
+                        record["synopsis"],
+                        record["status"],
+                        record["type"],
+                        record["genres"],
+                        record["detail_hash"],
+                        record["updated_at"].isoformat() if record["updated_at"] is not None else None,
+                    )
+                    for record in records
+                ],
+            )
+            self._conn.executemany("DELETE FROM anime_image WHERE anime_id = ?", ids)
+            self._conn.executemany("DELETE FROM anime_download WHERE anime_id = ?", ids)
+            self._conn.executemany(
+                "INSERT INTO anime_image (anime_id, original_url, local_webp_path, width, height, source_digest) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (record["id"], *(record["image"][name] for name in IMAGE_FIELDS))
+                    for record in records
+                    if record["image"] is not None
+                ],
+            )
+            self._conn.executemany(
+                "INSERT INTO anime_download "
+                "(anime_id, source_url, section_title, format, resolution, size, provider, url, "
+                "size_bytes, resolution_px, provider_slug) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record["id"],
+                        download["source_url"],
+                        download["section_title"],
+                        download["format"],
+                        download["resolution"],
+                        download["size"],
+                        download["provider"],
+                        download["url"],
+                        download["size_bytes"],
+                        download["resolution_px"],
+                        download["provider_slug"],
+                    )
+                    for record in records
+                    for download in record["downloads"]
+                ],
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+        if not self._in_place:
+            os.replace(self._target, self._path)
+
+    def abort(self) -> None:
+        self._conn.close()
+        if not self._in_place:
+            self._target.unlink(missing_ok=True)
+
+
+def open_writer(path: Path, fmt: str, incremental: bool = False):
+    if fmt == "jsonl":
+        return JsonlWriter(path)
+    if fmt == "parquet":
+        return ParquetWriter(path)
+    if fmt == "sqlite":
+        return SqliteWriter(path, incremental=incremental)
+    raise ValueError(f"Unknown export format {fmt!r}, expected one of {FORMATS}")
+
+
+def export_catalog(
+    db: Database,
+    path: Path,
+    fmt: str,
+    since: Optional[datetime] = None,
+    chunk_size: int = 1000,
+) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = open_writer(path, fmt, incremental=since is not None)
+    exported = 0
+    try:
+        for chunk in db.iter_catalog(since=since, chunk_size=chunk_size):
+            records: List[Dict[str, Any]] = [entry_record(entry) for entry in chunk]
+            writer.write(records)
+            exported += len(records)
+            metrics.inc("export_rows_total", len(records), format=fmt)
+            LOGGER.debug("Exported %s anime so far", exported)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return exported
+
+
+def last_export_key(fmt: str, path: Path) -> str:
+    digest = hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return f"last_export_{fmt}_{digest}"
+
+
+def run_export(
+    db: Database,
+    path: Path,
+    fmt: str,
+    since: Optional[str] = None,
+    chunk_size: int = 1000,
+) -> int:
+    started_at = db.current_timestamp()
+    state_key = last_export_key(fmt, path)
+    since_at: Optional[datetime] = None
+    if since == "last":
+        previous = db.get_state(state_key)
+        since_at = datetime.fromisoformat(previous) if previous else None
+    elif since:
+        since_at = datetime.fromisoformat(since)
+    if since_at is not None and fmt == "sqlite" and not path.exists():
+        LOGGER.info("%s does not exist yet, running a full export", path)
+        since_at = None
+    exported = export_catalog(db, path, fmt, since=since_at, chunk_size=chunk_size)
+    db.set_state(state_key, started_at.isoformat())
+    LOGGER.info(
+        "Exported %s anime to %s (%s)%s",
+        exported,
+        path,
+        fmt,
+        f" changed since {since_at.isoformat()}" if since_at else "",
+    )
+    return exported
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Stream the anime catalog out of MySQL")
+    parser.add_argument("--output", type=Path, required=True, help="Target file (.jsonl, .parquet or .sqlite)")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Default: from the output suffix")
+    parser.add_argument(
+        "--since",
+        default=None,
+        help="Only anime updated at or after this ISO timestamp, or 'last' for changes since the previous export",
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows fetched and written per chunk")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    fmt = args.format or format_for(args.output)
+    if fmt is None:
+        parser.error(f"Cannot tell the format of {args.output}; pass --format")
+    config = Config.from_env()
+    db = Database(
+        host=config.db_host,
+        port=config.db_port,
+        user=config.db_user,
+        password=config.db_password,
+        database=config.db_name,
+    )
+    run_export(db, args.output, fmt, since=args.since, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,142 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Dict, Optional, TypeVar, cast
 
 import requests
 
+from scraper import metrics
+from scraper.archive import HtmlArchive
+from scraper.http_cache import Validators, ValidatorStore
+from scraper.ratelimit import RateLimiter
+from scraper.transport import Transport, TransportResponse, read_text, record_transfer
 from scraper.utils import rate_limit_sleep, request_with_retry
 
+if TYPE_CHECKING:
+    from scraper.browser_pool import BrowserPool
+
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class Fetcher:
-    def __init__(self, rate_limit_seconds: float, timeout: float) -> None:
-        self._session = requests.Session()
-        self._session.headers.update(
-            {
-                "User-Agent": "anime-scraper/1.0 (+https://otakudesu.best)",
-            }
-        )
+    def __init__(
+        self,
+        rate_limit_seconds: float,
+        timeout: float,
+        pool_size: int = 10,
+        validator_store: Optional[ValidatorStore] = None,
+        archive: Optional[HtmlArchive] = None,
+        browser_pool: Optional["BrowserPool"] = None,
+        use_js: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        transport: Optional[Transport] = None,
+    ) -> None:
+        self._transport = transport or Transport(pool_size=pool_size)
         self._rate_limit_seconds = rate_limit_seconds
         self._timeout = timeout
+        self._validators = validator_store
+        self._archive = archive
+        self._browser_pool = browser_pool
+        self._use_js = use_js
+        self._rate_limiter = rate_limiter
+
+    @property
+    def rate_limit_seconds(self) -> float:
+        return self._rate_limit_seconds
+
+    @property
+    def transport(self) -> Transport:
+        return self._transport
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        return self._rate_limiter
+
+    def fetch_html(self, url: str, use_js: Optional[bool] = None) -> str:
+        return self._paced(lambda: self.request_html(url, use_js=use_js))
+
+    def fetch_if_modified(self, url: str) -> Optional[str]:
+        return self._paced(lambda: self.request_if_modified(url))
+
+    def _paced(self, request: Callable[[], T]) -> T:
+        if self._rate_limiter is not None:
+            return request()
+        result = request()
+        rate_limit_sleep(self._rate_limit_seconds)
+        return result
 
-    def fetch_html(self, url: str, use_js: bool = False) -> str:
-        if use_js:
+    def request_html(self, url: str, use_js: Optional[bool] = None) -> str:
+        if self._use_js if use_js is None else use_js:
             html = self._fetch_with_playwright(url)
             if html:
-                rate_limit_sleep(self._rate_limit_seconds)
+                if self._archive is not None:
+                    self._archive.put(url, html)
                 return html
-        response = request_with_retry(
-            self._session,
-            "GET",
-            url,
-            timeout=self._timeout,
-        )
-        response.raise_for_status()
-        rate_limit_sleep(self._rate_limit_seconds)
-        return response.text
+        return cast(str, self._request(url, conditional=False))
+
+    def request_if_modified(self, url: str) -> Optional[str]:
+        # None when the page is unchanged: a 304, or a 200 with the stored body digest.
+        if self._use_js:
+            return self.request_html(url)
+        return self._request(url, conditional=True)
+
+    def forget(self, url: str) -> None:
+        if self._validators is not None:
+            self._validators.delete(url)
+
+    def _request(self, url: str, conditional: bool) -> Optional[str]:
+        cached = self._validators.get(url) if conditional and self._validators is not None else None
+        headers: Dict[str, str] = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        with metrics.timer("fetch_seconds", kind="page"):
+            response = cast(
+                TransportResponse,
+                request_with_retry(
+                    self._transport,
+                    "GET",
+                    url,
+                    timeout=self._timeout,
+                    headers=headers or None,
+                    limiter=self._rate_limiter,
+                ),
+            )
+            with response:
+                if response.status_code == 304:
+                    if not cached:
+                        raise requests.HTTPError(f"304 Not Modified without a cached copy for url: {url}")
+                    metrics.inc("fetch_unchanged_total", reason="not_modified")
+                    return None
+                response.raise_for_status()
+                html, digest = read_text(response)
+        record_transfer(response, "page")
+        if self._archive is not None:
+            self._archive.put(url, html)
+        if self._validators is not None:
+            self._validators.put(
+                url,
+                Validators(
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    digest=digest,
+                ),
+            )
+            if cached and cached.digest == digest:
+                metrics.inc("fetch_unchanged_total", reason="same_digest")
+                return None
+        return html
 
     def _fetch_with_playwright(self, url: str) -> Optional[str]:
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(url)
+        if self._browser_pool is not None:
+            with metrics.timer("fetch_seconds", kind="js"):
+                return self._browser_pool.fetch(url)
         try:
             from playwright.sync_api import sync_playwright
         except Exception as exc:  # pragma: no cover - optional dependency
@@ -55,3 +154,18 @@ class Fetcher:
         except Exception as exc:  # pragma: no cover
             LOGGER.warning("Playwright fetch failed for %s: %s", url, exc)
             return None
+
+
+class ReplayFetcher(Fetcher):
+    def __init__(self, archive: HtmlArchive) -> None:
+        super().__init__(0, 0)
+        self._replay_archive = archive
+
+    def _request(self, url: str, conditional: bool) -> Optional[str]:
+        html = self._replay_archive.get(url)
+        if html is None:
+            raise requests.HTTPError(f"404 Not in archive for url: {url}")
+        return html
+
+    def _fetch_with_playwright(self, url: str) -> Optional[str]:
+        return self._request(url, conditional=False)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scraper.db import Database
+from scraper.models import FrontierItem
+
+LOGGER = logging.getLogger(__name__)
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CrawlFrontier:
+    def __init__(
+        self,
+        db: Database,
+        run_id: str,
+        owner: Optional[str] = None,
+        batch_size: int = 20,
+        lease_seconds: float = 600,
+        max_attempts: int = 5,
+        backoff_seconds: float = 60,
+        max_backoff_seconds: float = 3600,
+    ) -> None:
+        self._db = db
+        self.run_id = run_id
+        self.owner = owner or default_owner()
+        self.batch_size = max(1, batch_size)
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_seconds = backoff_seconds
+        self._max_backoff_seconds = max_backoff_seconds
+
+    def seed(self, items: Iterable[Tuple[str, str, int]]) -> int:
+        inserted = self._db.frontier_seed(self.run_id, list(items))
+        LOGGER.info("Seeded %s new URLs into frontier run %s", inserted, self.run_id)
+        return inserted
+
+    def claim(self, limit: Optional[int] = None) -> List[FrontierItem]:
+        return self._db.frontier_claim(
+            self.run_id,
+            self.owner,
+            limit or self.batch_size,
+            self._lease_seconds,
+            self._max_attempts,
+        )
+
+    def complete(self, items: Iterable[FrontierItem]) -> None:
+        item_ids = [item.id for item in items]
+        if item_ids:
+            self._db.frontier_complete(self.owner, item_ids)
+
+    def fail(self, item: FrontierItem, error: str) -> None:
+        retry_in = self.retry_delay(item.attempts)
+        if retry_in is None:
+            LOGGER.error("Giving up on %s after %s attempts: %s", item.url, item.attempts, error)
+        else:
+            LOGGER.warning("Attempt %s for %s failed, retrying in %ss: %s", item.attempts, item.url, retry_in, error)
+        self._db.frontier_fail(self.owner, item.id, error, retry_in)
+
+    def retry_delay(self, attempts: int) -> Optional[float]:
+        if attempts >= self._max_attempts:
+            return None
+        return min(self._max_backoff_seconds, self._backoff_seconds * 2 ** (attempts - 1))
+
+    def counts(self) -> Dict[str, int]:
+        return self._db.frontier_counts(self.run_id)
+
+    def remaining(self) -> int:
+        counts = self.counts()
+        return counts.get("pending", 0) + counts.get("leased", 0)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: str
+
+
+class ValidatorStore:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_validators ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, digest TEXT NOT NULL)"
+            )
+
+    def get(self, url: str) -> Optional[Validators]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, digest FROM http_validators WHERE url=?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return Validators(etag=row[0], last_modified=row[1], digest=row[2])
+
+    def put(self, url: str, validators: Validators) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO http_validators (url, etag, last_modified, digest) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET etag=excluded.etag, "
+                "last_modified=excluded.last_modified, digest=excluded.digest",
+                (url, validators.etag, validators.last_modified, validators.digest),
+            )
+
+    def delete(self, url: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM http_validators WHERE url=?", (url,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,39 +1,314 @@
 from __future__ import annotations
 
+import hashlib
 import io
 import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, Set, Tuple
 
-import requests
 from PIL import Image
 
+from scraper import metrics
+from scraper.models import AnimeImage, ImageVariant
+from scraper.ratelimit import parse_retry_after
+from scraper.transport import Transport, record_transfer
+
+if TYPE_CHECKING:
+    from scraper.image_store import ImageBlobStore
+    from scraper.ratelimit import RateLimiter
+
 LOGGER = logging.getLogger(__name__)
 
+# (variant name, max width in pixels; 0 keeps the source width)
+VariantSpec = Tuple[str, int]
+
+DEFAULT_VARIANTS: Tuple[VariantSpec, ...] = (("full", 0),)
+
+
+def parse_variants(value: str) -> List[VariantSpec]:
+    variants: List[VariantSpec] = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, width = item.partition(":")
+        variants.append((name.strip(), int(width or 0)))
+    return variants or list(DEFAULT_VARIANTS)
 
-def download_image(url: str, timeout: float = 15) -> Optional[bytes]:
+
+def _largest_first(variants: Sequence[VariantSpec]) -> List[VariantSpec]:
+    return sorted(variants, key=lambda variant: variant[1] or float("inf"), reverse=True)
+
+
+def download_image(url: str, timeout: float = 15, transport: Optional[Transport] = None) -> Optional[bytes]:
+    owned = transport is None
+    transport = transport or Transport(pool_size=1)
     try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
-        return response.content
+        with transport.request("GET", url, timeout=timeout) as response:
+            response.raise_for_status()
+            image_bytes = response.read()
+        record_transfer(response, "image")
+        return image_bytes
     except Exception as exc:
         LOGGER.warning("Failed to download image %s: %s", url, exc)
         return None
+    finally:
+        if owned:
+            transport.close()
 
 
-def save_webp(image_bytes: bytes, output_path: Path) -> Tuple[int, int]:
+def _write_webp(img: Image.Image, output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+    img.save(tmp_path, format="WEBP")
+    os.replace(tmp_path, output_path)
+
+
+def save_webp(image_bytes: bytes, output_path: Path) -> Tuple[int, int]:
     with Image.open(io.BytesIO(image_bytes)) as img:
         rgb_img = img.convert("RGB")
-        rgb_img.save(output_path, format="WEBP")
+        _write_webp(rgb_img, output_path)
         return rgb_img.width, rgb_img.height
 
 
-def process_image(url: Optional[str], output_path: Path, timeout: float = 15) -> Optional[Tuple[str, int, int]]:
+def variant_path(output_path: Path, name: str) -> Path:
+    return output_path.with_name(f"{output_path.stem}.{name}.webp")
+
+
+def save_webp_variants(
+    image_bytes: bytes,
+    output_path: Path,
+    variants: Sequence[VariantSpec] = DEFAULT_VARIANTS,
+) -> List[ImageVariant]:
+    ordered = _largest_first(variants)
+    largest = ordered[0][1]
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if largest and img.width > largest:
+            img.draft("RGB", (largest, max(1, img.height * largest // img.width)))
+        base = img.convert("RGB")
+    results: List[ImageVariant] = []
+    for index, (name, max_width) in enumerate(ordered):
+        if max_width and base.width > max_width:
+            height = max(1, round(base.height * max_width / base.width))
+            resized = base.resize((max_width, height), Image.LANCZOS)
+        else:
+            resized = base
+        path = output_path if index == 0 else variant_path(output_path, name)
+        _write_webp(resized, path)
+        results.append(ImageVariant(name=name, local_webp_path=str(path), width=resized.width, height=resized.height))
+    return results
+
+
+def _variant_bytes(variants: Sequence[ImageVariant]) -> int:
+    return sum(os.path.getsize(variant.local_webp_path) for variant in variants)
+
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.draft("L", (64, 64))
+        small = img.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            offset = row * 9 + col
+            value = (value << 1) | int(pixels[offset] > pixels[offset + 1])
+    return value
+
+
+def process_image(
+    url: Optional[str],
+    output_path: Path,
+    timeout: float = 15,
+    transport: Optional[Transport] = None,
+) -> Optional[Tuple[str, int, int]]:
     if not url:
         return None
-    image_bytes = download_image(url, timeout=timeout)
+    image_bytes = download_image(url, timeout=timeout, transport=transport)
     if not image_bytes:
         return None
     width, height = save_webp(image_bytes, output_path)
     return url, width, height
+
+
+class ImagePipeline:
+    def __init__(
+        self,
+        timeout: float = 15,
+        download_workers: int = 4,
+        encode_workers: Optional[int] = None,
+        variants: Sequence[VariantSpec] = DEFAULT_VARIANTS,
+        max_bytes: int = 10 * 1024 * 1024,
+        blob_store: Optional[ImageBlobStore] = None,
+        rate_limiter: Optional["RateLimiter"] = None,
+        transport: Optional[Transport] = None,
+    ) -> None:
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter
+        self._blob_store = blob_store
+        self._variants = _largest_first(variants)
+        self._max_bytes = max_bytes
+        self._owns_transport = transport is None
+        self._transport = transport or Transport(pool_size=download_workers)
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="image")
+        self._encoder = ProcessPoolExecutor(max_workers=encode_workers)
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        url: Optional[str],
+        output_path: Path,
+        known: Optional[AnimeImage],
+        on_done: Callable[[AnimeImage], None],
+    ) -> Optional[Future]:
+        if not url:
+            return None
+        if known and known.original_url == url and self._is_complete(known):
+            LOGGER.debug("Poster unchanged for %s", output_path.name)
+            metrics.inc("image_skipped_total", reason="unchanged")
+            return None
+        future = self._downloads.submit(self._process, url, output_path, known, on_done)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def join(self) -> None:
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                return
+            wait(pending)
+
+    def close(self) -> None:
+        self.join()
+        self._downloads.shutdown()
+        self._encoder.shutdown()
+        if self._owns_transport:
+            self._transport.close()
+
+    def __enter__(self) -> "ImagePipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+        exc = future.exception()
+        if exc is not None:
+            LOGGER.warning("Image job failed: %s", exc)
+
+    def _process(
+        self,
+        url: str,
+        output_path: Path,
+        known: Optional[AnimeImage],
+        on_done: Callable[[AnimeImage], None],
+    ) -> None:
+        image_bytes = self._download(url)
+        if not image_bytes:
+            return
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        if known and known.source_digest == digest and self._is_complete(known):
+            metrics.inc("image_skipped_total", reason="same_digest")
+            on_done(
+                AnimeImage(
+                    original_url=url,
+                    local_webp_path=known.local_webp_path,
+                    width=known.width,
+                    height=known.height,
+                    source_digest=digest,
+                    variants=known.variants,
+                )
+            )
+            return
+        if self._blob_store is None:
+            variants = self._encode(image_bytes, output_path)
+        else:
+            variants = self._store_blob(self._blob_store, image_bytes, digest, output_path)
+        primary = variants[0]
+        on_done(
+            AnimeImage(
+                original_url=url,
+                local_webp_path=primary.local_webp_path,
+                width=primary.width,
+                height=primary.height,
+                source_digest=digest,
+                variants=variants,
+            )
+        )
+
+    def _store_blob(
+        self,
+        store: ImageBlobStore,
+        image_bytes: bytes,
+        digest: str,
+        output_path: Path,
+    ) -> List[ImageVariant]:
+        blob_variants = store.existing_variants(digest, self._variants)
+        phash = None
+        if blob_variants is None and store.uses_phash:
+            phash = self._encoder.submit(perceptual_hash, image_bytes).result()
+            similar = store.find_similar(phash)
+            if similar:
+                blob_variants = store.existing_variants(similar, self._variants)
+                if blob_variants is not None:
+                    LOGGER.debug("Poster %s reuses near-duplicate blob %s", output_path.name, similar)
+        if blob_variants is None:
+            blob_variants = self._encode(image_bytes, store.blob_path(digest))
+            if phash is not None:
+                store.remember(digest, phash)
+        else:
+            LOGGER.debug("Poster %s already stored, skipping encode", output_path.name)
+            metrics.inc("image_skipped_total", reason="blob")
+            metrics.inc("image_bytes_saved_total", _variant_bytes(blob_variants))
+        return store.link(blob_variants, output_path)
+
+    def _encode(self, image_bytes: bytes, output_path: Path) -> List[ImageVariant]:
+        with metrics.timer("image_encode_seconds"):
+            variants = self._encoder.submit(save_webp_variants, image_bytes, output_path, self._variants).result()
+        metrics.inc("image_webp_bytes_total", _variant_bytes(variants))
+        return variants
+
+    def _is_complete(self, known: AnimeImage) -> bool:
+        if not Path(known.local_webp_path).exists():
+            return False
+        stored = {variant.name: variant for variant in known.variants}
+        for name, _ in self._variants[1:]:
+            variant = stored.get(name)
+            if variant is None or not Path(variant.local_webp_path).exists():
+                return False
+        return True
+
+    def _download(self, url: str) -> Optional[bytes]:
+        try:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire(url)
+            with metrics.timer("fetch_seconds", kind="image"), self._transport.request(
+                "GET", url, timeout=self._timeout
+            ) as response:
+                metrics.inc("http_responses_total", status=response.status_code)
+                if self._rate_limiter is not None:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self._rate_limiter.feedback(url, response.status_code, retry_after)
+                response.raise_for_status()
+                length = response.headers.get("Content-Length")
+                if length and length.isdigit() and int(length) > self._max_bytes:
+                    raise ValueError(f"poster is {length} bytes, limit is {self._max_bytes}")
+                chunks: List[bytes] = []
+                for chunk in response.iter_bytes():
+                    if response.decoded_bytes > self._max_bytes:
+                        raise ValueError(f"poster exceeds {self._max_bytes} bytes")
+                    chunks.append(chunk)
+            record_transfer(response, "image")
+            return b"".join(chunks)
+        except Exception as exc:
+            LOGGER.warning("Failed to download image %s: %s", url, exc)
+            return None
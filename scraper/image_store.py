@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from PIL import Image
+
+from scraper.image_pipeline import VariantSpec, variant_path
+from scraper.models import ImageVariant
+
+LOGGER = logging.getLogger(__name__)
+
+LINK_MODES = ("hardlink", "reference")
+
+_PHASH_MASK = (1 << 64) - 1
+
+
+class ImageBlobStore:
+    def __init__(self, root: Path, link_mode: str = "hardlink", phash_distance: int = -1) -> None:
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unsupported image link mode: {link_mode}")
+        self._root = root
+        self._link_mode = link_mode
+        self._phash_distance = phash_distance
+        root.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(root / "index.sqlite3"), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS phash (digest TEXT PRIMARY KEY, phash INTEGER NOT NULL)"
+            )
+            rows = self._conn.execute("SELECT digest, phash FROM phash").fetchall()
+        self._phashes = {digest: value & _PHASH_MASK for digest, value in rows}
+
+    @property
+    def uses_phash(self) -> bool:
+        return self._phash_distance >= 0
+
+    def blob_path(self, digest: str) -> Path:
+        return self._root / digest[:2] / f"{digest}.webp"
+
+    def find_similar(self, phash: int) -> Optional[str]:
+        best = None
+        best_distance = self._phash_distance + 1
+        with self._lock:
+            candidates = list(self._phashes.items())
+        for digest, value in candidates:
+            distance = (value ^ phash).bit_count()
+            if distance < best_distance:
+                best, best_distance = digest, distance
+        return best
+
+    def remember(self, digest: str, phash: int) -> None:
+        # SQLite integers are signed 64-bit, the hash is unsigned.
+        stored = phash - (1 << 64) if phash >= 1 << 63 else phash
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO phash (digest, phash) VALUES (?, ?)",
+                (digest, stored),
+            )
+            self._phashes[digest] = phash
+
+    def existing_variants(self, digest: str, variants: Sequence[VariantSpec]) -> Optional[List[ImageVariant]]:
+        primary = self.blob_path(digest)
+        results: List[ImageVariant] = []
+        for index, (name, _) in enumerate(variants):
+            path = primary if index == 0 else variant_path(primary, name)
+            if not path.exists():
+                return None
+            with Image.open(path) as img:
+                width, height = img.size
+            results.append(ImageVariant(name=name, local_webp_path=str(path), width=width, height=height))
+        return results
+
+    def link(self, blob_variants: Sequence[ImageVariant], output_path: Path) -> List[ImageVariant]:
+        if self._link_mode == "reference":
+            return list(blob_variants)
+        linked: List[ImageVariant] = []
+        for index, variant in enumerate(blob_variants):
+            path = output_path if index == 0 else variant_path(output_path, variant.name)
+            if not self._hardlink(Path(variant.local_webp_path), path):
+                linked.append(variant)
+                continue
+            linked.append(
+                ImageVariant(name=variant.name, local_webp_path=str(path), width=variant.width, height=variant.height)
+            )
+        return linked
+
+    def _hardlink(self, blob: Path, path: Path) -> bool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.link")
+        try:
+            os.link(blob, tmp_path)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as exc:
+            LOGGER.warning("Cannot hardlink %s to %s, using blob path: %s", path, blob, exc)
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
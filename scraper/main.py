@@ -2,26 +2,105 @@ from __future__ import annotations
 
 import argparse
 import logging
+from dataclasses import asdict
 from pathlib import Path
+from typing import List, Optional, Tuple
 
+from scraper import metrics
 from scraper.config import Config
 from scraper.db import Database
-from scraper.fetcher import Fetcher
+from scraper.archive import HtmlArchive
+from scraper.browser_pool import BrowserPool
+from scraper.fetcher import Fetcher, ReplayFetcher
+from scraper.frontier import CrawlFrontier
+from scraper.http_cache import ValidatorStore
+from scraper.image_pipeline import ImagePipeline, parse_variants
+from scraper.image_store import ImageBlobStore
+from scraper.models import RunSummary
 from scraper.parser_list import parse_anime_list
+from scraper.ratelimit import AdaptiveRateLimiter, RateLimiter, rate_from_interval
+from scraper.soup import set_backend
+from scraper.transport import Transport
 from scraper.updater import Updater
+from scraper.workers import run_sharded, shard_run_id
 
 ANIME_LIST_URL = "https://otakudesu.best/anime-list"
 
+LOGGER = logging.getLogger(__name__)
+
 
 def configure_logging() -> None:
     logging.basicConfig(
         level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        format="%(asctime)s [%(levelname)s] %(processName)s %(name)s: %(message)s",
     )
 
 
-def run(mode: str) -> None:
+def build_fetcher(
+    config: Config,
+    concurrency: int,
+    archive_dir: Optional[Path],
+    replay: bool,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> Tuple[Fetcher, Optional[BrowserPool]]:
+    archive = HtmlArchive(archive_dir) if archive_dir else None
+    if replay:
+        if archive is None:
+            raise ValueError("Replay mode needs --archive-dir or ARCHIVE_DIR")
+        return ReplayFetcher(archive), None
+    validator_store = ValidatorStore(config.http_cache_path) if config.http_cache_path else None
+    if rate_limiter is None and config.rate_limit_mode == "adaptive":
+        rate_limiter = AdaptiveRateLimiter(
+            rate_from_interval(config.rate_limit_seconds),
+            min_rate=config.rate_limit_min_rps,
+            max_rate=config.rate_limit_max_rps,
+        )
+    browser_pool = None
+    if config.use_js:
+        browser_pool = BrowserPool(
+            size=config.browser_pool_size,
+            timeout=config.request_timeout,
+            wait_until=config.js_wait_until,
+        )
+    transport = Transport(pool_size=max(10, concurrency) + config.image_workers, backend=config.http_transport)
+    fetcher = Fetcher(
+        config.rate_limit_seconds,
+        config.request_timeout,
+        validator_store=validator_store,
+        archive=archive,
+        browser_pool=browser_pool,
+        use_js=config.use_js,
+        rate_limiter=rate_limiter,
+        transport=transport,
+    )
+    return fetcher, browser_pool
+
+
+def fetch_anime_list(fetcher: Fetcher, list_url: str = ANIME_LIST_URL) -> List[str]:
+    list_html = fetcher.fetch_html(list_url)
+    anime_urls = parse_anime_list(list_html, list_url)
+    LOGGER.info("Found %s anime entries", len(anime_urls))
+    return anime_urls
+
+
+def db_pool_size(config: Config, concurrency: int) -> int:
+    return max(concurrency, config.fetch_workers) + config.persist_workers + config.image_workers + 2
+
+
+def update(
+    mode: str,
+    anime_urls: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    archive_dir: Optional[Path] = None,
+    replay: bool = False,
+    run_id: Optional[str] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    shard: Optional[Tuple[int, int]] = None,
+) -> RunSummary:
+    if mode not in ("full", "daily_update"):
+        raise ValueError(f"Unsupported mode: {mode}")
     config = Config.from_env()
+    set_backend(config.parser_backend)
     image_dir = Path(config.image_dir)
     image_dir.mkdir(parents=True, exist_ok=True)
     db = Database(
@@ -30,29 +109,164 @@ def run(mode: str) -> None:
         user=config.db_user,
         password=config.db_password,
         database=config.db_name,
+        pool_size=db_pool_size(config, concurrency or config.concurrency),
+    )
+    concurrency = concurrency or config.concurrency
+    fetcher, browser_pool = build_fetcher(
+        config, concurrency, archive_dir or config.archive_dir, replay, rate_limiter
     )
-    fetcher = Fetcher(config.rate_limit_seconds, config.request_timeout)
-    updater = Updater(db, fetcher, image_dir)
+    image_pipeline = None
+    if not replay and config.image_workers > 0:
+        blob_store = None
+        if config.image_dedup != "off":
+            blob_store = ImageBlobStore(
+                image_dir / "blobs",
+                link_mode=config.image_dedup,
+                phash_distance=config.image_phash_distance,
+            )
+        image_pipeline = ImagePipeline(
+            timeout=config.request_timeout,
+            download_workers=config.image_workers,
+            variants=parse_variants(config.image_variants),
+            max_bytes=config.image_max_bytes,
+            blob_store=blob_store,
+            rate_limiter=fetcher.rate_limiter,
+            transport=fetcher.transport,
+        )
+    updater = Updater(
+        db,
+        fetcher,
+        image_dir,
+        concurrency=concurrency,
+        process_images=not replay,
+        download_sync=config.download_sync,
+        write_batch_size=config.write_batch_size,
+        write_flush_seconds=config.write_flush_seconds,
+        incremental_pages=config.incremental_pages,
+        page_refresh_seconds=config.page_refresh_hours * 3600,
+        image_pipeline=image_pipeline,
+        fetch_workers=config.fetch_workers,
+        parse_workers=config.parse_workers,
+        persist_workers=config.persist_workers,
+        stage_queue_size=config.stage_queue_size,
+    )
+    frontier = None
+    if run_id:
+        frontier = CrawlFrontier(
+            db,
+            shard_run_id(run_id, shard) if shard else run_id,
+            batch_size=config.frontier_batch_size,
+            lease_seconds=config.frontier_lease_seconds,
+            max_attempts=config.frontier_max_attempts,
+        )
+
+    try:
+        if anime_urls is None:
+            anime_urls = fetch_anime_list(fetcher, config.anime_list_url)
+        if mode == "full":
+            return updater.full_update(anime_urls, frontier=frontier)
+        return updater.daily_update(anime_urls, frontier=frontier)
+    finally:
+        if image_pipeline is not None:
+            image_pipeline.close()
+        if browser_pool is not None:
+            browser_pool.close()
+        fetcher.transport.close()
 
-    list_html = fetcher.fetch_html(ANIME_LIST_URL)
-    anime_urls = parse_anime_list(list_html, ANIME_LIST_URL)
-    logging.getLogger(__name__).info("Found %s anime entries", len(anime_urls))
 
-    if mode == "full":
-        updater.full_update(anime_urls)
-    elif mode == "daily_update":
-        updater.daily_update(anime_urls)
+def run(
+    mode: str,
+    concurrency: Optional[int] = None,
+    archive_dir: Optional[Path] = None,
+    replay: bool = False,
+    run_id: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> RunSummary:
+    config = Config.from_env()
+    workers = workers or config.workers
+    if workers <= 1:
+        summary = update(mode, concurrency=concurrency, archive_dir=archive_dir, replay=replay, run_id=run_id)
     else:
-        raise ValueError(f"Unsupported mode: {mode}")
+        set_backend(config.parser_backend)
+        fetcher, browser_pool = build_fetcher(
+            config, concurrency or config.concurrency, archive_dir or config.archive_dir, replay
+        )
+        try:
+            anime_urls = fetch_anime_list(fetcher, config.anime_list_url)
+        finally:
+            if browser_pool is not None:
+                browser_pool.close()
+            fetcher.transport.close()
+        summary = run_sharded(
+            update,
+            anime_urls,
+            workers,
+            rate=0.0 if replay else rate_from_interval(config.rate_limit_seconds),
+            setup=configure_logging,
+            mode=mode,
+            concurrency=concurrency,
+            archive_dir=archive_dir,
+            replay=replay,
+            run_id=run_id,
+        )
+    LOGGER.info("Run summary: %s", asdict(summary))
+    for kind in ("page", "image"):
+        LOGGER.info(
+            "Transferred %s %s bytes over the wire (%s decoded)",
+            int(metrics.REGISTRY.counter("fetch_wire_bytes_total", kind=kind)),
+            kind,
+            int(metrics.REGISTRY.counter("fetch_bytes_total", kind=kind)),
+        )
+    if config.report_dir:
+        report_path = metrics.write_report(config.report_dir, mode, asdict(summary))
+        LOGGER.info("Run report written to %s", report_path)
+    if config.metrics_textfile:
+        metrics.write_textfile(config.metrics_textfile)
+    return summary
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Anime scraper for otakudesu.best")
     parser.add_argument("--mode", choices=["full", "daily_update"], required=True)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Requests in flight per host (1 = serial fetcher, default from CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        default=None,
+        help="Write every fetched page into this archive (default from ARCHIVE_DIR)",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve all pages from the archive with no network I/O (posters are skipped)",
+    )
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="Crawl through the persistent frontier under this id; rerun with the same id to resume",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Scraper processes, sharded by slug with one shared rate limit (default from WORKERS)",
+    )
     return parser
 
 
 if __name__ == "__main__":
     configure_logging()
     args = build_parser().parse_args()
-    run(args.mode)
+    run(
+        args.mode,
+        concurrency=args.concurrency,
+        archive_dir=args.archive_dir,
+        replay=args.replay,
+        run_id=args.run_id,
+        workers=args.workers,
+    )
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+
+PREFIX = "anime_scraper_"
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def histogram(self, name: str, **labels: Any) -> Histogram:
+        with self._lock:
+            return self._histograms.get((name, _labels(labels))) or Histogram()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": list(histogram.buckets),
+                        "counts": list(histogram.counts),
+                        "sum": histogram.sum,
+                        "count": histogram.count,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                    }
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+            }
+
+    def merge(self, snapshot: Dict[str, List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            for item in snapshot.get("counters", []):
+                key = (item["name"], _labels(item["labels"]))
+                self._counters[key] = self._counters.get(key, 0) + item["value"]
+            for item in snapshot.get("histograms", []):
+                key = (item["name"], _labels(item["labels"]))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(item["buckets"])
+                histogram.counts = [a + b for a, b in zip(histogram.counts, item["counts"])]
+                histogram.sum += item["sum"]
+                histogram.count += item["count"]
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric = PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+
+def timed(name: str, **labels: Any) -> Callable[[F], F]:
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with REGISTRY.timer(name, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def write_textfile(path: Path, registry: Registry = REGISTRY) -> None:
+    _write_atomic(path, registry.to_prometheus())
+
+
+def write_report(report_dir: Path, mode: str, summary: Dict[str, Any], registry: Registry = REGISTRY) -> Path:
+    finished_at = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    path = report_dir / f"run-{finished_at}-{mode}.json"
+    report = {"mode": mode, "finished_at": finished_at, "summary": summary, "metrics": registry.snapshot()}
+    _write_atomic(path, json.dumps(report, indent=2, sort_keys=True))
+    return path
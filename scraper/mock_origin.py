@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from scraper.archive import HtmlArchive
+from scraper.synthetic import BASE_URL, SyntheticSite, poster_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OriginBehavior:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (429, 503, 500, 502)
+    retry_after: int = 1
+    poster_size: Tuple[int, int] = (225, 320)
+    gzip_html: bool = True
+
+
+class MockOrigin:
+    def __init__(
+        self,
+        site: Optional[SyntheticSite] = None,
+        archive: Optional[HtmlArchive] = None,
+        behavior: OriginBehavior = OriginBehavior(),
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ) -> None:
+        if site is None and archive is None:
+            raise ValueError("MockOrigin needs a synthetic site or an archive")
+        self._site = site
+        self._archive = archive
+        self.behavior = behavior
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def list_url(self) -> str:
+        return f"{self.base_url}/anime-list"
+
+    def start(self) -> "MockOrigin":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-origin", daemon=True)
+        self._thread.start()
+        LOGGER.info("Mock origin listening on %s", self.base_url)
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockOrigin":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def mutate(self, fraction: float) -> List[str]:
+        if self._site is None:
+            raise ValueError("Only a synthetic site can be mutated")
+        with self._lock:
+            count = round(len(self._site.slugs) * fraction)
+            slugs = self._rng.sample(self._site.slugs, count)
+        for slug in slugs:
+            self._site.bump(slug)
+        LOGGER.info("Mutated %s anime", len(slugs))
+        return slugs
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "max_in_flight": self._max_in_flight}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.behavior.latency + self._rng.uniform(0, self.behavior.jitter)
+
+    def _injected_error(self) -> Optional[int]:
+        with self._lock:
+            if self.behavior.error_rate and self._rng.random() < self.behavior.error_rate:
+                return self._rng.choice(self.behavior.error_statuses)
+        return None
+
+    def _page(self, path: str) -> Optional[str]:
+        url = BASE_URL + path
+        html = None
+        if self._site is not None:
+            html = self._site.page(url)
+        elif self._archive is not None:
+            html = self._archive.get(url) or self._archive.get(url.rstrip("/"))
+        if html is None:
+            return None
+        return html.replace(BASE_URL, self.base_url)
+
+    def _handler_class(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args) -> None:
+                LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+            def do_GET(self) -> None:
+                origin._enter()
+                try:
+                    self._serve()
+                finally:
+                    origin._leave()
+
+            def do_POST(self) -> None:
+                parts = urlsplit(self.path)
+                if parts.path != "/_mock/mutate":
+                    self._send(404, b"not found", "text/plain")
+                    return
+                fraction = float(parse_qs(parts.query).get("fraction", ["0.1"])[0])
+                body = json.dumps({"mutated": origin.mutate(fraction)}).encode("utf-8")
+                self._send(200, body, "application/json")
+
+            def _serve(self) -> None:
+                path = urlsplit(self.path).path
+                if path == "/_mock/stats":
+                    self._send(200, json.dumps(origin.stats()).encode("utf-8"), "application/json")
+                    return
+                delay = origin._delay()
+                if delay > 0:
+                    time.sleep(delay)
+                status = origin._injected_error()
+                if status is not None:
+                    origin._count(f"status_{status}")
+                    headers = {}
+                    if status in (429, 503):
+                        headers["Retry-After"] = str(origin.behavior.retry_after)
+                    self._send(status, b"injected error", "text/plain", headers)
+                    return
+                if path.startswith("/wp-content/"):
+                    width, height = origin.behavior.poster_size
+                    seed = int(hashlib.sha256(path.encode("utf-8")).hexdigest()[:8], 16)
+                    body = poster_bytes(width, height, seed=seed)
+                    content_type = "image/jpeg"
+                else:
+                    html = origin._page(path)
+                    if html is None:
+                        origin._count("status_404")
+                        self._send(404, b"not found", "text/plain")
+                        return
+                    body = html.encode("utf-8")
+                    content_type = "text/html; charset=UTF-8"
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    origin._count("status_304")
+                    self._send(304, b"", content_type, {"ETag": etag})
+                    return
+                origin._count("status_200")
+                headers = {"ETag": etag}
+                accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+                if origin.behavior.gzip_html and content_type.startswith("text/html") and accepts_gzip:
+                    body = gzip.compress(body)
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Vary"] = "Accept-Encoding"
+                self._send(200, body, content_type, headers)
+
+            def _send(
+                self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None
+            ) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body and status != 304:
+                    self.wfile.write(body)
+
+        return Handler
+
+
+def _statuses(value: str) -> Tuple[int, ...]:
+    return tuple(int(item) for item in value.split(",") if item.strip())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local otakudesu-like origin for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--archive-dir", type=Path, default=None, help="Serve an HtmlArchive instead of a synthetic site"
+    )
+    parser.add_argument("--anime", type=int, default=500)
+    parser.add_argument("--episodes", type=int, default=12)
+    parser.add_argument("--rows", type=int, default=30, help="Rows per download table")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mutate", type=float, default=0.0, help="Share of anime to change before serving")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-statuses", type=_statuses, default=(429, 503, 500, 502))
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--no-gzip", action="store_true", help="Serve HTML uncompressed")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    site = None
+    archive = None
+    if args.archive_dir:
+        archive = HtmlArchive(args.archive_dir)
+    else:
+        site = SyntheticSite(args.anime, episodes=args.episodes, download_rows=args.rows, seed=args.seed)
+    behavior = OriginBehavior(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        retry_after=args.retry_after,
+        gzip_html=not args.no_gzip,
+    )
+    origin = MockOrigin(site, archive, behavior, host=args.host, port=args.port, seed=args.seed)
+    if args.mutate:
+        origin.mutate(args.mutate)
+    origin.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        origin.stop()
+        LOGGER.info("Served: %s", origin.stats())
+
+
+if __name__ == "__main__":
+    main()
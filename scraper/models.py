@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
 
 
 @dataclass
@@ -25,6 +26,17 @@ class AnimeDownload:
     size: Optional[str]
     provider: Optional[str]
     url: str
+    size_bytes: Optional[int] = None
+    resolution_px: Optional[int] = None
+    provider_slug: Optional[str] = None
+
+
+@dataclass
+class ImageVariant:
+    name: str
+    local_webp_path: str
+    width: int
+    height: int
 
 
 @dataclass
@@ -33,3 +45,49 @@ class AnimeImage:
     local_webp_path: str
     width: int
     height: int
+    source_digest: Optional[str] = None
+    variants: List[ImageVariant] = field(default_factory=list)
+
+
+@dataclass
+class AnimeIndexEntry:
+    id: int
+    status: Optional[str]
+    detail_hash: Optional[str]
+    updated_at: Optional[datetime]
+
+
+@dataclass
+class DownloadPageState:
+    fingerprint: str
+    fresh: bool
+
+
+@dataclass
+class FrontierItem:
+    id: int
+    url: str
+    kind: str
+    attempts: int
+
+
+@dataclass
+class RunSummary:
+    anime_seen: int = 0
+    skipped_inactive: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    stored: int = 0
+    failed: int = 0
+    downloads_added: int = 0
+    downloads_removed: int = 0
+    elapsed_seconds: float = 0.0
+
+
+@dataclass
+class CatalogEntry:
+    id: int
+    anime: Anime
+    updated_at: Optional[datetime]
+    image: Optional[AnimeImage] = None
+    downloads: List[AnimeDownload] = field(default_factory=list)
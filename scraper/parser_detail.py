@@ -4,7 +4,10 @@ import re
 from typing import List, Optional, Tuple
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+
+from scraper import metrics
+from scraper.soup import make_soup
 
 
 def _text_or_none(element) -> Optional[str]:
@@ -25,7 +28,76 @@ def _normalize_label(link, fallback_url: str) -> str:
     return fallback_url
 
 
-def _collect_downloads(soup: BeautifulSoup, base_url: str) -> List[Tuple[str, str]]:
+# Class chains of the preferred download selectors, highest priority first.
+_DOWNLOAD_CLASS_CHAINS: Tuple[Tuple[str, ...], ...] = (
+    ("download", "linkdl"),
+    ("download", "dl-box"),
+    ("download",),
+    ("linkdownload",),
+    ("download-link",),
+    ("batchlink",),
+    ("batch",),
+)
+_CONTAINER_REGEX = re.compile(r"(download|dl|mirror|batch)", re.IGNORECASE)
+_HREF_REGEX = re.compile(r"(download|mirror|batch|mega|drive|gdrive|zippy|mediafire)", re.IGNORECASE)
+_FORMAT_REGEX = re.compile(r"\b(mp4|mkv|avi|flv|webm|3gp)\b", re.IGNORECASE)
+_RESOLUTION_REGEX = re.compile(r"\b\d{3,4}p\b", re.IGNORECASE)
+_SIZE_REGEX = re.compile(r"\b\d+(?:\.\d+)?\s*(?:GB|MB)\b", re.IGNORECASE)
+_HEADINGS = frozenset(("h4", "h3", "h2", "h1"))
+
+
+def _advance_chains(progress: Tuple[int, ...], classes) -> Tuple[int, ...]:
+    return tuple(
+        matched + 1 if matched < len(chain) and chain[matched] in classes else matched
+        for matched, chain in zip(progress, _DOWNLOAD_CLASS_CHAINS)
+    )
+
+
+def _container_key(element, order: int) -> Optional[Tuple[int, int]]:
+    if any(_CONTAINER_REGEX.search(value) for value in element.get("class") or ()):
+        return (0, order)
+    element_id = element.get("id")
+    if element_id and _CONTAINER_REGEX.search(element_id):
+        return (1, order)
+    return None
+
+
+def _collect_links(soup: BeautifulSoup, base_url: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    # One walk classifies every anchor; the tiers keep the old selector priority.
+    selector_hits: List[Tuple[int, Tag]] = []
+    container_hits: List[Tuple[Tuple[int, int], int, Tag]] = []
+    href_hits: List[Tag] = []
+    pages: List[str] = []
+    seen_pages = set()
+
+    no_progress = (0,) * len(_DOWNLOAD_CLASS_CHAINS)
+    states = {id(soup): (no_progress, None)}
+    for order, element in enumerate(soup.descendants):
+        if not isinstance(element, Tag):
+            continue
+        progress, container = states[id(element.parent)]
+        if element.name == "a" and element.has_attr("href"):
+            for rank, (matched, chain) in enumerate(zip(progress, _DOWNLOAD_CLASS_CHAINS)):
+                if matched == len(chain):
+                    selector_hits.append((rank, element))
+                    break
+            if container is not None:
+                container_hits.append((container, order, element))
+            href = element.get("href")
+            if href:
+                if _HREF_REGEX.search(href):
+                    href_hits.append(element)
+                if "/batch/" in href or "/episode/" in href:
+                    absolute_url = urljoin(base_url, href)
+                    if absolute_url not in seen_pages:
+                        seen_pages.add(absolute_url)
+                        pages.append(absolute_url)
+        classes = element.get("class") or ()
+        own_container = _container_key(element, order)
+        if own_container is not None and (container is None or own_container < container):
+            container = own_container
+        states[id(element)] = (_advance_chains(progress, classes), container)
+
     downloads: List[Tuple[str, str]] = []
     seen = set()
 
@@ -41,89 +113,65 @@ def _collect_downloads(soup: BeautifulSoup, base_url: str) -> List[Tuple[str, st
         seen.add(key)
         downloads.append((label, absolute_url))
 
-    selectors = [
-        ".download .linkdl a[href]",
-        ".download .dl-box a[href]",
-        ".download a[href]",
-        ".linkdownload a[href]",
-        ".download-link a[href]",
-        ".batchlink a[href]",
-        ".batch a[href]",
-    ]
-    for selector in selectors:
-        for link in soup.select(selector):
-            add_link(link)
-
+    for _, link in sorted(selector_hits, key=lambda hit: hit[0]):
+        add_link(link)
     if downloads:
-        return downloads
-
-    container_regex = re.compile(r"(download|dl|mirror|batch)", re.IGNORECASE)
-    container_candidates = []
-    container_candidates.extend(soup.find_all(class_=container_regex))
-    container_candidates.extend(soup.find_all(id=container_regex))
-    for container in {id(elem): elem for elem in container_candidates}.values():
-        for link in container.select("a[href]"):
-            add_link(link)
+        return downloads, pages
 
+    for _, _, link in sorted(container_hits, key=lambda hit: (hit[0], hit[1])):
+        add_link(link)
     if downloads:
-        return downloads
+        return downloads, pages
 
-    href_regex = re.compile(r"(download|mirror|batch|mega|drive|gdrive|zippy|mediafire)", re.IGNORECASE)
-    for link in soup.select("a[href]"):
-        href = link.get("href", "")
-        if href_regex.search(href):
-            add_link(link)
-
-    return downloads
-
-
-def _collect_download_pages(soup: BeautifulSoup, base_url: str) -> List[str]:
-    pages: List[str] = []
-    seen = set()
-    for link in soup.select("a[href]"):
-        href = link.get("href")
-        if not href:
-            continue
-        if "/batch/" not in href and "/episode/" not in href:
-            continue
-        absolute_url = urljoin(base_url, href)
-        if absolute_url in seen:
-            continue
-        seen.add(absolute_url)
-        pages.append(absolute_url)
-    return pages
+    for link in href_hits:
+        add_link(link)
+    return downloads, pages
 
 
 def _parse_format_resolution(text: str) -> Tuple[Optional[str], Optional[str]]:
     format_value = None
     resolution_value = None
-    format_match = re.search(r"\b(mp4|mkv|avi|flv|webm|3gp)\b", text, re.IGNORECASE)
+    format_match = _FORMAT_REGEX.search(text)
     if format_match:
         format_value = format_match.group(1).upper()
-    resolution_match = re.search(r"\b\d{3,4}p\b", text, re.IGNORECASE)
+    resolution_match = _RESOLUTION_REGEX.search(text)
     if resolution_match:
         resolution_value = resolution_match.group(0)
     return format_value, resolution_value
 
 
 def _parse_size(text: str) -> Optional[str]:
-    size_match = re.search(r"\b\d+(?:\.\d+)?\s*(?:GB|MB)\b", text, re.IGNORECASE)
+    size_match = _SIZE_REGEX.search(text)
     if size_match:
         return size_match.group(0)
     return None
 
 
+def _tables_with_headings(soup: BeautifulSoup) -> List[Tuple[Tag, Optional[Tag]]]:
+    tables: List[Tuple[Tag, Optional[Tag]]] = []
+    heading = None
+    for element in soup.descendants:
+        if not isinstance(element, Tag):
+            continue
+        if element.name == "table":
+            tables.append((element, heading))
+        elif element.name in _HEADINGS:
+            heading = element
+    return tables
+
+
+@metrics.timed("parse_seconds", page="download_page")
 def parse_download_page(
     html: str,
     base_url: str,
+    backend: Optional[str] = None,
 ) -> List[Tuple[Optional[str], Optional[str], Optional[str], Optional[str], str, str]]:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html, backend=backend)
     downloads: List[Tuple[Optional[str], Optional[str], Optional[str], Optional[str], str, str]] = []
     seen = set()
-    for table in soup.select("table"):
-        if not table.select("a[href]"):
+    for table, heading in _tables_with_headings(soup):
+        if table.select_one("a[href]") is None:
             continue
-        heading = table.find_previous(["h4", "h3", "h2", "h1"])
         section_title = heading.get_text(" ", strip=True) if heading else None
         for row in table.select("tr"):
             links = row.select("a[href]")
@@ -146,7 +194,8 @@ def parse_download_page(
     return downloads
 
 
-def parse_anime_detail(html: str, base_url: str) -> Tuple[
+@metrics.timed("parse_seconds", page="detail")
+def parse_anime_detail(html: str, base_url: str, backend: Optional[str] = None) -> Tuple[
     str,
     str,
     Optional[str],
@@ -156,7 +205,7 @@ def parse_anime_detail(html: str, base_url: str) -> Tuple[
     List[Tuple[str, str]],
     List[str],
 ]:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = make_soup(html, backend=backend)
     title = _text_or_none(soup.select_one("h1")) or _text_or_none(
         soup.select_one(".infox h1")
     )
@@ -182,8 +231,7 @@ def parse_anime_detail(html: str, base_url: str) -> Tuple[
     poster_img = soup.select_one(".fotoanime img") or soup.select_one(".poster img")
     if poster_img and poster_img.get("src"):
         poster_url = urljoin(base_url, poster_img["src"])
-    downloads = _collect_downloads(soup, base_url)
-    download_pages = _collect_download_pages(soup, base_url)
+    downloads, download_pages = _collect_links(soup, base_url)
     title_value = title or "Unknown"
     return (
         title_value,
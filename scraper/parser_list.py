@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-from typing import List, Set
+from typing import List, Optional, Set
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 
+from scraper import metrics
+from scraper.soup import make_soup
 
-def parse_anime_list(html: str, base_url: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
+# Only anchors matter for the list page, so skip building the rest of the tree.
+_ANCHORS = SoupStrainer("a", href=True)
+
+
+@metrics.timed("parse_seconds", page="list")
+def parse_anime_list(html: str, base_url: str, backend: Optional[str] = None) -> List[str]:
+    soup = make_soup(html, parse_only=_ANCHORS, backend=backend)
     links: Set[str] = set()
     for anchor in soup.select("a[href]"):
         href = anchor.get("href")
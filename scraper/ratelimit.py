@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, url: Optional[str] = None) -> float:
+        if self._rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def acquire(self, url: Optional[str] = None) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def feedback(self, url: str, status: int, retry_after: Optional[float] = None) -> None:
+        pass
+
+
+class SharedTokenBucket(TokenBucket):
+    # State lives in shared memory; hand it to child processes at creation time.
+    def __init__(self, rate: float, capacity: float = 1.0, context: Optional[Any] = None) -> None:
+        ctx = context or multiprocessing.get_context()
+        self._rate = rate
+        self._capacity = capacity
+        self._state = ctx.RawArray("d", [capacity, time.monotonic()])
+        self._lock = ctx.Lock()
+
+    def reserve(self, url: Optional[str] = None) -> float:
+        if self._rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self._capacity, self._state[0] + (now - self._state[1]) * self._rate) - 1
+            self._state[0] = tokens
+            self._state[1] = now
+            if tokens >= 0:
+                return 0.0
+            return -tokens / self._rate
+
+
+def rate_from_interval(seconds: float) -> float:
+    return 1.0 / seconds if seconds > 0 else 0.0
+
+
+@dataclass
+class _HostState:
+    rate: float
+    next_at: float = 0.0
+    blocked_until: float = 0.0
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float = 0.2,
+        max_rate: float = 4.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        jitter: float = 0.1,
+        throttle_statuses: Tuple[int, ...] = (429, 503),
+        seed: Optional[int] = None,
+    ) -> None:
+        self._min_rate = min_rate
+        self._max_rate = max(min_rate, max_rate)
+        self._initial_rate = min(self._max_rate, max(min_rate, initial_rate or self._max_rate))
+        self._increase = increase
+        self._decrease = decrease
+        self._jitter = jitter
+        self._throttle_statuses = throttle_statuses
+        self._random = random.Random(seed)
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, url: Optional[str]) -> _HostState:
+        host = urlsplit(url).netloc if url else ""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(rate=self._initial_rate)
+        return state
+
+    def rate(self, url: Optional[str] = None) -> float:
+        with self._lock:
+            return self._state(url).rate
+
+    def reserve(self, url: Optional[str] = None) -> float:
+        with self._lock:
+            state = self._state(url)
+            now = time.monotonic()
+            start = max(now, state.next_at, state.blocked_until)
+            spread = self._random.uniform(1 - self._jitter, 1 + self._jitter)
+            state.next_at = start + spread / state.rate
+            return start - now
+
+    def acquire(self, url: Optional[str] = None) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def feedback(self, url: str, status: int, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            state = self._state(url)
+            if status in self._throttle_statuses:
+                previous = state.rate
+                state.rate = max(self._min_rate, state.rate * self._decrease)
+                now = time.monotonic()
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+                state.next_at = max(state.next_at, now + 1 / state.rate)
+                LOGGER.info(
+                    "%s throttled (%s): %.2f -> %.2f req/s, retry after %.1fs",
+                    urlsplit(url).netloc,
+                    status,
+                    previous,
+                    state.rate,
+                    retry_after or 0,
+                )
+            elif status < 500:
+                state.rate = min(self._max_rate, state.rate + self._increase)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date.
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+RateLimiter = Union[TokenBucket, AdaptiveRateLimiter]
@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from scraper import metrics
+from scraper.bitmap_index import BitmapIndex
+from scraper.config import Config
+from scraper.db import Database
+from scraper.models import Anime
+from scraper.utils import split_genres
+
+LOGGER = logging.getLogger(__name__)
+
+
+# A hit in the title outranks one in the genres, which outranks the synopsis.
+FIELD_WEIGHTS = (("title", 3.0), ("genres", 2.0), ("synopsis", 1.0))
+
+STOPWORDS = frozenset(
+    {
+        # Indonesian function words (and the "Sub Indo" every title carries)
+        "dan", "yang", "di", "ke", "dari", "ini", "itu", "untuk", "dengan", "pada", "adalah", "dalam",
+        "tidak", "akan", "juga", "atau", "oleh", "karena", "sebuah", "seorang", "para", "ia", "nya",
+        "sub", "indo",
+        # romanized Japanese particles
+        "no", "wa", "ga", "wo", "ni", "de", "to", "mo", "e", "o",
+    }
+)
+
+_WORD = re.compile(r"[^\W_]+")
+_LONG_VOWEL = re.compile(r"([aeiu])\1+|o+u?(?=[^aeiou]|$)")
+
+
+def _fold(token: str) -> str:
+    token = _LONG_VOWEL.sub(lambda match: match.group(0)[0], token)
+    if len(token) > 5 and token.endswith("nya"):
+        token = token[:-3]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [_fold(word) for word in _WORD.findall(text) if word not in STOPWORDS]
+
+
+@dataclass
+class SearchDoc:
+    id: int
+    slug: str
+    title: str
+    synopsis: str
+    status: Optional[str]
+    type: Optional[str]
+    genres: List[str] = field(default_factory=list)
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_anime(cls, anime_id: int, anime: Anime, updated_at: Optional[datetime]) -> "SearchDoc":
+        return cls(
+            id=anime_id,
+            slug=anime.slug,
+            title=anime.title,
+            synopsis=anime.synopsis,
+            status=anime.status,
+            type=anime.type,
+            genres=split_genres(anime.genres),
+            updated_at=updated_at,
+        )
+
+    def to_json(self, synopsis: bool = True) -> Dict[str, Any]:
+        data = asdict(self)
+        data["updated_at"] = self.updated_at.isoformat() if self.updated_at else None
+        if not synopsis:
+            del data["synopsis"]
+        return data
+
+
+def _facets(genres: Sequence[str] = (), status: Optional[str] = None, type: Optional[str] = None) -> List[str]:
+    facets = [f"genre:{genre}" for genre in genres]
+    if status:
+        facets.append(f"status:{status}")
+    if type:
+        facets.append(f"type:{type}")
+    return facets
+
+
+class SearchIndex:
+    # Not thread-safe on its own; SearchService serializes access.
+    def __init__(self) -> None:
+        self._docs: Dict[int, SearchDoc] = {}
+        self._by_slug: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._terms: Dict[int, List[str]] = {}
+        self._facets = BitmapIndex()
+        self._vocabulary: List[str] = []
+        self._vocabulary_stale = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc: SearchDoc) -> None:
+        self.remove(doc.id)
+        weights: Dict[str, float] = {}
+        for name, weight in FIELD_WEIGHTS:
+            value = ", ".join(doc.genres) if name == "genres" else getattr(doc, name)
+            for token in tokenize(value or ""):
+                weights[token] = weights.get(token, 0.0) + weight
+        for token, weight in weights.items():
+            postings = self._postings.setdefault(token, {})
+            if not postings:
+                self._vocabulary_stale = True
+            postings[doc.id] = weight
+        self._docs[doc.id] = doc
+        self._by_slug[doc.slug] = doc.id
+        self._terms[doc.id] = list(weights)
+        self._facets.add(doc.id, _facets(doc.genres, doc.status, doc.type))
+
+    def remove(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._by_slug.pop(doc.slug, None)
+        self._facets.remove(doc_id)
+        for token in self._terms.pop(doc_id, []):
+            postings = self._postings[token]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_stale = True
+
+    def get(self, doc_id: int) -> Optional[SearchDoc]:
+        return self._docs.get(doc_id)
+
+    def by_slug(self, slug: str) -> Optional[SearchDoc]:
+        doc_id = self._by_slug.get(slug)
+        return None if doc_id is None else self._docs[doc_id]
+
+    def genre_counts(self) -> Dict[str, int]:
+        return {
+            name[len("genre:") :]: count
+            for name, count in self._facets.counts().items()
+            if name.startswith("genre:")
+        }
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_stale = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff", start)
+        return self._vocabulary[start:end]
+
+    def match(self, query: str) -> Optional[Dict[int, float]]:
+        tokens = tokenize(query)
+        scores: Optional[Dict[int, float]] = None
+        for position, token in enumerate(tokens):
+            terms = self._expand(token) if position == len(tokens) - 1 else [token]
+            matched: Dict[int, float] = {}
+            for term in terms:
+                for doc_id, weight in self._postings.get(term, {}).items():
+                    score = weight if term == token else weight * 0.5
+                    matched[doc_id] = max(matched.get(doc_id, 0.0), score)
+            if scores is None:
+                scores = matched
+            else:
+                scores = {
+                    doc_id: score + matched[doc_id] for doc_id, score in scores.items() if doc_id in matched
+                }
+            if not scores:
+                break
+        return scores
+
+    def search(
+        self,
+        query: str,
+        genres: Sequence[str] = (),
+        status: Optional[str] = None,
+        type: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[SearchDoc, float]]]:
+        mask = self._facets.mask(_facets(genres, status, type))
+        scores = self.match(query)
+        if scores is None:
+            hits = [(self._docs[doc_id], 0.0) for doc_id in self._facets.ids(mask)]
+        else:
+            hits = [
+                (self._docs[doc_id], score) for doc_id, score in scores.items() if self._facets.contains(mask, doc_id)
+            ]
+        hits.sort(key=lambda hit: (-hit[1], hit[0].title.lower()))
+        return len(hits), hits[offset : offset + limit]
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(
+        self, maxsize: int = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SearchService:
+    def __init__(self, db: Database, cache_size: int = 1024, cache_ttl: float = 60.0) -> None:
+        self._db = db
+        self._index = SearchIndex()
+        self._cache = TTLCache(cache_size, cache_ttl)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._watermark: Optional[datetime] = None
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        return self._watermark
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def refresh(self) -> int:
+        with self._refresh_lock:
+            watermark = self._watermark
+            changed = 0
+            for anime_id, anime, updated_at in self._db.iter_anime(since=self._watermark):
+                doc = SearchDoc.from_anime(anime_id, anime, updated_at)
+                with self._lock:
+                    current = self._index.get(anime_id)
+                    if current is not None and current.updated_at == updated_at and updated_at is not None:
+                        continue
+                    self._index.add(doc)
+                changed += 1
+                if updated_at is not None and (watermark is None or updated_at > watermark):
+                    watermark = updated_at
+            self._watermark = watermark
+        if changed:
+            self._cache.clear()
+            metrics.inc("search_reindexed_total", changed)
+            LOGGER.info("Search index refreshed: %s changed, %s documents", changed, len(self))
+        return changed
+
+    def search(
+        self,
+        query: str = "",
+        genres: Sequence[str] = (),
+        status: Optional[str] = None,
+        type: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        genre_key = tuple(sorted(genre.lower() for genre in genres))
+        key = (" ".join(tokenize(query)), genre_key, status, type, limit, offset)
+        cached = self._cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            metrics.inc("search_cache_total", result="hit")
+            return cached
+        metrics.inc("search_cache_total", result="miss")
+        with metrics.timer("search_seconds"), self._lock:
+            total, hits = self._index.search(query, genres, status, type, limit, offset)
+            results = [{**doc.to_json(synopsis=False), "score": round(score, 3)} for doc, score in hits]
+        result = {"query": query, "total": total, "results": results}
+        self._cache.put(key, result)
+        return result
+
+    def lookup(self, slug: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._index.by_slug(slug)
+            return None if doc is None else doc.to_json()
+
+    def genre_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return self._index.genre_counts()
+
+
+class SearchServer:
+    def __init__(
+        self,
+        service: SearchService,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        refresh_seconds: float = 30.0,
+    ) -> None:
+        self.service = service
+        self._refresh_seconds = refresh_seconds
+        self._stop = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SearchServer":
+        self.service.refresh()
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._server.serve_forever, name="search-http", daemon=True)]
+        if self._refresh_seconds > 0:
+            refresher = threading.Thread(target=self._refresh_loop, name="search-refresh", daemon=True)
+            self._threads.append(refresher)
+        for thread in self._threads:
+            thread.start()
+        LOGGER.info("Search API listening on %s (%s documents)", self.base_url, len(self.service))
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> "SearchServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self._refresh_seconds):
+            try:
+                self.service.refresh()
+            except Exception:
+                LOGGER.exception("Search index refresh failed")
+
+    def _handler_class(self) -> type:
+        service = self.service
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args) -> None:
+                LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                params = parse_qs(parts.query)
+                try:
+                    if parts.path == "/search":
+                        self._send(200, service.search(**_search_args(params)))
+                    elif parts.path.startswith("/anime/"):
+                        doc = service.lookup(unquote(parts.path[len("/anime/") :]).strip("/"))
+                        if doc is None:
+                            self._send(404, {"error": "not found"})
+                        else:
+                            self._send(200, doc)
+                    elif parts.path == "/genres":
+                        self._send(200, service.genre_counts())
+                    elif parts.path == "/healthz":
+                        watermark = service.watermark
+                        self._send(
+                            200,
+                            {"documents": len(service), "watermark": watermark.isoformat() if watermark else None},
+                        )
+                    else:
+                        self._send(404, {"error": "not found"})
+                except ValueError as exc:
+                    self._send(400, {"error": str(exc)})
+
+            def _send(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def _search_args(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    def first(name: str) -> Optional[str]:
+        values = params.get(name)
+        return values[0] if values else None
+
+    genres: List[str] = []
+    for value in params.get("genre", []):
+        genres.extend(split_genres(value))
+    limit = int(first("limit") or 20)
+    offset = int(first("offset") or 0)
+    if not 0 < limit <= 100 or offset < 0:
+        raise ValueError("limit must be 1-100 and offset >= 0")
+    return {
+        "query": first("q") or "",
+        "genres": genres,
+        "status": first("status"),
+        "type": first("type"),
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Cached search API over the anime catalog")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--refresh-seconds", type=float, default=30.0, help="Incremental index refresh interval")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Cached query results (LRU)")
+    parser.add_argument("--cache-ttl", type=float, default=60.0, help="Seconds a cached result stays valid")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    config = Config.from_env()
+    db = Database(
+        host=config.db_host,
+        port=config.db_port,
+        user=config.db_user,
+        password=config.db_password,
+        database=config.db_name,
+    )
+    service = SearchService(db, cache_size=args.cache_size, cache_ttl=args.cache_ttl)
+    server = SearchServer(service, host=args.host, port=args.port, refresh_seconds=args.refresh_seconds)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
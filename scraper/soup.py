@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+LOGGER = logging.getLogger(__name__)
+
+BACKENDS = ("html.parser", "lxml")
+
+_backend = "html.parser"
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except Exception:  # pragma: no cover - optional dependency
+        return False
+    return True
+
+
+def set_backend(name: str) -> str:
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported parser backend: {name}")
+    if name == "lxml" and not _lxml_available():
+        LOGGER.warning("lxml not available, falling back to html.parser")
+        name = "html.parser"
+    _backend = name
+    return name
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def make_soup(
+    html: str,
+    parse_only: Optional[SoupStrainer] = None,
+    backend: Optional[str] = None,
+) -> BeautifulSoup:
+    return BeautifulSoup(html, backend or _backend, parse_only=parse_only)
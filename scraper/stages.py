@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Generic, Iterable, List, Optional, Sequence, TypeVar
+
+from scraper import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_END = object()
+
+
+@dataclass
+class Stage(Generic[T]):
+    name: str
+    handler: Callable[[T], bool]
+    workers: int = 1
+
+
+class StagedPipeline(Generic[T]):
+    def __init__(
+        self,
+        stages: Sequence[Stage[T]],
+        queue_size: int = 16,
+        on_done: Optional[Callable[[T], None]] = None,
+        on_error: Optional[Callable[[T, Exception], None]] = None,
+    ) -> None:
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self._stages = list(stages)
+        self._queue_size = max(1, queue_size)
+        self._on_done = on_done
+        self._on_error = on_error
+
+    def run(self, jobs: Iterable[T]) -> None:
+        queues: List[queue.Queue] = [queue.Queue(self._queue_size) for _ in self._stages]
+        stopped = threading.Event()
+        errors: List[BaseException] = []
+        remaining = [max(1, stage.workers) for stage in self._stages]
+        lock = threading.Lock()
+
+        def fail(exc: BaseException) -> None:
+            with lock:
+                errors.append(exc)
+            stopped.set()
+
+        def finish(job: T) -> None:
+            if self._on_done is not None:
+                self._on_done(job)
+
+        def work(index: int) -> None:
+            stage = self._stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                job = inbox.get()
+                if job is _END:
+                    break
+                if stopped.is_set():
+                    # Keep draining so upstream stages never block on a full queue.
+                    continue
+                try:
+                    started = time.perf_counter()
+                    try:
+                        forward = stage.handler(job)
+                    except Exception as exc:
+                        if self._on_error is None:
+                            raise
+                        LOGGER.debug("Stage %s failed", stage.name, exc_info=True)
+                        self._on_error(job, exc)
+                        continue
+                    finally:
+                        metrics.observe("stage_seconds", time.perf_counter() - started, stage=stage.name)
+                    if forward and outbox is not None:
+                        outbox.put(job)
+                    else:
+                        finish(job)
+                except BaseException as exc:
+                    fail(exc)
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and outbox is not None:
+                for _ in range(max(1, self._stages[index + 1].workers)):
+                    outbox.put(_END)
+
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"stage-{stage.name}-{worker}", daemon=True)
+            for index, stage in enumerate(self._stages)
+            for worker in range(max(1, stage.workers))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for job in jobs:
+                if stopped.is_set():
+                    break
+                queues[0].put(job)
+        finally:
+            for _ in range(max(1, self._stages[0].workers)):
+                queues[0].put(_END)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import html as html_lib
+import io
+import random
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from scraper.fetcher import Fetcher
+
+
+BASE_URL = "https://otakudesu.best"
+LIST_URL = f"{BASE_URL}/anime-list"
+
+_WORDS = (
+    "kimi", "no", "sora", "hikari", "yume", "tensei", "shoujo", "monogatari", "kaze", "hoshi",
+    "sekai", "boku", "yuusha", "maou", "gakuen", "koi", "senki", "ken", "mahou", "shinigami",
+)
+_GENRES = (
+    "Action", "Adventure", "Comedy", "Drama", "Fantasy", "Isekai", "Music", "Mystery",
+    "Romance", "School", "Sci-Fi", "Slice of Life", "Sports", "Supernatural",
+)
+_PROVIDERS = ("DesuDrive", "Mega", "GDrive", "Acefile", "PixelDrain", "KFiles")
+_QUALITIES = (("MP4", "360p", "MB"), ("MP4", "480p", "MB"), ("MKV", "720p", "MB"), ("MKV", "1080p", "GB"))
+
+
+def _rng(seed: int, key: str) -> random.Random:
+    return random.Random(f"{seed}:{key}")
+
+
+def _title(slug: str) -> str:
+    return " ".join(word.capitalize() for word in slug.split("-")[:-2])
+
+
+def anime_slugs(count: int, seed: int = 0) -> List[str]:
+    rng = _rng(seed, "slugs")
+    slugs = []
+    for index in range(count):
+        words = rng.sample(_WORDS, rng.randint(2, 4))
+        slugs.append(f"{'-'.join(words)}-{index}-sub-indo")
+    return slugs
+
+
+def anime_url(slug: str) -> str:
+    return f"{BASE_URL}/anime/{slug}/"
+
+
+def anime_list_html(slugs: List[str]) -> str:
+    items = "\n".join(
+        f'<li><a class="hodebgst" href="{anime_url(slug)}">{html_lib.escape(_title(slug))}</a></li>'
+        for slug in slugs
+    )
+    return (
+        '<!DOCTYPE html><html lang="id"><head><meta charset="UTF-8"><title>Anime List | Otakudesu</title></head>'
+        '<body><div id="header"><a href="https://otakudesu.best/">Home</a></div>'
+        f'<div class="venser"><div class="daftarkartun"><div class="bariskelom"><div class="penzbar">'
+        f'<div class="jdlbar"><ul>\n{items}\n</ul></div></div></div></div></div></body></html>'
+    )
+
+
+def episode_urls(slug: str, episodes: int) -> List[str]:
+    return [f"{BASE_URL}/episode/{slug}-episode-{number}/" for number in range(episodes, 0, -1)]
+
+
+def batch_url(slug: str) -> str:
+    return f"{BASE_URL}/batch/{slug}-batch/"
+
+
+def anime_detail_html(slug: str, episodes: int = 12, batch: bool = True, seed: int = 0, revision: int = 0) -> str:
+    rng = _rng(seed, f"detail:{slug}:{revision}")
+    title = html_lib.escape(_title(slug))
+    status = "Ongoing" if rng.random() < 0.2 else "Completed"
+    genre_links = [
+        f'<a href="{BASE_URL}/genres/{genre.lower().replace(" ", "-")}/" rel="tag">{genre}</a>'
+        for genre in rng.sample(_GENRES, 3)
+    ]
+    genres = ", ".join(genre_links)
+    synopsis = " ".join(rng.choice(_WORDS) for _ in range(80))
+    episode_items = "\n".join(
+        f'<li><span><a href="{url}">{title} Episode {episodes - index}</a></span>'
+        f'<span class="zeebr">{rng.randint(1, 28)} Jan,2024</span></li>'
+        for index, url in enumerate(episode_urls(slug, episodes))
+    )
+    batch_block = ""
+    if batch:
+        batch_block = (
+            '<div class="episodelist"><div class="smokelister"><span class="monktit">Batch</span></div>'
+            f'<ul><li><span><a href="{batch_url(slug)}">{title} Batch Episode 1 – {episodes}</a></span></li></ul></div>'
+        )
+    direct = "\n".join(
+        f'<li><strong>{fmt} {resolution}</strong> <a href="https://desudrive.com/link/?id={slug}-{resolution}">'
+        f"DesuDrive</a> <i>{rng.randint(100, 900)} MB</i></li>"
+        for fmt, resolution, _ in _QUALITIES[:2]
+    )
+    return f"""<!DOCTYPE html>
+<html lang="id">
+<head><meta charset="UTF-8"><title>{title} Sub Indo | Otakudesu</title></head>
+<body>
+<div id="venkonten"><div class="venser">
+  <div class="jdlrx"><h1>{title} Sub Indo</h1></div>
+  <div class="fotoanime">
+    <img src="{BASE_URL}/wp-content/uploads/posters/{slug}.jpg" class="attachment-post-thumbnail" alt="{title}">
+    <div class="infozingle">
+      <p><span><b>Judul</b>: {title}</span></p>
+      <p><span><b>Tipe</b>: TV</span></p>
+      <p><span><b>Status</b>: {status}</span></p>
+      <p><span><b>Total Episode</b>: {episodes}</span></p>
+      <p><span><b>Genre</b>: {genres}</span></p>
+    </div>
+  </div>
+  <div class="sinopc"><div class="sinopsis"><p>{synopsis}</p></div></div>
+  <div class="genre-info">{"".join(genre_links)}</div>
+  {batch_block}
+  <div class="episodelist"><ul>
+{episode_items}
+  </ul></div>
+  <div class="download"><h4>Download {title}</h4><ul>
+{direct}
+  </ul></div>
+</div></div>
+</body>
+</html>"""
+
+
+def download_page_html(title: str, rows: int = 30, seed: int = 0, revision: int = 0) -> str:
+    rng = _rng(seed, f"downloads:{title}:{revision}")
+    escaped = html_lib.escape(title)
+    per_table = max(1, len(_QUALITIES))
+    tables = []
+    for start in range(0, rows, per_table * 4):
+        body = []
+        for index in range(start, min(rows, start + per_table * 4)):
+            fmt, resolution, unit = _QUALITIES[index % len(_QUALITIES)]
+            size = f"{rng.uniform(0.5, 3.0):.2f} GB" if unit == "GB" else f"{rng.randint(80, 900)} MB"
+            links = " ".join(
+                f'<a href="https://{provider.lower()}.example/file/{title.lower().replace(" ", "-")}-{index}">'
+                f"{provider}</a>"
+                for provider in rng.sample(_PROVIDERS, 2)
+            )
+            body.append(f"<tr><td>{fmt} {resolution}</td><td>{links}</td><td>{size}</td></tr>")
+        tables.append(
+            f"<h4>{escaped} Part {start // (per_table * 4) + 1} Sub Indo</h4>"
+            "<table><tr><th>Format</th><th>Link</th><th>Size</th></tr>" + "".join(body) + "</table>"
+        )
+    return (
+        f'<!DOCTYPE html><html lang="id"><head><meta charset="UTF-8"><title>{escaped}</title></head>'
+        f'<body><div class="venser"><h1>{escaped}</h1><div class="batchlink">'
+        + "\n".join(tables)
+        + "</div></div></body></html>"
+    )
+
+
+def poster_bytes(width: int = 225, height: int = 320, seed: int = 0) -> bytes:
+    rng = _rng(seed, f"poster:{width}x{height}")
+    image = Image.new("RGB", (width, height))
+    block = 16
+    for top in range(0, height, block):
+        for left in range(0, width, block):
+            color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            image.paste(color, (left, top, left + block, top + block))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class SyntheticSite:
+    def __init__(
+        self,
+        anime_count: int = 100,
+        episodes: int = 12,
+        download_rows: int = 30,
+        seed: int = 0,
+    ) -> None:
+        self.slugs = anime_slugs(anime_count, seed)
+        self._episodes = episodes
+        self._download_rows = download_rows
+        self._seed = seed
+        self._known = set(self.slugs)
+        self._revisions: Dict[str, int] = {}
+        self._owners: Dict[str, str] = {}
+        for slug in self.slugs:
+            for url in episode_urls(slug, episodes) + [batch_url(slug)]:
+                self._owners[url] = slug
+
+    @property
+    def anime_urls(self) -> List[str]:
+        return [anime_url(slug) for slug in self.slugs]
+
+    def bump(self, slug: str) -> None:
+        self._revisions[slug] = self._revisions.get(slug, 0) + 1
+
+    def page(self, url: str) -> Optional[str]:
+        if url.rstrip("/") == LIST_URL:
+            return anime_list_html(self.slugs)
+        if "/anime/" in url:
+            slug = url.rstrip("/").rsplit("/", 1)[-1]
+            if slug not in self._known:
+                return None
+            return anime_detail_html(slug, self._episodes, seed=self._seed, revision=self._revisions.get(slug, 0))
+        slug = self._owners.get(url)
+        if slug is None:
+            return None
+        title = url.rstrip("/").rsplit("/", 1)[-1]
+        return download_page_html(title, self._download_rows, seed=self._seed, revision=self._revisions.get(slug, 0))
+
+
+class SyntheticFetcher(Fetcher):
+    def __init__(self, site: SyntheticSite) -> None:
+        super().__init__(0, 0)
+        self._site = site
+
+    def _request(self, url: str, conditional: bool) -> Optional[str]:
+        html = self._site.page(url)
+        if html is None:
+            raise KeyError(f"{url} is not part of the synthetic site")
+        return html
+
+    def _fetch_with_playwright(self, url: str) -> Optional[str]:
+        return self._request(url, conditional=False)
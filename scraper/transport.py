@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import codecs
+import contextlib
+import hashlib
+import logging
+import re
+from typing import Any, Callable, Iterator, List, Optional, Tuple, cast
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scraper import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+USER_AGENT = "anime-scraper/1.0 (+https://otakudesu.best)"
+BACKENDS = ("auto", "httpx", "requests")
+CHUNK_SIZE = 64 * 1024
+
+
+def accept_encoding() -> str:
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        return "br, gzip, deflate"
+    return "gzip, deflate"
+
+
+def _charset(content_type: Optional[str]) -> str:
+    match = re.search(r"charset=[\"']?([\w.:-]+)", content_type or "", re.IGNORECASE)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class TransportResponse:
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        headers: Any,
+        chunks: Iterator[bytes],
+        wire_bytes: Callable[[], int],
+        close: Callable[[], None],
+        http_version: str = "HTTP/1.1",
+    ) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.http_version = http_version
+        self.decoded_bytes = 0
+        self._chunks = chunks
+        self._wire_bytes = wire_bytes
+        self._close = close
+        self._closed = False
+
+    @property
+    def wire_bytes(self) -> int:
+        return self._wire_bytes()
+
+    @property
+    def encoding(self) -> str:
+        return _charset(self.headers.get("Content-Type"))
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            self.close()
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        try:
+            for chunk in self._chunks:
+                self.decoded_bytes += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def read(self) -> bytes:
+        return b"".join(self.iter_bytes())
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._close()
+
+    def __enter__(self) -> "TransportResponse":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def read_text(response: TransportResponse) -> Tuple[str, str]:
+    # Returns (text, sha256 hex digest of the raw bytes).
+    decoder = codecs.getincrementaldecoder(response.encoding)(errors="replace")
+    digest = hashlib.sha256()
+    parts: List[str] = []
+    for chunk in response.iter_bytes():
+        digest.update(chunk)
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), digest.hexdigest()
+
+
+def record_transfer(response: TransportResponse, kind: str) -> None:
+    metrics.inc("fetch_bytes_total", response.decoded_bytes, kind=kind)
+    metrics.inc("fetch_wire_bytes_total", response.wire_bytes, kind=kind)
+
+
+# Checked in order, so subclasses come before their bases.
+_HTTPX_ERRORS = (
+    ("ConnectTimeout", requests.ConnectTimeout),
+    ("ReadTimeout", requests.ReadTimeout),
+    ("TimeoutException", requests.Timeout),
+    ("TooManyRedirects", requests.TooManyRedirects),
+    ("TransportError", requests.ConnectionError),
+    ("HTTPError", requests.RequestException),
+)
+
+
+@contextlib.contextmanager
+def _requests_errors() -> Iterator[None]:
+    import httpx
+
+    try:
+        yield
+    except httpx.HTTPError as exc:
+        for name, error in _HTTPX_ERRORS:
+            if isinstance(exc, getattr(httpx, name)):
+                raise error(str(exc)) from exc
+        raise
+
+
+def _httpx_chunks(response: Any) -> Iterator[bytes]:
+    with _requests_errors():
+        yield from response.iter_bytes(CHUNK_SIZE)
+
+
+def _httpx_client(pool_size: int, headers: dict, required: bool) -> Optional[Any]:
+    try:
+        import h2  # noqa: F401
+        import httpx
+    except ImportError as exc:
+        if required:
+            LOGGER.warning("httpx[http2] not available (%s), falling back to requests over HTTP/1.1", exc)
+        return None
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return httpx.Client(http2=True, limits=limits, headers=headers, follow_redirects=True)
+
+
+class Transport:
+    def __init__(self, pool_size: int = 10, backend: str = "auto", user_agent: str = USER_AGENT) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown HTTP transport {backend!r}, expected one of {BACKENDS}")
+        headers = {"User-Agent": user_agent, "Accept-Encoding": accept_encoding()}
+        self._client = None
+        self._session: Optional[requests.Session] = None
+        if backend != "requests":
+            self._client = _httpx_client(pool_size, headers, required=backend == "httpx")
+        if self._client is None:
+            self._session = requests.Session()
+            self._session.headers.update(headers)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+
+    @property
+    def backend(self) -> str:
+        return "requests" if self._client is None else "httpx"
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: float = 15,
+        headers: Optional[dict] = None,
+    ) -> TransportResponse:
+        if self._client is not None:
+            with _requests_errors():
+                request = self._client.build_request(method, url, headers=headers, timeout=timeout)
+                response = self._client.send(request, stream=True)
+            return TransportResponse(
+                url,
+                response.status_code,
+                response.headers,
+                _httpx_chunks(response),
+                lambda: response.num_bytes_downloaded,
+                response.close,
+                response.http_version,
+            )
+        session = cast(requests.Session, self._session)
+        session_response = session.request(method, url, timeout=timeout, headers=headers, stream=True)
+        raw = session_response.raw
+        return TransportResponse(
+            url,
+            session_response.status_code,
+            session_response.headers,
+            raw.stream(CHUNK_SIZE, decode_content=True),
+            raw.tell,
+            session_response.close,
+        )
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+        if self._session is not None:
+            self._session.close()
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -1,101 +1,593 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar, cast
 
-from scraper.db import Database
+from scraper import metrics
+from scraper.async_fetcher import AsyncFetcher
+from scraper.db import Database, WriteBehindBuffer
 from scraper.fetcher import Fetcher
-from scraper.image_pipeline import process_image
-from scraper.models import Anime, AnimeDownload, AnimeImage
+from scraper.frontier import CrawlFrontier
+from scraper.image_pipeline import ImagePipeline, process_image
+from scraper.models import Anime, AnimeDownload, AnimeImage, AnimeIndexEntry, FrontierItem, RunSummary
 from scraper.parser_detail import parse_anime_detail, parse_download_page
-from scraper.utils import hash_values, slugify
+from scraper.ratelimit import TokenBucket, rate_from_interval
+from scraper.soup import get_backend
+from scraper.stages import Stage, StagedPipeline
+from scraper.utils import download_attributes, hash_values, provider_slug, slug_from_url
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def _download_line(item: AnimeDownload) -> str:
+    return "|".join(
+        [
+            item.source_url,
+            item.section_title or "",
+            item.format or "",
+            item.resolution or "",
+            item.size or "",
+            item.provider or "",
+            item.url,
+        ]
+    )
+
+
+def _page_fingerprint(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def _unique(urls: Iterable[str]) -> List[str]:
+    seen = set()
+    unique_urls = []
+    for url in urls:
+        if url in seen:
+            continue
+        seen.add(url)
+        unique_urls.append(url)
+    return unique_urls
+
+
+def parse_downloads(
+    url: str,
+    direct_downloads: Sequence[Tuple[str, str]],
+    pages: Sequence[Tuple[str, str]],
+    backend: Optional[str] = None,
+) -> Tuple[List[AnimeDownload], List[Tuple[str, str]]]:
+    downloads: List[AnimeDownload] = [
+        AnimeDownload(
+            source_url=url,
+            section_title=None,
+            format=None,
+            resolution=None,
+            size=None,
+            provider=label,
+            url=link,
+            provider_slug=provider_slug(label),
+        )
+        for label, link in direct_downloads
+    ]
+    fingerprints: List[Tuple[str, str]] = []
+    for page_url, page_html in pages:
+        page_downloads: List[AnimeDownload] = []
+        for row in parse_download_page(page_html, page_url, backend=backend):
+            _, _, resolution, size, provider, _ = row
+            page_downloads.append(AnimeDownload(page_url, *row, *download_attributes(size, resolution, provider)))
+        fingerprints.append((page_url, _page_fingerprint(page_html)))
+        downloads.extend(page_downloads)
+    return downloads, fingerprints
+
+
+def _parse_in_process(func: Callable[..., T], *args, backend: str) -> Tuple[T, Dict]:
+    metrics.REGISTRY.reset()
+    result = func(*args, backend=backend)
+    return result, metrics.REGISTRY.snapshot()
+
+
+@dataclass
+class _Job:
+    url: str
+    frontier_item: Optional[FrontierItem] = None
+    slug: str = ""
+    existing: Optional[AnimeIndexEntry] = None
+    html: Optional[str] = None
+    detail: Optional[Tuple] = None
+    to_fetch: List[str] = field(default_factory=list)
+    cached_pages: List[str] = field(default_factory=list)
+    stale: Dict[str, str] = field(default_factory=dict)
+    pages: List[Tuple[str, str]] = field(default_factory=list)
+    downloads: List[AnimeDownload] = field(default_factory=list)
+    fingerprints: List[Tuple[str, str]] = field(default_factory=list)
+
 
 class Updater:
-    def __init__(self, db: Database, fetcher: Fetcher, image_dir) -> None:
+    def __init__(
+        self,
+        db: Database,
+        fetcher: Fetcher,
+        image_dir,
+        concurrency: int = 1,
+        process_images: bool = True,
+        download_sync: str = "diff",
+        write_batch_size: int = 0,
+        write_flush_seconds: float = 5.0,
+        incremental_pages: bool = False,
+        page_refresh_seconds: float = 7 * 24 * 3600,
+        image_pipeline: Optional[ImagePipeline] = None,
+        fetch_workers: int = 0,
+        parse_workers: int = 0,
+        persist_workers: int = 1,
+        stage_queue_size: int = 16,
+    ) -> None:
+        if download_sync not in ("diff", "replace"):
+            raise ValueError(f"Unsupported download sync mode: {download_sync}")
         self._db = db
         self._fetcher = fetcher
         self._image_dir = image_dir
+        self._concurrency = max(1, concurrency)
+        self._process_images = process_images
+        self._download_sync = download_sync
+        self._index: Dict[str, AnimeIndexEntry] = {}
+        self._write_batch_size = write_batch_size
+        self._write_flush_seconds = write_flush_seconds
+        self._writer: Optional[WriteBehindBuffer] = None
+        self._incremental_pages = incremental_pages
+        self._page_refresh_seconds = page_refresh_seconds
+        self._image_pipeline = image_pipeline
+        self._known_images: Dict[str, AnimeImage] = {}
+        self._frontier: Optional[CrawlFrontier] = None
+        self._frontier_done: List[FrontierItem] = []
+        self._frontier_lock = threading.Lock()
+        self._summary = RunSummary()
+        self._summary_lock = threading.Lock()
+        self._fetch_workers = fetch_workers
+        self._parse_workers = parse_workers
+        self._persist_workers = max(1, persist_workers)
+        self._stage_queue_size = stage_queue_size
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._limiter: Optional[TokenBucket] = None
 
-    def full_update(self, anime_urls: Iterable[str]) -> None:
-        for url in anime_urls:
-            self._process_anime(url)
-        self._db.set_state("last_run", datetime.now(timezone.utc).isoformat())
+    def full_update(self, anime_urls: Iterable[str], frontier: Optional[CrawlFrontier] = None) -> RunSummary:
+        summary = self._run(anime_urls, frontier=frontier)
+        if self._finished(frontier):
+            self._db.set_state("last_run", datetime.now(timezone.utc).isoformat())
+        return summary
+
+    def daily_update(self, anime_urls: Iterable[str], frontier: Optional[CrawlFrontier] = None) -> RunSummary:
+        summary = self._run(anime_urls, daily_mode=True, frontier=frontier)
+        if self._finished(frontier):
+            self._db.set_state("last_run", datetime.now(timezone.utc).isoformat())
+        return summary
+
+    def _finished(self, frontier: Optional[CrawlFrontier]) -> bool:
+        if frontier is None:
+            return True
+        remaining = frontier.remaining()
+        if remaining:
+            LOGGER.info(
+                "Frontier run %s has %s items left; rerun with the same run id", frontier.run_id, remaining
+            )
+        return remaining == 0
+
+    def _count(self, field: str, amount: int = 1) -> None:
+        with self._summary_lock:
+            setattr(self._summary, field, getattr(self._summary, field) + amount)
+        if not field.startswith("downloads_"):
+            metrics.inc("anime_total", amount, result=field)
+
+    def _run(
+        self,
+        anime_urls: Iterable[str],
+        daily_mode: bool = False,
+        frontier: Optional[CrawlFrontier] = None,
+    ) -> RunSummary:
+        started = time.monotonic()
+        self._summary = RunSummary()
+        self._index = self._db.load_anime_index()
+        LOGGER.info("Loaded %s known anime into the slug index", len(self._index))
+        if self._image_pipeline is not None and self._process_images:
+            self._known_images = self._db.load_image_index()
+        if self._write_batch_size > 0:
+            self._writer = WriteBehindBuffer(
+                self._db,
+                max_records=self._write_batch_size,
+                max_delay=self._write_flush_seconds,
+                on_flush=self._remember_flushed,
+                on_failure=self._forget_unwritten,
+                replace_downloads=self._download_sync == "replace",
+            )
+        self._frontier = frontier
+        self._frontier_done = []
+        writer = self._writer
+        if self._fetch_workers > 0:
+            if self._fetcher.rate_limiter is None:
+                self._limiter = TokenBucket(rate_from_interval(self._fetcher.rate_limit_seconds))
+            if self._parse_workers > 0:
+                self._parse_pool = ProcessPoolExecutor(max_workers=self._parse_workers)
+        try:
+            with writer or contextlib.nullcontext():
+                try:
+                    if frontier is not None:
+                        self._drain(frontier, anime_urls, daily_mode)
+                    elif self._fetch_workers > 0:
+                        self._run_pipeline((_Job(url) for url in anime_urls), daily_mode)
+                    elif self._concurrency > 1:
+                        asyncio.run(self._run_concurrent(list(anime_urls), daily_mode))
+                    else:
+                        for url in anime_urls:
+                            self._process_anime(url, daily_mode=daily_mode)
+                finally:
+                    if self._image_pipeline is not None:
+                        # Poster jobs write through the buffer, so wait before it flushes.
+                        self._image_pipeline.join()
+            self._complete_flushed()
+        finally:
+            self._writer = None
+            self._frontier = None
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+            if writer is not None:
+                self._count("downloads_added", writer.downloads_added)
+                self._count("downloads_removed", writer.downloads_removed)
+            self._summary.elapsed_seconds = time.monotonic() - started
+        return self._summary
+
+    def _remember(self, anime_id: int, anime: Anime) -> None:
+        self._index[anime.slug] = AnimeIndexEntry(
+            id=anime_id,
+            status=anime.status,
+            detail_hash=anime.detail_hash,
+            updated_at=datetime.now(timezone.utc),
+        )
+
+    def _remember_flushed(self, written: List[Tuple[int, Anime]]) -> None:
+        for anime_id, anime in written:
+            self._remember(anime_id, anime)
+        self._complete_flushed()
+
+    def _forget_unwritten(self, anime: List[Anime]) -> None:
+        for item in anime:
+            self._fetcher.forget(item.source_url)
+        frontier = self._frontier
+        if frontier is not None:
+            with self._frontier_lock:
+                items, self._frontier_done = self._frontier_done, []
+            for frontier_item in items:
+                frontier.fail(frontier_item, "write batch failed")
+
+    def _finish_item(self, item: FrontierItem) -> None:
+        with self._frontier_lock:
+            self._frontier_done.append(item)
+        if self._writer is None:
+            self._complete_flushed()
+
+    def _complete_flushed(self) -> None:
+        frontier = self._frontier
+        if frontier is None:
+            return
+        with self._frontier_lock:
+            items, self._frontier_done = self._frontier_done, []
+        frontier.complete(items)
+
+    def _drain(self, frontier: CrawlFrontier, anime_urls: Iterable[str], daily_mode: bool) -> None:
+        frontier.seed((url, "anime", 0 if slug_from_url(url) in self._index else 1) for url in anime_urls)
+        if self._fetch_workers > 0:
+            while True:
+                items = frontier.claim(max(frontier.batch_size, self._stage_queue_size))
+                if not items:
+                    return
+                self._run_pipeline((_Job(item.url, frontier_item=item) for item in items), daily_mode, frontier)
+        if self._concurrency > 1:
+            asyncio.run(self._drain_concurrent(frontier, daily_mode))
+            return
+        while True:
+            items = frontier.claim()
+            if not items:
+                return
+            for item in items:
+                try:
+                    self._process_anime(item.url, daily_mode=daily_mode)
+                except Exception as exc:
+                    self._count("failed")
+                    frontier.fail(item, f"{type(exc).__name__}: {exc}")
+                else:
+                    self._finish_item(item)
+
+    async def _drain_concurrent(self, frontier: CrawlFrontier, daily_mode: bool) -> None:
+        self._use_thread_pool()
+        fetcher = AsyncFetcher(self._fetcher, self._concurrency)
+        in_flight = asyncio.Semaphore(self._concurrency)
+
+        async def bounded(item: FrontierItem) -> None:
+            async with in_flight:
+                try:
+                    await self._process_anime_async(fetcher, item.url, daily_mode)
+                except Exception as exc:
+                    self._count("failed")
+                    await asyncio.to_thread(frontier.fail, item, f"{type(exc).__name__}: {exc}")
+                else:
+                    await asyncio.to_thread(self._finish_item, item)
+
+        while True:
+            items = await asyncio.to_thread(frontier.claim, max(frontier.batch_size, self._concurrency * 2))
+            if not items:
+                return
+            await asyncio.gather(*(bounded(item) for item in items))
 
-    def daily_update(self, anime_urls: Iterable[str]) -> None:
+    def _run_pipeline(
+        self,
+        jobs: Iterable[_Job],
+        daily_mode: bool,
+        frontier: Optional[CrawlFrontier] = None,
+    ) -> None:
+        parse_threads = max(1, self._parse_workers)
+        fetch_detail = functools.partial(self._fetch_detail, daily_mode=daily_mode)
+        fetch_pages = functools.partial(self._fetch_pages, daily_mode=daily_mode)
+        persist = functools.partial(self._persist_job, daily_mode=daily_mode)
+
+        def on_done(job: _Job) -> None:
+            if job.frontier_item is not None:
+                self._finish_item(job.frontier_item)
+
+        def on_error(job: _Job, exc: Exception) -> None:
+            self._fetcher.forget(job.url)
+            if frontier is None or job.frontier_item is None:
+                raise exc
+            self._count("failed")
+            frontier.fail(job.frontier_item, f"{type(exc).__name__}: {exc}")
+
+        StagedPipeline(
+            [
+                Stage("fetch-detail", fetch_detail, self._fetch_workers),
+                Stage("parse-detail", self._parse_detail, parse_threads),
+                Stage("fetch-pages", fetch_pages, self._fetch_workers),
+                Stage("parse-pages", self._parse_pages, parse_threads),
+                Stage("persist", persist, self._persist_workers),
+            ],
+            queue_size=self._stage_queue_size,
+            on_done=on_done,
+            on_error=on_error,
+        ).run(jobs)
+
+    def _request(self, request: Callable[[str], T], url: str) -> T:
+        if self._limiter is not None:
+            self._limiter.acquire()
+        return request(url)
+
+    def _parse(self, func: Callable[..., T], *args) -> T:
+        if self._parse_pool is None:
+            return func(*args)
+        result, snapshot = self._parse_pool.submit(_parse_in_process, func, *args, backend=get_backend()).result()
+        metrics.REGISTRY.merge(snapshot)
+        return result
+
+    def _fetch_detail(self, job: _Job, daily_mode: bool) -> bool:
+        job.slug = slug_from_url(job.url)
+        self._count("anime_seen")
+        job.existing = self._index.get(job.slug)
+        if self._skip_inactive(job.slug, job.existing, daily_mode):
+            return False
+        if daily_mode and job.existing:
+            job.html = self._request(self._fetcher.request_if_modified, job.url)
+            if job.html is None:
+                LOGGER.info("Not modified since last run: %s", job.slug)
+                self._count("not_modified")
+                return False
+        else:
+            job.html = self._request(self._fetcher.request_html, job.url)
+        return True
+
+    def _parse_detail(self, job: _Job) -> bool:
+        job.detail = self._parse(parse_anime_detail, job.html, job.url)
+        job.html = None
+        return True
+
+    def _fetch_pages(self, job: _Job, daily_mode: bool) -> bool:
+        page_urls = _unique(cast(Tuple, job.detail)[7])
+        job.to_fetch, job.cached_pages, job.stale = self._plan_pages(job.slug, job.existing, page_urls, daily_mode)
+        job.pages = [(page_url, self._request(self._fetcher.request_html, page_url)) for page_url in job.to_fetch]
+        return True
+
+    def _parse_pages(self, job: _Job) -> bool:
+        direct_downloads = cast(Tuple, job.detail)[6]
+        pages, unchanged = self._skip_unchanged(job.slug, job.pages, job.stale)
+        job.downloads, job.fingerprints = self._parse(parse_downloads, job.url, direct_downloads, pages)
+        job.fingerprints += unchanged
+        job.cached_pages += [page_url for page_url, _ in unchanged]
+        job.pages = []
+        return True
+
+    def _persist_job(self, job: _Job, daily_mode: bool) -> bool:
+        self._persist(
+            job.url,
+            job.slug,
+            job.existing,
+            cast(Tuple, job.detail),
+            job.downloads,
+            job.fingerprints,
+            job.cached_pages,
+            daily_mode,
+        )
+        return True
+
+    def _use_thread_pool(self) -> None:
+        # asyncio.to_thread runs on the loop's default executor.
+        executor = ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix="updater")
+        asyncio.get_running_loop().set_default_executor(executor)
+
+    async def _run_concurrent(self, anime_urls: Sequence[str], daily_mode: bool) -> None:
+        self._use_thread_pool()
+        fetcher = AsyncFetcher(self._fetcher, self._concurrency)
+        queue: asyncio.Queue[str] = asyncio.Queue()
         for url in anime_urls:
-            self._process_anime(url, daily_mode=True)
-        self._db.set_state("last_run", datetime.now(timezone.utc).isoformat())
+            queue.put_nowait(url)
+
+        async def worker() -> None:
+            while not queue.empty():
+                url = queue.get_nowait()
+                try:
+                    await self._process_anime_async(fetcher, url, daily_mode)
+                except Exception:
+                    self._count("failed")
+                    LOGGER.exception("Failed to process %s", url)
+
+        await asyncio.gather(*(worker() for _ in range(self._concurrency)))
 
     def _process_anime(self, url: str, daily_mode: bool = False) -> None:
-        slug = slugify(url.split("/anime/")[-1].strip("/"))
-        existing = self._db.get_anime_by_slug(slug)
+        slug = slug_from_url(url)
+        self._count("anime_seen")
+        existing = self._index.get(slug)
+        if self._skip_inactive(slug, existing, daily_mode):
+            return
+        if daily_mode and existing:
+            html = self._fetcher.fetch_if_modified(url)
+            if html is None:
+                LOGGER.info("Not modified since last run: %s", slug)
+                self._count("not_modified")
+                return
+        else:
+            html = self._fetcher.fetch_html(url)
+        try:
+            detail = parse_anime_detail(html, url)
+            to_fetch, cached_pages, stale = self._plan_pages(slug, existing, _unique(detail[7]), daily_mode)
+            pages = [(page_url, self._fetcher.fetch_html(page_url)) for page_url in to_fetch]
+            self._store(url, slug, existing, detail, pages, cached_pages, stale, daily_mode)
+        except BaseException:
+            self._fetcher.forget(url)
+            raise
+
+    async def _process_anime_async(self, fetcher: AsyncFetcher, url: str, daily_mode: bool) -> None:
+        slug = slug_from_url(url)
+        self._count("anime_seen")
+        existing = self._index.get(slug)
+        if self._skip_inactive(slug, existing, daily_mode):
+            return
+        if daily_mode and existing:
+            html = await fetcher.fetch_if_modified(url)
+            if html is None:
+                LOGGER.info("Not modified since last run: %s", slug)
+                self._count("not_modified")
+                return
+        else:
+            html = await fetcher.fetch_html(url)
+        try:
+            detail = await asyncio.to_thread(self._parse, parse_anime_detail, html, url)
+            to_fetch, cached_pages, stale = await asyncio.to_thread(
+                self._plan_pages, slug, existing, _unique(detail[7]), daily_mode
+            )
+            page_htmls = await asyncio.gather(*(fetcher.fetch_html(page_url) for page_url in to_fetch))
+            await asyncio.to_thread(
+                self._store,
+                url,
+                slug,
+                existing,
+                detail,
+                list(zip(to_fetch, page_htmls)),
+                cached_pages,
+                stale,
+                daily_mode,
+            )
+        except BaseException:
+            self._fetcher.forget(url)
+            raise
+
+    def _skip_inactive(self, slug: str, existing: Optional[AnimeIndexEntry], daily_mode: bool) -> bool:
         if daily_mode and existing and existing.status and "ongoing" not in existing.status.lower():
             LOGGER.info("Skipping non-ongoing anime %s", slug)
-            return
-        html = self._fetcher.fetch_html(url)
-        (
-            title,
-            synopsis,
-            genres,
-            status,
-            anime_type,
-            poster_url,
-            direct_downloads,
-            download_pages,
-        ) = parse_anime_detail(html, url)
-        downloads: List[AnimeDownload] = [
-            AnimeDownload(
-                source_url=url,
-                section_title=None,
-                format=None,
-                resolution=None,
-                size=None,
-                provider=label,
-                url=link,
+            self._count("skipped_inactive")
+            return True
+        return False
+
+    def _plan_pages(
+        self,
+        slug: str,
+        existing: Optional[AnimeIndexEntry],
+        page_urls: List[str],
+        daily_mode: bool,
+    ) -> Tuple[List[str], List[str], Dict[str, str]]:
+        # Returns (pages to fetch, cached pages, stored fingerprints of stale pages).
+        if not (self._incremental_pages and daily_mode and existing):
+            return page_urls, [], {}
+        known = self._db.load_download_pages(existing.id, self._page_refresh_seconds)
+        to_fetch = [page_url for page_url in page_urls if page_url not in known or not known[page_url].fresh]
+        cached_pages = [page_url for page_url in page_urls if page_url in known and known[page_url].fresh]
+        stale = {page_url: known[page_url].fingerprint for page_url in to_fetch if page_url in known}
+        if cached_pages:
+            LOGGER.info(
+                "Fetching %s new or stale download pages for %s, reusing %s",
+                len(to_fetch),
+                slug,
+                len(cached_pages),
             )
-            for label, link in direct_downloads
-        ]
-        seen_pages = set()
-        for page_url in download_pages:
-            if page_url in seen_pages:
-                continue
-            seen_pages.add(page_url)
-            page_html = self._fetcher.fetch_html(page_url)
-            page_downloads = parse_download_page(page_html, page_url)
-            for section_title, format_value, resolution_value, size_value, provider, link in page_downloads:
-                downloads.append(
-                    AnimeDownload(
-                        source_url=page_url,
-                        section_title=section_title,
-                        format=format_value,
-                        resolution=resolution_value,
-                        size=size_value,
-                        provider=provider,
-                        url=link,
-                    )
-                )
-        download_hash = hash_values(
-            [
-                "|".join(
-                    [
-                        item.source_url,
-                        item.section_title or "",
-                        item.format or "",
-                        item.resolution or "",
-                        item.size or "",
-                        item.provider or "",
-                        item.url,
-                    ]
-                )
-                for item in downloads
-            ]
-        )
+        return to_fetch, cached_pages, stale
+
+    def _skip_unchanged(
+        self, slug: str, pages: Sequence[Tuple[str, str]], stale: Dict[str, str]
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        if not stale:
+            return list(pages), []
+        changed: List[Tuple[str, str]] = []
+        unchanged: List[Tuple[str, str]] = []
+        for page_url, html in pages:
+            fingerprint = _page_fingerprint(html)
+            if stale.get(page_url) == fingerprint:
+                unchanged.append((page_url, fingerprint))
+            else:
+                changed.append((page_url, html))
+        if unchanged:
+            LOGGER.info("%s refetched download pages unchanged for %s", len(unchanged), slug)
+            metrics.inc("download_pages_unchanged_total", len(unchanged))
+        return changed, unchanged
+
+    def _store(
+        self,
+        url: str,
+        slug: str,
+        existing: Optional[AnimeIndexEntry],
+        detail: Tuple,
+        pages: Sequence[Tuple[str, str]],
+        cached_pages: Sequence[str],
+        stale: Dict[str, str],
+        daily_mode: bool,
+    ) -> None:
+        pages, unchanged = self._skip_unchanged(slug, pages, stale)
+        downloads, fingerprints = parse_downloads(url, detail[6], pages)
+        cached_pages = list(cached_pages) + [page_url for page_url, _ in unchanged]
+        self._persist(url, slug, existing, detail, downloads, fingerprints + unchanged, cached_pages, daily_mode)
+
+    def _persist(
+        self,
+        url: str,
+        slug: str,
+        existing: Optional[AnimeIndexEntry],
+        detail: Tuple,
+        downloads: List[AnimeDownload],
+        fingerprints: List[Tuple[str, str]],
+        cached_pages: Sequence[str],
+        daily_mode: bool,
+    ) -> None:
+        title, synopsis, genres, status, anime_type, poster_url, _, _ = detail
+        if cached_pages and existing:
+            downloads = downloads + self._db.load_downloads(existing.id, cached_pages)
+        page_state = (fingerprints, _unique([page_url for page_url, _ in fingerprints] + list(cached_pages)))
+        download_hash = hash_values([_download_line(item) for item in downloads])
         if daily_mode and existing and existing.detail_hash == download_hash:
             LOGGER.info("No change detected for %s", slug)
+            self._count("unchanged")
+            if self._incremental_pages and fingerprints:
+                self._db.save_download_pages(existing.id, page_state)
             return
         anime = Anime(
             slug=slug,
@@ -107,13 +599,39 @@ class Updater:
             genres=genres,
             detail_hash=download_hash,
         )
-        anime_id = self._db.upsert_anime(anime)
-        self._db.upsert_downloads(anime_id, downloads)
+        self._count("stored")
+        writer = self._writer
+        anime_id = None
+        if writer is not None:
+            writer.add(anime, downloads, page_state if self._incremental_pages else None)
+        else:
+            anime_id = self._db.upsert_anime(anime)
+            self._remember(anime_id, anime)
+            if self._download_sync == "diff":
+                added, removed = self._db.sync_downloads(anime_id, downloads)
+                LOGGER.info("Downloads for %s: %s added, %s removed", slug, added, removed)
+                self._count("downloads_added", added)
+                self._count("downloads_removed", removed)
+            else:
+                self._db.upsert_downloads(anime_id, downloads)
+            if self._incremental_pages:
+                self._db.save_download_pages(anime_id, page_state)
+        if not self._process_images:
+            return
         image_path = self._image_dir / f"{slug}.webp"
-        image_result = process_image(poster_url, image_path)
+        if self._image_pipeline is not None:
+            self._image_pipeline.submit(
+                poster_url,
+                image_path,
+                self._known_images.get(slug),
+                functools.partial(self._save_image, slug, anime_id),
+            )
+            return
+        image_result = process_image(poster_url, image_path, transport=self._fetcher.transport)
         if image_result:
             original_url, width, height = image_result
-            self._db.upsert_image(
+            self._save_image(
+                slug,
                 anime_id,
                 AnimeImage(
                     original_url=original_url,
@@ -122,3 +640,11 @@ class Updater:
                     height=height,
                 ),
             )
+
+    def _save_image(self, slug: str, anime_id: Optional[int], image: AnimeImage) -> None:
+        self._known_images[slug] = image
+        writer = self._writer
+        if writer is not None:
+            writer.add_image(slug, image)
+        elif anime_id is not None:
+            self._db.upsert_image(anime_id, image)
@@ -2,12 +2,21 @@ from __future__ import annotations
 
 import hashlib
 import logging
+import random
 import re
 import time
-from typing import Callable, Iterable, Optional, Tuple, Type
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
+from urllib.parse import urlsplit
 
 import requests
 
+from scraper import metrics
+from scraper.ratelimit import parse_retry_after
+
+if TYPE_CHECKING:
+    from scraper.ratelimit import RateLimiter
+    from scraper.transport import Transport, TransportResponse
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -18,13 +27,87 @@ def slugify(value: str) -> str:
     return value or "unknown"
 
 
+def split_genres(genres: Optional[str]) -> List[str]:
+    return list(dict.fromkeys(genre.strip() for genre in (genres or "").split(",") if genre.strip()))
+
+
+# A comma followed by exactly three digits groups thousands, any other is a decimal point.
+_SIZE_BYTES_REGEX = re.compile(
+    r"(?:(\d{1,3}(?:,\d{3})+(?:\.\d+)?)|(\d+(?:[.,]\d+)?))\s*([KMGT])i?B\b", re.IGNORECASE
+)
+_SIZE_UNITS = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_RESOLUTION_PX_REGEX = re.compile(r"\b(\d{3,4})\s*p\b|\b([248])K\b", re.IGNORECASE)
+_K_RESOLUTIONS = {"2": 1440, "4": 2160, "8": 4320}
+# Words that end up in link labels ("Zippy 480p", "GD 1.2 GB") but say nothing about the host.
+_PROVIDER_NOISE_REGEX = re.compile(
+    r"\b(?:\d{3,4}\s*p|[248]k|mp4|mkv|avi|flv|webm|3gp|hevc|x26[45]|\d+(?:[.,]\d+)?\s*[kmgt]i?b)\b",
+    re.IGNORECASE,
+)
+_PROVIDER_ALIASES = {
+    "zippy": "zippyshare",
+    "gd": "google-drive",
+    "gdrive": "google-drive",
+    "drive-google": "google-drive",
+    "mega-nz": "mega",
+    "mf": "mediafire",
+    "pdrain": "pixeldrain",
+}
+
+
+def parse_size_bytes(size: Optional[str]) -> Optional[int]:
+    match = _SIZE_BYTES_REGEX.search(size or "")
+    if not match:
+        return None
+    grouped, plain, unit = match.groups()
+    number = grouped.replace(",", "") if grouped else plain.replace(",", ".")
+    return round(float(number) * _SIZE_UNITS[unit.upper()])
+
+
+def parse_resolution_px(resolution: Optional[str]) -> Optional[int]:
+    match = _RESOLUTION_PX_REGEX.search(resolution or "")
+    if not match:
+        return None
+    if match.group(1):
+        return int(match.group(1))
+    return _K_RESOLUTIONS[match.group(2)]
+
+
+def provider_label(provider: Optional[str]) -> Optional[str]:
+    text = (provider or "").strip()
+    if "://" in text:
+        host = urlsplit(text).hostname or ""
+        host = host[4:] if host.startswith("www.") else host
+        text = host.rsplit(".", 1)[0]
+    text = _PROVIDER_NOISE_REGEX.sub(" ", text)
+    text = re.sub(r"\s+", " ", text).strip(" -|/[]()")
+    return text or None
+
+
+def provider_slug(provider: Optional[str]) -> Optional[str]:
+    label = provider_label(provider)
+    if label is None:
+        return None
+    slug = slugify(label)
+    return _PROVIDER_ALIASES.get(slug, slug)
+
+
+def download_attributes(
+    size: Optional[str], resolution: Optional[str], provider: Optional[str]
+) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    return parse_size_bytes(size), parse_resolution_px(resolution), provider_slug(provider)
+
+
+def slug_from_url(url: str) -> str:
+    return slugify(url.split("/anime/")[-1].strip("/"))
+
+
 def hash_values(values: Iterable[str]) -> str:
     joined = "|".join(sorted(v.strip() for v in values if v))
     return hashlib.sha256(joined.encode("utf-8")).hexdigest()
 
 
 def request_with_retry(
-    session: requests.Session,
+    session: Union[requests.Session, "Transport"],
     method: str,
     url: str,
     *,
@@ -32,10 +115,19 @@ def request_with_retry(
     backoff_factor: float = 1.2,
     retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504),
     timeout: float = 15,
-) -> requests.Response:
+    headers: Optional[Dict[str, str]] = None,
+    limiter: Optional["RateLimiter"] = None,
+    max_retry_after: float = 120,
+) -> Union[requests.Response, "TransportResponse"]:
     attempt = 0
     while True:
-        response = session.request(method, url, timeout=timeout)
+        if limiter is not None:
+            limiter.acquire(url)
+        response = session.request(method, url, timeout=timeout, headers=headers)
+        metrics.inc("http_responses_total", status=response.status_code)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if limiter is not None:
+            limiter.feedback(url, response.status_code, retry_after)
         if response.status_code not in retry_statuses:
             return response
         attempt += 1
@@ -43,6 +135,11 @@ def request_with_retry(
             response.raise_for_status()
             return response
         sleep_time = backoff_factor * (2 ** (attempt - 1))
+        if retry_after is not None:
+            sleep_time = max(sleep_time, min(retry_after, max_retry_after))
+        sleep_time *= random.uniform(1.0, 1.25)
+        response.close()
+        metrics.inc("http_retries_total")
         LOGGER.warning("Retrying %s (%s) in %.1fs", url, response.status_code, sleep_time)
         time.sleep(sleep_time)
 
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from scraper import metrics
+from scraper.models import RunSummary
+from scraper.ratelimit import SharedTokenBucket, TokenBucket
+from scraper.utils import slug_from_url
+
+LOGGER = logging.getLogger(__name__)
+
+_RATE_LIMITER: Optional[TokenBucket] = None
+
+
+def shard_of(slug: str, workers: int) -> int:
+    # Stable across runs and interpreters, unlike hash().
+    digest = hashlib.sha1(slug.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % workers
+
+
+def shard_run_id(run_id: str, shard: Tuple[int, int]) -> str:
+    index, workers = shard
+    return f"{run_id}/{index + 1}of{workers}"
+
+
+def shard_urls(anime_urls: Iterable[str], workers: int) -> List[List[str]]:
+    shards: List[List[str]] = [[] for _ in range(workers)]
+    for url in anime_urls:
+        shards[shard_of(slug_from_url(url), workers)].append(url)
+    return shards
+
+
+def merge_summaries(summaries: Sequence[RunSummary]) -> RunSummary:
+    merged = RunSummary()
+    for summary in summaries:
+        for field in fields(RunSummary):
+            if field.name == "elapsed_seconds":
+                merged.elapsed_seconds = max(merged.elapsed_seconds, summary.elapsed_seconds)
+            else:
+                setattr(merged, field.name, getattr(merged, field.name) + getattr(summary, field.name))
+    return merged
+
+
+def _init_worker(rate_limiter: TokenBucket, setup: Optional[Callable[[], None]]) -> None:
+    global _RATE_LIMITER
+    _RATE_LIMITER = rate_limiter
+    if setup is not None:
+        setup()
+
+
+def _run_shard(
+    target: Callable[..., RunSummary], anime_urls: List[str], shard: Tuple[int, int], kwargs: dict
+) -> Tuple[RunSummary, Dict[str, Any]]:
+    metrics.REGISTRY.reset()
+    summary = target(anime_urls=anime_urls, rate_limiter=_RATE_LIMITER, shard=shard, **kwargs)
+    return summary, metrics.REGISTRY.snapshot()
+
+
+def run_sharded(
+    target: Callable[..., RunSummary],
+    anime_urls: Sequence[str],
+    workers: int,
+    rate: float,
+    setup: Optional[Callable[[], None]] = None,
+    **kwargs: Any,
+) -> RunSummary:
+    context = multiprocessing.get_context("spawn")
+    rate_limiter = SharedTokenBucket(rate, context=context)
+    shards = [(index, urls) for index, urls in enumerate(shard_urls(anime_urls, workers)) if urls]
+    LOGGER.info(
+        "Sharding %s anime across %s workers: %s", len(anime_urls), len(shards), [len(urls) for _, urls in shards]
+    )
+    with ProcessPoolExecutor(
+        max_workers=len(shards) or 1,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(rate_limiter, setup),
+    ) as pool:
+        futures = [pool.submit(_run_shard, target, urls, (index, workers), kwargs) for index, urls in shards]
+        results = [future.result() for future in futures]
+    for _, snapshot in results:
+        metrics.REGISTRY.merge(snapshot)
+    return merge_summaries([summary for summary, _ in results])
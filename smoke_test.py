@@ -8,6 +8,7 @@ from scraper.db import Database
 from scraper.fetcher import Fetcher
 from scraper.parser_detail import parse_anime_detail
 from scraper.parser_list import parse_anime_list
+from scraper.soup import set_backend
 from scraper.updater import Updater
 from scraper.utils import slugify
 
@@ -17,6 +18,7 @@ ANIME_LIST_URL = "https://otakudesu.best/anime-list"
 def main() -> None:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
     config = Config.from_env()
+    set_backend(config.parser_backend)
     db = Database(
         host=config.db_host,
         port=config.db_port,
@@ -0,0 +1,8 @@
+import pytest
+
+from benchmarks.memory_db import MemoryDatabase
+
+
+@pytest.fixture
+def memory_db():
+    return MemoryDatabase()
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import pytest
+import requests
+
+from scraper.archive import HtmlArchive
+from scraper.fetcher import ReplayFetcher
+
+
+def test_archive_deduplicates_identical_bodies(tmp_path: Path):
+    archive = HtmlArchive(tmp_path)
+    first = archive.put("https://example.com/anime/a", "<html>same</html>")
+    second = archive.put("https://example.com/anime/b", "<html>same</html>")
+    assert first == second
+    assert len(list((tmp_path / "blobs").rglob("*.html.gz"))) == 1
+    assert archive.get("https://example.com/anime/b") == "<html>same</html>"
+    assert archive.urls() == ["https://example.com/anime/a", "https://example.com/anime/b"]
+
+
+def test_replay_fetcher_serves_from_archive(tmp_path: Path):
+    archive = HtmlArchive(tmp_path)
+    archive.put("https://example.com/anime/a", "<html>v1</html>")
+    archive.put("https://example.com/anime/a", "<html>v2</html>")
+    fetcher = ReplayFetcher(archive)
+    assert fetcher.fetch_html("https://example.com/anime/a") == "<html>v2</html>"
+    assert fetcher.fetch_if_modified("https://example.com/anime/a") == "<html>v2</html>"
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch_html("https://example.com/anime/missing")
@@ -0,0 +1,36 @@
+import asyncio
+import threading
+import time
+
+from scraper.async_fetcher import AsyncFetcher
+
+
+class FakeFetcher:
+    rate_limit_seconds = 0
+    rate_limiter = None
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def request_html(self, url):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return url
+
+
+def test_async_fetcher_limits_in_flight_per_host():
+    fake = FakeFetcher()
+    fetcher = AsyncFetcher(fake, concurrency=3)
+    urls = [f"https://example.com/anime/{i}" for i in range(12)]
+
+    async def fetch_all():
+        return await asyncio.gather(*(fetcher.fetch_html(url) for url in urls))
+
+    assert asyncio.run(fetch_all()) == urls
+    assert 1 < fake.peak <= 3
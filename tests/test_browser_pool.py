@@ -0,0 +1,83 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from scraper.archive import HtmlArchive
+from scraper.browser_pool import BrowserPool
+from scraper.fetcher import Fetcher
+
+
+class FakePool:
+    def __init__(self):
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        return "<html>rendered</html>"
+
+
+def test_fetcher_renders_through_pool_in_js_mode(tmp_path: Path):
+    pool = FakePool()
+    archive = HtmlArchive(tmp_path)
+    fetcher = Fetcher(0, 1, archive=archive, browser_pool=pool, use_js=True)
+    assert fetcher.request_html("https://example.com/a") == "<html>rendered</html>"
+    assert fetcher.request_if_modified("https://example.com/b") == "<html>rendered</html>"
+    assert pool.urls == ["https://example.com/a", "https://example.com/b"]
+    assert archive.get("https://example.com/a") == "<html>rendered</html>"
+
+
+def test_browser_pool_rejects_unknown_wait_condition():
+    with pytest.raises(ValueError):
+        BrowserPool(wait_until="idle")
+
+
+def test_browser_pool_closes_without_starting():
+    pool = BrowserPool(size=1)
+    pool.close()
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePage:
+    def __init__(self, broken=False):
+        self.context = FakeContext()
+        self.broken = broken
+
+    async def goto(self, url, **kwargs):
+        if self.broken:
+            raise RuntimeError("page crashed")
+
+    async def content(self):
+        return "<html>rendered</html>"
+
+
+def test_browser_pool_recreates_pages_lazily_after_failures():
+    pool = BrowserPool(size=1)
+    broken = FakePage(broken=True)
+    pool._pages = asyncio.Queue()
+    pool._pages.put_nowait(broken)
+    attempts = []
+
+    async def new_page():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise RuntimeError("browser gone")
+        return FakePage()
+
+    pool._new_page = new_page
+    try:
+        assert pool.fetch("https://example.com/a") is None
+        assert broken.context.closed and attempts == []
+        assert pool.fetch("https://example.com/b") is None
+        assert pool.fetch("https://example.com/c") == "<html>rendered</html>"
+        assert pool.fetch("https://example.com/d") == "<html>rendered</html>"
+        assert len(attempts) == 2
+    finally:
+        pool.close()
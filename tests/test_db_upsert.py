@@ -1,5 +1,11 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
 import mysql.connector
 import pytest
+from mysql.connector import pooling
 
 from scraper.config import Config
 from scraper.db import Database
@@ -46,3 +52,35 @@ def test_upsert_anime_idempotent():
     first_id = db.upsert_anime(anime)
     second_id = db.upsert_anime(anime)
     assert first_id == second_id
+
+
+class FakePool:
+    # Fails like MySQLConnectionPool when every connection is checked out.
+    def __init__(self, pool_size, **kwargs):
+        self.free = pool_size
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        with self.lock:
+            if self.free == 0:
+                raise mysql.connector.errors.PoolError("Failed getting connection; pool exhausted")
+            self.free -= 1
+        return SimpleNamespace(commit=lambda: time.sleep(0.01), rollback=lambda: None, close=self.release)
+
+    def release(self):
+        with self.lock:
+            self.free += 1
+
+
+def test_more_threads_than_pool_slots_wait_for_a_connection(monkeypatch):
+    monkeypatch.setattr(pooling, "MySQLConnectionPool", FakePool)
+    db = Database(host="db", port=3306, user="u", password="p", database="anime", pool_size=2)
+
+    def use_connection():
+        with db.connection():
+            pass
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for future in [executor.submit(use_connection) for _ in range(32)]:
+            future.result()
+    assert db._pool.free == 2
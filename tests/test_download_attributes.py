@@ -0,0 +1,95 @@
+import contextlib
+from types import SimpleNamespace
+
+from scraper.backfill import backfill_downloads
+from scraper.db import Database, _typed_download_rows
+from scraper.utils import parse_resolution_px, parse_size_bytes, provider_label, provider_slug
+
+
+def test_parse_size_bytes_uses_binary_units():
+    assert parse_size_bytes("850.7 mb") == 892023603
+    assert parse_size_bytes("1,5 GB") == 1610612736
+    assert parse_size_bytes("700MiB") == 700 * 1024**2
+    assert parse_size_bytes("1,024 MB") == 1024 * 1024**2
+    assert parse_size_bytes("1,500 MB") == 1500 * 1024**2
+    assert parse_size_bytes("1,50 GB") == round(1.5 * 1024**3)
+    assert parse_size_bytes("1,5000 MB") == round(1.5 * 1024**2)
+    assert parse_size_bytes("1,234,567.5 KB") == round(1234567.5 * 1024)
+    assert parse_size_bytes("Episode 12") is None
+    assert parse_size_bytes(None) is None
+
+
+def test_parse_resolution_px():
+    assert parse_resolution_px("720p") == 720
+    assert parse_resolution_px("MKV 1080P") == 1080
+    assert parse_resolution_px("4K") == 2160
+    assert parse_resolution_px("HD") is None
+
+
+def test_provider_slug_normalizes_labels_and_urls():
+    assert provider_slug("Zippy 480p") == "zippyshare"
+    assert provider_slug("GDrive 1.2 GB") == "google-drive"
+    assert provider_slug("https://drive.google.com/open?id=1") == "google-drive"
+    assert provider_slug("https://www.pixeldrain.com/u/aaa") == "pixeldrain"
+    assert provider_slug("Acefile") == "acefile"
+    assert provider_slug("480p") is None
+    assert provider_label("[KFiles] MKV") == "KFiles"
+
+
+class FakeCursor:
+    # Plays the download_provider table for _intern.
+    def __init__(self, providers):
+        self.providers = dict(providers)
+        self.inserted = []
+        self._rows = []
+
+    def execute(self, query, params):
+        if query.startswith("SELECT"):
+            self._rows = [(self.providers[slug], slug) for slug in params if slug in self.providers]
+        else:
+            for slug, name in zip(params[::2], params[1::2]):
+                self.inserted.append((slug, name))
+                self.providers.setdefault(slug, len(self.providers) + 1)
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_typed_download_rows_interns_providers():
+    cur = FakeCursor({"zippyshare": 1})
+    rows = [
+        (7, "https://x/ep-1", None, "MKV", "720p", "300 MB", "Zippy", "https://z/1"),
+        (7, "https://x/ep-1", None, "MP4", "480p", None, "Pdrain 480p", "https://p/1"),
+        (7, "https://x/ep-1", None, None, None, None, None, "https://n/1"),
+    ]
+    typed = _typed_download_rows(cur, rows)
+    assert [row[8:] for row in typed] == [(300 * 1024**2, 720, 1), (None, 480, 2), (None, None, None)]
+    assert typed[0][:8] == rows[0]
+    assert cur.inserted == [("pixeldrain", "Pdrain")]
+
+
+class BackfillDb(Database):
+    # The real write_download_attributes, against a fake connection.
+    def __init__(self, rows, providers):
+        self.rows = rows
+        self.cur = FakeCursor(providers)
+        self.updates = []
+        self.cur.executemany = lambda query, params: self.updates.append(list(params))
+
+    @contextlib.contextmanager
+    def connection(self):
+        yield SimpleNamespace(cursor=lambda: self.cur)
+
+    def iter_download_labels(self, chunk_size=1000):
+        return iter(self.rows)
+
+
+def test_backfill_downloads_writes_typed_values():
+    rows = [(1, "1,024 MB", "1080p", "Zippy"), (2, "700 MB", "720p", "Pdrain 720p"), (3, None, None, None)]
+    db = BackfillDb(rows, {"zippyshare": 1})
+    assert backfill_downloads(db, chunk_size=2) == 3
+    assert db.updates == [
+        [(1024 * 1024**2, 1080, 1, 1), (700 * 1024**2, 720, 2, 2)],
+        [(None, None, None, 3)],
+    ]
+    assert db.cur.inserted == [("pixeldrain", "Pdrain")]
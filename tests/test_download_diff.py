@@ -0,0 +1,47 @@
+from scraper.db import diff_downloads
+from scraper.models import AnimeDownload
+
+
+def make_download(url: str, size: str = "10 MB") -> AnimeDownload:
+    return AnimeDownload(
+        source_url="https://example.com/episode/1",
+        section_title="Episode 1",
+        format="MP4",
+        resolution="480p",
+        size=size,
+        provider="Mega",
+        url=url,
+    )
+
+
+def as_row(row_id: int, download: AnimeDownload) -> tuple:
+    return (
+        row_id,
+        download.source_url,
+        download.section_title,
+        download.format,
+        download.resolution,
+        download.size,
+        download.provider,
+        download.url,
+    )
+
+
+def test_diff_downloads_only_touches_changed_rows():
+    kept = make_download("https://mega.nz/a")
+    gone = make_download("https://mega.nz/b")
+    resized = make_download("https://mega.nz/c")
+    existing = [as_row(1, kept), as_row(2, gone), as_row(3, resized)]
+    new = make_download("https://mega.nz/d")
+    to_insert, to_delete = diff_downloads(
+        existing, [kept, make_download("https://mega.nz/c", size="12 MB"), new, new]
+    )
+    assert to_delete == [2, 3]
+    assert [key[-1] for key in to_insert] == ["https://mega.nz/c", "https://mega.nz/d"]
+
+
+def test_diff_downloads_removes_duplicate_rows():
+    kept = make_download("https://mega.nz/a")
+    to_insert, to_delete = diff_downloads([as_row(1, kept), as_row(2, kept)], [kept])
+    assert to_insert == []
+    assert to_delete == [2]
@@ -0,0 +1,112 @@
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from scraper.db import merge_catalog
+from scraper.export import export_catalog, format_for, run_export
+from scraper.models import AnimeDownload
+
+
+def anime_row(anime_id, slug, updated_at=datetime(2024, 6, 1, 12, 0), poster=True):
+    image = ("https://example.com/p.jpg", f"data/{slug}.webp", 225, 320, "d" * 64) if poster else (None,) * 5
+    return (anime_id, slug, f"https://example.com/anime/{slug}/", slug.title(), "Sinopsis", "Ongoing", "TV",
+            "Action", "h" * 64, updated_at, *image)
+
+
+def download_row(anime_id, resolution):
+    return (anime_id, "https://example.com/episode/1/", "Episode 1", "Mp4", resolution, "50 MB", "Pdrain",
+            f"https://dl.example.com/{anime_id}/{resolution}")
+
+
+class CatalogDb:
+    def __init__(self, anime_rows, download_rows):
+        self.anime_rows = anime_rows
+        self.download_rows = download_rows
+        self.state = {}
+        self.since = []
+
+    def iter_catalog(self, since=None, chunk_size=1000):
+        self.since.append(since)
+        rows = [row for row in self.anime_rows if since is None or row[9] >= since]
+        ids = {row[0] for row in rows}
+        downloads = [row for row in self.download_rows if row[0] in ids]
+        return merge_catalog(iter(rows), iter(downloads), chunk_size)
+
+    def current_timestamp(self):
+        return datetime(2024, 6, 2, 0, 0)
+
+    def get_state(self, key):
+        return self.state.get(key)
+
+    def set_state(self, key, value):
+        self.state[key] = value
+
+
+def test_merge_catalog_nests_downloads_in_chunks():
+    rows = [anime_row(1, "a"), anime_row(2, "b", poster=False), anime_row(4, "c")]
+    downloads = [download_row(1, "360p"), download_row(1, "720p"), download_row(3, "480p")]
+    downloads.append(download_row(4, "1080p"))
+    chunks = list(merge_catalog(iter(rows), iter(downloads), chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    first, second, third = chunks[0] + chunks[1]
+    assert [item.resolution for item in first.downloads] == ["360p", "720p"]
+    assert second.downloads == [] and second.image is None
+    assert third.downloads == [AnimeDownload(*download_row(4, "1080p")[1:])]
+    assert first.anime.slug == "a" and first.image.width == 225
+
+
+def test_jsonl_export_writes_one_record_per_anime(tmp_path):
+    db = CatalogDb([anime_row(1, "a"), anime_row(2, "b")], [download_row(1, "720p")])
+    path = tmp_path / "catalog.jsonl"
+    assert export_catalog(db, path, "jsonl", chunk_size=1) == 2
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record["slug"] for record in records] == ["a", "b"]
+    assert records[0]["downloads"][0]["url"] == "https://dl.example.com/1/720p"
+    assert records[0]["updated_at"] == "2024-06-01T12:00:00"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_sqlite_export_applies_incremental_changes_in_place(tmp_path):
+    path = tmp_path / "catalog.sqlite"
+    db = CatalogDb([anime_row(1, "a"), anime_row(2, "b")], [download_row(1, "360p"), download_row(2, "720p")])
+    assert run_export(db, path, "sqlite") == 2
+
+    db.anime_rows[1] = anime_row(2, "b", updated_at=datetime(2024, 6, 3))
+    db.download_rows = [download_row(1, "360p"), download_row(2, "1080p")]
+    assert run_export(db, path, "sqlite", since="last") == 1
+    assert db.since == [None, datetime(2024, 6, 2)]
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM anime").fetchone()[0] == 2
+    assert conn.execute("SELECT anime_id, resolution FROM anime_download ORDER BY anime_id").fetchall() == [
+        (1, "360p"),
+        (2, "1080p"),
+    ]
+    assert conn.execute("SELECT COUNT(*) FROM anime_image").fetchone()[0] == 2
+
+
+def test_incremental_sqlite_export_to_new_file_is_full(tmp_path):
+    db = CatalogDb([anime_row(1, "a"), anime_row(2, "b", updated_at=datetime(2024, 6, 3))], [])
+    assert run_export(db, tmp_path / "catalog.sqlite", "sqlite") == 2
+    assert run_export(db, tmp_path / "other.sqlite", "sqlite", since="last") == 2
+    assert run_export(db, tmp_path / "other.sqlite", "sqlite", since="last") == 1
+    assert db.since == [None, None, datetime(2024, 6, 2)]
+    assert len(db.state) == 2
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    db = CatalogDb([anime_row(1, "a"), anime_row(2, "b", poster=False)], [download_row(1, "720p")])
+    path = tmp_path / "catalog.parquet"
+    export_catalog(db, path, "parquet", chunk_size=1)
+    table = pq.read_table(path)
+    assert table.num_rows == 2
+    assert table.column("downloads").to_pylist()[0][0]["resolution"] == "720p"
+
+
+def test_format_for_suffix(tmp_path):
+    assert format_for(tmp_path / "x.jsonl") == "jsonl"
+    assert format_for(tmp_path / "x.sqlite3") == "sqlite"
+    assert format_for(tmp_path / "x.csv") is None
@@ -0,0 +1,77 @@
+import contextlib
+from types import SimpleNamespace
+
+from scraper.db import Database
+from scraper.frontier import CrawlFrontier
+from scraper.models import FrontierItem
+
+
+def test_retry_delay_backs_off_then_dead_letters():
+    frontier = CrawlFrontier(None, "run", max_attempts=4, backoff_seconds=10, max_backoff_seconds=30)
+    assert [frontier.retry_delay(attempt) for attempt in (1, 2, 3)] == [10, 20, 30]
+    assert frontier.retry_delay(4) is None
+
+
+class FakeCursor:
+    # Records statements and answers the claim SELECT with canned rows.
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.executed = []
+        self.rowcount = 0
+
+    def execute(self, query, params):
+        self.executed.append((" ".join(query.split()), list(params)))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FrontierDb(Database):
+    # The real frontier queries, against a fake connection.
+    def __init__(self, rows=()):
+        self.cur = FakeCursor(rows)
+
+    @contextlib.contextmanager
+    def connection(self):
+        yield SimpleNamespace(cursor=lambda: self.cur)
+
+
+def test_claim_dead_letters_expired_leases_then_leases_ready_rows():
+    db = FrontierDb([(7, "https://x/anime/a/", "anime", 0), (9, "https://x/anime/b/", "anime", 2)])
+    items = db.frontier_claim("run", "host:1", limit=5, lease_seconds=600.5, max_attempts=3)
+    assert items == [
+        FrontierItem(id=7, url="https://x/anime/a/", kind="anime", attempts=1),
+        FrontierItem(id=9, url="https://x/anime/b/", kind="anime", attempts=3),
+    ]
+    (dead, dead_params), (select, select_params), (lease, lease_params) = db.cur.executed
+    assert "SET `state`='dead'" in dead and "lease_expires_at < NOW() AND attempts >= %s" in dead
+    assert dead_params == ["run", 3]
+    assert "OR (`state`='leased' AND lease_expires_at < NOW())" in select
+    assert select.endswith("ORDER BY priority DESC, id LIMIT %s FOR UPDATE SKIP LOCKED")
+    assert select_params == ["run", 5]
+    assert "SET `state`='leased', lease_owner=%s" in lease and "attempts=attempts+1" in lease
+    assert lease_params == ["host:1", 600, 7, 9]
+
+
+def test_claim_without_ready_rows_leases_nothing():
+    db = FrontierDb()
+    assert db.frontier_claim("run", "host:1", limit=5, lease_seconds=60, max_attempts=3) == []
+    assert len(db.cur.executed) == 2
+
+
+def test_complete_only_touches_rows_leased_by_the_owner():
+    db = FrontierDb()
+    db.frontier_complete("host:1", [7, 9])
+    [(query, params)] = db.cur.executed
+    assert "SET `state`='done'" in query and query.endswith("WHERE lease_owner=%s AND id IN (%s, %s)")
+    assert params == ["host:1", 7, 9]
+
+
+def test_fail_reschedules_or_dead_letters_for_the_owner_only():
+    db = FrontierDb()
+    db.frontier_fail("host:1", 7, "boom", 120)
+    db.frontier_fail("host:1", 9, "x" * 3000, None)
+    (retry, retry_params), (_, dead_params) = db.cur.executed
+    assert retry.endswith("WHERE id=%s AND lease_owner=%s")
+    assert retry_params == ["pending", 120, "boom", 7, "host:1"]
+    assert dead_params == ["dead", 0, "x" * 2000, 9, "host:1"]
@@ -0,0 +1,47 @@
+from scraper.backfill import backfill_genres
+from scraper.bitmap_index import BitmapIndex
+from scraper.db import genre_links
+from scraper.models import Anime
+
+
+def test_genre_links_dedupes_and_slugifies():
+    names, links = genre_links([(1, "Action, Slice of Life, action"), (2, None), (3, "Comedy,Action")])
+    assert names == {"action": "Action", "slice-of-life": "Slice of Life", "comedy": "Comedy"}
+    assert links == [(1, "action"), (1, "slice-of-life"), (3, "comedy"), (3, "action")]
+
+
+def test_bitmap_index_intersects_and_reuses_positions():
+    index = BitmapIndex()
+    index.add(10, ["Action", "Comedy"])
+    index.add(11, ["Action"])
+    index.add(12, ["comedy", "Romance"])
+    assert list(index.ids(index.mask(["action", "COMEDY"]))) == [10]
+    assert sorted(index.ids(index.any_mask(["Action", "Romance"]))) == [10, 11, 12]
+    assert sorted(index.ids(index.mask())) == [10, 11, 12]
+    assert index.mask(["Horror"]) == 0
+
+    index.remove(10)
+    assert index.counts() == {"Action": 1, "Comedy": 1, "Romance": 1}
+    index.add(13, ["Action", "Comedy"])
+    assert len(index) == 3 and index.mask().bit_length() == 3
+    assert index.contains(index.mask(["Action"]), 13)
+    assert not index.contains(index.mask(["Action"]), 12)
+
+
+class GenreDb:
+    def __init__(self, count):
+        self.rows = [(i, Anime(f"a{i}", "", "", "", genres="Action, Comedy"), None) for i in range(count)]
+        self.writes = []
+
+    def iter_anime(self, since=None, chunk_size=1000):
+        return iter(self.rows)
+
+    def write_genres(self, items):
+        self.writes.append(list(items))
+
+
+def test_backfill_genres_writes_in_chunks():
+    db = GenreDb(5)
+    assert backfill_genres(db, chunk_size=2) == 5
+    assert [len(chunk) for chunk in db.writes] == [2, 2, 1]
+    assert db.writes[0][0] == (0, "Action, Comedy")
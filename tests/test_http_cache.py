@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from scraper import fetcher as fetcher_module
+from scraper.fetcher import Fetcher
+from scraper.http_cache import Validators, ValidatorStore
+from scraper.transport import TransportResponse
+
+
+def make_response(status_code: int, body: bytes = b"", headers=None) -> TransportResponse:
+    return TransportResponse(
+        "https://example.com/a",
+        status_code,
+        CaseInsensitiveDict(headers or {}),
+        iter([body]),
+        lambda: len(body),
+        lambda: None,
+    )
+
+
+def test_validator_store_roundtrip(tmp_path: Path):
+    store = ValidatorStore(tmp_path / "cache.sqlite3")
+    store.put("https://example.com/a", Validators(etag='"v1"', last_modified=None, digest="abc"))
+    assert store.get("https://example.com/a") == Validators(etag='"v1"', last_modified=None, digest="abc")
+    store.delete("https://example.com/a")
+    assert store.get("https://example.com/a") is None
+
+
+def test_fetch_if_modified_sends_validators_and_handles_304(tmp_path: Path, monkeypatch):
+    sent_headers = []
+    responses = [
+        make_response(200, b"<html>v1</html>", {"ETag": '"v1"'}),
+        make_response(304),
+    ]
+
+    def fake_request(session, method, url, **kwargs):
+        sent_headers.append(kwargs.get("headers"))
+        return responses.pop(0)
+
+    monkeypatch.setattr(fetcher_module, "request_with_retry", fake_request)
+    fetcher = Fetcher(0, 5, validator_store=ValidatorStore(tmp_path / "cache.sqlite3"))
+    assert fetcher.fetch_if_modified("https://example.com/a") == "<html>v1</html>"
+    assert fetcher.fetch_if_modified("https://example.com/a") is None
+    assert sent_headers == [None, {"If-None-Match": '"v1"'}]
+
+
+def test_fetch_if_modified_detects_unchanged_body_without_validators(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(
+        fetcher_module,
+        "request_with_retry",
+        lambda session, method, url, **kwargs: make_response(200, b"<html>same</html>"),
+    )
+    fetcher = Fetcher(0, 5, validator_store=ValidatorStore(tmp_path / "cache.sqlite3"))
+    assert fetcher.fetch_html("https://example.com/a") == "<html>same</html>"
+    assert fetcher.fetch_if_modified("https://example.com/a") is None
+    fetcher.forget("https://example.com/a")
+    assert fetcher.fetch_if_modified("https://example.com/a") == "<html>same</html>"
+
+
+def test_304_without_cached_entry_is_an_error(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(fetcher_module, "request_with_retry", lambda session, method, url, **kwargs: make_response(304))
+    fetcher = Fetcher(0, 5, validator_store=ValidatorStore(tmp_path / "cache.sqlite3"))
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch_if_modified("https://example.com/a")
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch_html("https://example.com/a")
@@ -4,7 +4,8 @@ from io import BytesIO
 
 from PIL import Image
 
-from scraper.image_pipeline import save_webp
+from scraper.image_pipeline import ImagePipeline, perceptual_hash, save_webp, save_webp_variants
+from scraper.image_store import ImageBlobStore
 
 
 def test_save_webp(tmp_path: Path):
@@ -16,3 +17,76 @@ def test_save_webp(tmp_path: Path):
     assert width == 16
     assert height == 12
     assert image_path.exists()
+
+
+def make_png(color: str = "red") -> bytes:
+    img = Image.new("RGB", (16, 12), color=color)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_image_pipeline_skips_unchanged_poster(tmp_path: Path, monkeypatch):
+    pipeline = ImagePipeline(download_workers=1, encode_workers=1)
+    requested = []
+
+    def fake_download(url):
+        requested.append(url)
+        return make_png()
+
+    monkeypatch.setattr(pipeline, "_download", fake_download)
+    saved = []
+    with pipeline:
+        pipeline.submit("https://example.com/a.png", tmp_path / "a.webp", None, saved.append)
+        pipeline.join()
+        first = saved[0]
+        assert (first.width, first.height) == (16, 12)
+        assert pipeline.submit("https://example.com/a.png", tmp_path / "a.webp", first, saved.append) is None
+        pipeline.submit("https://example.com/b.png", tmp_path / "a.webp", first, saved.append)
+    assert requested == ["https://example.com/a.png", "https://example.com/b.png"]
+    assert saved[1].original_url == "https://example.com/b.png"
+    assert saved[1].source_digest == first.source_digest
+
+
+def test_save_webp_variants_from_one_decode(tmp_path: Path):
+    img = Image.new("RGB", (400, 600), color="blue")
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG")
+    variants = save_webp_variants(
+        buffer.getvalue(),
+        tmp_path / "poster.webp",
+        [("thumb", 100), ("card", 200)],
+    )
+    assert [(v.name, v.width, v.height) for v in variants] == [("card", 200, 300), ("thumb", 100, 150)]
+    assert variants[0].local_webp_path == str(tmp_path / "poster.webp")
+    assert Path(variants[1].local_webp_path).name == "poster.thumb.webp"
+    assert all(Path(v.local_webp_path).exists() for v in variants)
+
+
+def test_image_pipeline_deduplicates_shared_posters(tmp_path: Path, monkeypatch):
+    store = ImageBlobStore(tmp_path / "blobs", phash_distance=4)
+    pipeline = ImagePipeline(download_workers=1, encode_workers=1, blob_store=store)
+    bodies = {"https://example.com/a.png": make_png(), "https://example.com/b.png": make_png()}
+    monkeypatch.setattr(pipeline, "_download", bodies.get)
+    saved = []
+    with pipeline:
+        pipeline.submit("https://example.com/a.png", tmp_path / "a.webp", None, saved.append)
+        pipeline.join()
+        pipeline.submit("https://example.com/b.png", tmp_path / "b.webp", None, saved.append)
+    assert len(list((tmp_path / "blobs").rglob("*.webp"))) == 1
+    assert (tmp_path / "a.webp").stat().st_ino == (tmp_path / "b.webp").stat().st_ino
+    assert [image.local_webp_path for image in saved] == [str(tmp_path / "a.webp"), str(tmp_path / "b.webp")]
+
+
+def test_perceptual_hash_ignores_reencoding():
+    img = Image.new("RGB", (72, 64))
+    for x in range(72):
+        for y in range(64):
+            shade = ((x // 8) * 37 + (y // 8) * 91) % 256
+            img.putpixel((x, y), (shade, shade, shade))
+    png, jpeg = BytesIO(), BytesIO()
+    img.save(png, format="PNG")
+    img.resize((144, 128)).save(jpeg, format="JPEG", quality=70)
+    original = perceptual_hash(png.getvalue())
+    assert original != 0
+    assert (original ^ perceptual_hash(jpeg.getvalue())).bit_count() <= 4
@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+
+from scraper import metrics
+from scraper.metrics import Registry
+from scraper.parser_list import parse_anime_list
+
+
+def test_prometheus_output_has_cumulative_buckets():
+    registry = Registry()
+    registry.inc("http_responses_total", status=200)
+    registry.inc("http_responses_total", 2, status=503)
+    registry.observe("fetch_seconds", 0.003, kind="page")
+    registry.observe("fetch_seconds", 0.2, kind="page")
+    text = registry.to_prometheus()
+    assert 'anime_scraper_http_responses_total{status="503"} 2' in text
+    assert 'anime_scraper_fetch_seconds_bucket{kind="page",le="0.005"} 1' in text
+    assert 'anime_scraper_fetch_seconds_bucket{kind="page",le="0.25"} 2' in text
+    assert 'anime_scraper_fetch_seconds_count{kind="page"} 2' in text
+
+
+def test_merge_adds_worker_snapshots():
+    parent, worker = Registry(), Registry()
+    parent.inc("anime_total", result="stored")
+    worker.inc("anime_total", 3, result="stored")
+    worker.observe("db_seconds", 0.02, op="write_batch")
+    parent.merge(json.loads(json.dumps(worker.snapshot())))
+    assert parent.counter("anime_total", result="stored") == 4
+    assert parent.histogram("db_seconds", op="write_batch").count == 1
+
+
+def test_report_includes_summary_and_parser_timings(tmp_path: Path):
+    metrics.REGISTRY.reset()
+    parse_anime_list('<a href="/anime/test/">Test</a>', "https://example.com/anime-list")
+    path = metrics.write_report(tmp_path, "full", {"stored": 1})
+    report = json.loads(path.read_text())
+    assert report["summary"] == {"stored": 1}
+    names = {(item["name"], item["labels"].get("page")) for item in report["metrics"]["histograms"]}
+    assert ("parse_seconds", "list") in names
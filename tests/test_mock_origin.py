@@ -0,0 +1,40 @@
+import requests
+
+from scraper.fetcher import Fetcher
+from scraper.mock_origin import MockOrigin, OriginBehavior
+from scraper.parser_list import parse_anime_list
+from scraper.synthetic import SyntheticSite
+from scraper.updater import Updater
+
+
+def test_full_and_daily_runs_against_mock_origin(tmp_path, memory_db):
+    site = SyntheticSite(anime_count=6, episodes=2, download_rows=4)
+    with MockOrigin(site) as origin:
+        fetcher = Fetcher(0, 5)
+        anime_urls = parse_anime_list(fetcher.fetch_html(origin.list_url), origin.list_url)
+        assert len(anime_urls) == 6 and all(url.startswith(origin.base_url) for url in anime_urls)
+
+        db = memory_db
+        summary = Updater(db, fetcher, tmp_path, process_images=False, concurrency=3).full_update(anime_urls)
+        assert summary.stored == 6
+        assert all(item.url.startswith("https://") for rows in db.downloads.values() for _, item in rows)
+
+        for anime in db.anime.values():
+            anime.status = "Ongoing"
+        changed = origin.mutate(0.5)
+        summary = Updater(db, fetcher, tmp_path, process_images=False).daily_update(anime_urls)
+        assert summary.stored == len(changed) == 3
+        assert summary.unchanged == 3
+
+
+def test_injected_errors_carry_retry_after_and_etags_revalidate():
+    site = SyntheticSite(anime_count=1)
+    with MockOrigin(site, behavior=OriginBehavior(error_rate=1.0, error_statuses=(429,), retry_after=7)) as origin:
+        response = requests.get(origin.list_url, timeout=5)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "7"
+    with MockOrigin(site) as origin:
+        first = requests.get(origin.list_url, timeout=5)
+        second = requests.get(origin.list_url, headers={"If-None-Match": first.headers["ETag"]}, timeout=5)
+        assert second.status_code == 304
+        assert origin.stats()["status_304"] == 1
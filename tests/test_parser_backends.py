@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+from scraper.parser_detail import parse_anime_detail, parse_download_page
+from scraper.parser_list import parse_anime_list
+
+pytest.importorskip("lxml")
+
+PAGES = Path(__file__).parent / "fixtures" / "pages"
+BASE_URL = "https://otakudesu.best/anime/bocchi-the-rock-sub-indo/"
+
+
+def read_page(name: str) -> str:
+    return (PAGES / name).read_text(encoding="utf-8")
+
+
+def test_parse_anime_list_backends_match():
+    html = read_page("anime_list.html")
+    expected = parse_anime_list(html, "https://otakudesu.best/anime-list", backend="html.parser")
+    assert len(expected) == 5
+    assert parse_anime_list(html, "https://otakudesu.best/anime-list", backend="lxml") == expected
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["anime_detail.html", "anime_detail_fallback.html", "anime_detail_href_only.html"],
+)
+def test_parse_anime_detail_backends_match(name: str):
+    html = read_page(name)
+    expected = parse_anime_detail(html, BASE_URL, backend="html.parser")
+    assert expected[6]
+    assert parse_anime_detail(html, BASE_URL, backend="lxml") == expected
+
+
+def test_parse_download_page_backends_match():
+    html = read_page("download_page.html")
+    expected = parse_download_page(html, BASE_URL, backend="html.parser")
+    assert len(expected) == 8
+    assert parse_download_page(html, BASE_URL, backend="lxml") == expected
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from scraper.parser_detail import parse_anime_detail, parse_download_page
+
+PAGES = Path(__file__).parent / "fixtures" / "pages"
+BASE_URL = "https://otakudesu.best/anime/bocchi-the-rock-sub-indo/"
+
+
+def read_page(name: str) -> str:
+    return (PAGES / name).read_text(encoding="utf-8")
+
+
+def test_preferred_selectors_keep_priority_order():
+    downloads = parse_anime_detail(read_page("anime_detail.html"), BASE_URL)[6]
+    assert downloads == [
+        ("GDrive", "https://drive.google.com/file/d/1"),
+        ("DesuDrive", "https://desudrive.com/link/?id=abc"),
+        ("Mega mirror", "https://mega.nz/file/xyz"),
+        ("Batch", "https://otakudesu.best/batch/bocchi-the-rock-batch-sub-indo/"),
+    ]
+
+
+def test_download_pages_are_unique_and_ordered():
+    pages = parse_anime_detail(read_page("anime_detail.html"), BASE_URL)[7]
+    assert pages == [
+        "https://otakudesu.best/batch/bocchi-the-rock-batch-sub-indo/",
+        "https://otakudesu.best/episode/btr-episode-12-sub-indo/",
+        "https://otakudesu.best/episode/btr-episode-11-sub-indo/",
+        "https://otakudesu.best/episode/btr-episode-10-sub-indo/",
+    ]
+
+
+def test_container_and_href_fallbacks():
+    container = parse_anime_detail(read_page("anime_detail_fallback.html"), BASE_URL)[6]
+    assert container == [("PixelDrain", "https://pixeldrain.com/u/aaa"), ("Kosong", BASE_URL)]
+    href_only = parse_anime_detail(read_page("anime_detail_href_only.html"), BASE_URL)[6]
+    assert href_only == [
+        ("Zippy 480p", "https://zippyshare.com/v/abc/file.html"),
+        ("Google Drive", "https://drive.google.com/open?id=1"),
+    ]
+
+
+def test_download_page_tracks_nearest_heading():
+    rows = parse_download_page(read_page("download_page.html"), BASE_URL)
+    sections = [row[0] for row in rows]
+    assert sections[:6] == ["Bocchi the Rock! Episode 1 – 12 [BATCH] Sub Indo"] * 6
+    assert sections[6:] == ["Bocchi the Rock! OVA"] * 2
+    assert rows[6] == (
+        "Bocchi the Rock! OVA",
+        "MKV",
+        "1080p",
+        "850.7 mb",
+        "Acefile",
+        "https://otakudesu.best/dl/ova-1080",
+    )
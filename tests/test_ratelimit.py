@@ -0,0 +1,96 @@
+import time
+from email.utils import formatdate
+
+from scraper import utils
+from scraper.ratelimit import (
+    AdaptiveRateLimiter,
+    SharedTokenBucket,
+    TokenBucket,
+    parse_retry_after,
+    rate_from_interval,
+)
+
+
+def test_token_bucket_first_token_is_free():
+    bucket = TokenBucket(rate=2.0)
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_queues_reservations():
+    bucket = TokenBucket(rate=2.0)
+    bucket.reserve()
+    second = bucket.reserve()
+    third = bucket.reserve()
+    assert 0.4 < second <= 0.5
+    assert 0.9 < third <= 1.0
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(rate=rate_from_interval(0))
+    assert all(bucket.reserve() == 0.0 for _ in range(5))
+
+
+def test_shared_token_bucket_queues_reservations():
+    bucket = SharedTokenBucket(rate=10.0)
+    assert bucket.reserve() == 0.0
+    assert 0.05 < bucket.reserve() <= 0.1
+
+
+def test_adaptive_limiter_raises_rate_on_success_and_halves_on_throttle():
+    limiter = AdaptiveRateLimiter(initial_rate=1.0, max_rate=2.0, increase=0.5, jitter=0)
+    url = "https://example.com/anime/a"
+    limiter.feedback(url, 200)
+    limiter.feedback(url, 304)
+    limiter.feedback(url, 200)
+    assert limiter.rate(url) == 2.0
+    limiter.feedback(url, 429)
+    assert limiter.rate(url) == 1.0
+    limiter.feedback(url, 500)
+    assert limiter.rate(url) == 1.0
+
+
+def test_adaptive_limiter_honors_retry_after_per_host():
+    limiter = AdaptiveRateLimiter(initial_rate=100.0, max_rate=100.0, jitter=0)
+    limiter.feedback("https://slow.example/a", 503, retry_after=5)
+    assert 4.9 < limiter.reserve("https://slow.example/b") <= 5.0
+    assert limiter.reserve("https://fast.example/a") == 0.0
+    assert limiter.rate("https://fast.example/a") == 100.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    later = formatdate(time.time() + 30, usegmt=True)
+    assert 25 < parse_retry_after(later) <= 30
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self._responses = list(responses)
+
+    def request(self, method, url, timeout=None, headers=None):
+        return self._responses.pop(0)
+
+
+def test_request_with_retry_waits_for_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(utils.time, "sleep", sleeps.append)
+    limiter = AdaptiveRateLimiter(initial_rate=1.0, jitter=0)
+    session = FakeSession([FakeResponse(429, {"Retry-After": "10"}), FakeResponse(200)])
+    response = utils.request_with_retry(session, "GET", "https://example.com/", limiter=limiter)
+    assert response.status_code == 200
+    assert 10 <= sleeps[0] <= 12.5
+    assert limiter.rate("https://example.com/") == 0.55
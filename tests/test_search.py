@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+from urllib.request import urlopen
+
+from scraper.models import Anime
+from scraper.search import SearchServer, SearchService, TTLCache, tokenize
+
+
+def make_anime(slug, title, synopsis, genres, status="Ongoing"):
+    return Anime(slug=slug, source_url=f"https://example.com/anime/{slug}/", title=title, synopsis=synopsis,
+                 status=status, type="TV", genres=genres)
+
+
+class AnimeDb:
+    def __init__(self):
+        self.rows = {
+            1: (make_anime("naruto", "Naruto Shippuuden Sub Indo", "Ninja dari desa Konoha", "Action, Adventure"),
+                datetime(2024, 6, 1)),
+            2: (make_anime("ryou", "Ryō no Kōkai", "Kisah petualangan di lautan", "Adventure, Comedy"),
+                datetime(2024, 6, 1)),
+            3: (make_anime("kaguya", "Kaguya-sama wa Kokurasetai", "Perang cinta di OSIS", "Comedy, Romance",
+                           status="Completed"), datetime(2024, 6, 1)),
+        }
+        self.since = []
+
+    def iter_anime(self, since=None, chunk_size=1000):
+        self.since.append(since)
+        for anime_id, (anime, updated_at) in sorted(self.rows.items()):
+            if since is None or updated_at >= since:
+                yield anime_id, anime, updated_at
+
+
+def test_tokenize_folds_long_vowels_and_drops_particles():
+    assert tokenize("Naruto Shippūden") == tokenize("naruto shippuuden") == ["naruto", "shippuden"]
+    assert tokenize("Ryou no Koukai") == tokenize("Ryō no Kōkai") == ["ryo", "kokai"]
+    assert tokenize("Petualangannya dan ceritanya") == ["petualangan", "cerita"]
+
+
+def test_search_ranks_titles_and_matches_prefixes():
+    service = SearchService(AnimeDb())
+    assert service.refresh() == 3
+    assert [hit["slug"] for hit in service.search("shippuden")["results"]] == ["naruto"]
+    assert [hit["slug"] for hit in service.search("kaguya koku")["results"]] == ["kaguya"]
+    adventure = service.search("adventure")
+    assert adventure["total"] == 2
+    comedy = service.search("", genres=["comedy"], status="ongoing")
+    assert [hit["slug"] for hit in comedy["results"]] == ["ryou"]
+    assert service.lookup("kaguya")["synopsis"] == "Perang cinta di OSIS"
+    assert service.lookup("missing") is None
+
+
+def test_refresh_is_incremental_and_clears_the_cache():
+    db = AnimeDb()
+    service = SearchService(db)
+    service.refresh()
+    assert service.search("ninja")["total"] == 1
+    assert service.refresh() == 0
+    assert db.since[-1] == datetime(2024, 6, 1)
+
+    db.rows[1] = (make_anime("naruto", "Naruto", "Shinobi muda", "Action"), datetime(2024, 6, 2))
+    assert service.refresh() == 1
+    assert service.search("ninja")["total"] == 0
+    assert service.search("shinobi")["total"] == 1
+
+
+def test_ttl_cache_evicts_oldest_and_expired_entries():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    now[0] = 11
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_http_endpoint_serves_search_lookup_and_genres():
+    with SearchServer(SearchService(AnimeDb()), refresh_seconds=0) as server:
+        with urlopen(f"{server.base_url}/search?q=kokai&genre=Adventure") as response:
+            assert [hit["slug"] for hit in json.load(response)["results"]] == ["ryou"]
+        with urlopen(f"{server.base_url}/anime/naruto") as response:
+            assert json.load(response)["genres"] == ["Action", "Adventure"]
+        with urlopen(f"{server.base_url}/genres") as response:
+            assert json.load(response)["Comedy"] == 2
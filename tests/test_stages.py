@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from scraper.stages import Stage, StagedPipeline
+
+
+def test_pipeline_runs_every_job_through_all_stages():
+    done = []
+    lock = threading.Lock()
+
+    def record(job):
+        with lock:
+            done.append(job)
+
+    StagedPipeline(
+        [
+            Stage("double", lambda job: job.append(job[0] * 2) is None, workers=3),
+            Stage("keep-even", lambda job: job[0] % 2 == 0, workers=2),
+            Stage("tag", lambda job: job.append("tagged") is None),
+        ],
+        queue_size=2,
+        on_done=record,
+    ).run([index] for index in range(20))
+    assert sorted(job[0] for job in done) == list(range(20))
+    assert all(job[-1] == "tagged" for job in done if job[0] % 2 == 0)
+    assert all(len(job) == 2 for job in done if job[0] % 2)
+
+
+def test_pipeline_raises_first_failure_without_on_error():
+    def explode(job):
+        if job == 3:
+            raise RuntimeError("boom")
+        return True
+
+    with pytest.raises(RuntimeError):
+        StagedPipeline([Stage("explode", explode, workers=2), Stage("noop", lambda job: True)]).run(range(50))
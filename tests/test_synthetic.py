@@ -0,0 +1,33 @@
+import pytest
+
+from scraper.parser_detail import parse_anime_detail, parse_download_page
+from scraper.parser_list import parse_anime_list
+from scraper.synthetic import LIST_URL, SyntheticFetcher, SyntheticSite
+
+
+def test_synthetic_site_parses_like_the_real_one():
+    site = SyntheticSite(anime_count=20, episodes=3, download_rows=10)
+    fetcher = SyntheticFetcher(site)
+    anime_urls = parse_anime_list(fetcher.fetch_html(LIST_URL), LIST_URL)
+    assert sorted(anime_urls) == sorted(site.anime_urls)
+    title, _, genres, status, anime_type, poster_url, downloads, pages = parse_anime_detail(
+        fetcher.fetch_html(anime_urls[0]), anime_urls[0]
+    )
+    assert title and genres and status and anime_type == "TV" and poster_url
+    assert len(downloads) == 2
+    assert len(pages) == 4
+    rows = parse_download_page(fetcher.fetch_html(pages[0]), pages[0])
+    assert len(rows) == 20
+    assert all(row[1] and row[2] and row[3] for row in rows)
+
+
+def test_bump_changes_only_that_anime():
+    site = SyntheticSite(anime_count=3, episodes=1, download_rows=4)
+    first = site.slugs[0]
+    before = [site.page(url) for url in site.anime_urls]
+    site.bump(first)
+    after = [site.page(url) for url in site.anime_urls]
+    assert after[0] != before[0]
+    assert after[1:] == before[1:]
+    with pytest.raises(KeyError):
+        SyntheticFetcher(site).fetch_html("https://otakudesu.best/anime/missing/")
@@ -0,0 +1,97 @@
+import gzip
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from scraper import metrics
+from scraper.fetcher import Fetcher
+from scraper.mock_origin import MockOrigin
+from scraper.synthetic import SyntheticSite
+from scraper.transport import Transport, TransportResponse, accept_encoding, read_text
+from scraper.utils import request_with_retry
+
+
+def test_transport_streams_gzip_and_counts_wire_bytes():
+    site = SyntheticSite(anime_count=20)
+    with MockOrigin(site) as origin, Transport(pool_size=2, backend="requests") as transport:
+        with transport.request("GET", origin.list_url) as response:
+            assert response.headers["Content-Encoding"] == "gzip"
+            html, _ = read_text(response)
+        assert origin.base_url + "/anime/" in html
+        assert 0 < response.wire_bytes < response.decoded_bytes == len(html.encode("utf-8"))
+
+
+def test_read_text_decodes_characters_split_across_chunks():
+    body = "ナルト – Shippuden".encode("utf-8")
+    response = TransportResponse(
+        "https://example.com/",
+        200,
+        CaseInsensitiveDict({"Content-Type": "text/html; charset=UTF-8"}),
+        iter([body[:1], body[1:4], body[4:]]),
+        lambda: len(body),
+        lambda: None,
+    )
+    text, digest = read_text(response)
+    assert text == "ナルト – Shippuden"
+    assert len(digest) == 64
+
+
+def test_fetcher_reports_wire_and_decoded_bytes():
+    metrics.REGISTRY.reset()
+    site = SyntheticSite(anime_count=5)
+    with MockOrigin(site) as origin:
+        Fetcher(0, 5).fetch_html(origin.list_url)
+    wire = metrics.REGISTRY.counter("fetch_wire_bytes_total", kind="page")
+    decoded = metrics.REGISTRY.counter("fetch_bytes_total", kind="page")
+    assert 0 < wire < decoded
+
+
+def test_accept_encoding_always_offers_gzip():
+    assert "gzip" in accept_encoding()
+
+
+def test_httpx_backend_streams_and_counts_wire_bytes():
+    httpx = pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    body = ("<html>" + "Shingeki no Kyojin " * 200 + "</html>").encode("utf-8")
+    seen = {}
+
+    def handler(request):
+        seen["accept_encoding"] = request.headers["Accept-Encoding"]
+        headers = {"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"}
+        return httpx.Response(200, headers=headers, stream=httpx.ByteStream(gzip.compress(body)))
+
+    with Transport(pool_size=2, backend="httpx") as transport:
+        assert transport.backend == "httpx"
+        transport._client = httpx.Client(transport=httpx.MockTransport(handler), headers=transport._client.headers)
+        with transport.request("GET", "https://example.com/anime-list") as response:
+            html, _ = read_text(response)
+    assert "gzip" in seen["accept_encoding"]
+    assert html == body.decode("utf-8")
+    assert 0 < response.wire_bytes < response.decoded_bytes == len(body)
+
+
+def test_httpx_backend_raises_requests_exceptions():
+    httpx = pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+
+    class StalledStream(httpx.SyncByteStream):
+        def __iter__(self):
+            yield b"<html>"
+            raise httpx.ReadTimeout("stalled")
+
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, stream=StalledStream())
+
+    with Transport(pool_size=2, backend="httpx") as transport:
+        transport._client = httpx.Client(transport=httpx.MockTransport(handler))
+        with pytest.raises(requests.ConnectionError):
+            transport.request("GET", "https://example.com/down")
+        with transport.request("GET", "https://example.com/slow") as response:
+            with pytest.raises(requests.ReadTimeout):
+                read_text(response)
+        with pytest.raises(requests.ConnectionError):
+            request_with_retry(transport, "GET", "https://example.com/down", max_retries=0)
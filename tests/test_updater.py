@@ -0,0 +1,282 @@
+from pathlib import Path
+
+from scraper import metrics
+from scraper.models import AnimeIndexEntry, DownloadPageState, FrontierItem
+from scraper.updater import Updater, parse_downloads
+
+DETAIL_HTML = """
+<h1>Test Anime</h1>
+<div class="infozingle"><p>Status: Ongoing</p></div>
+<div class="episodelist"><a href="https://example.com/episode/test-1/">Episode 1</a></div>
+"""
+EPISODE_HTML = """
+<h4>Episode 1</h4>
+<table><tr><td>MP4 480p 50 MB</td><td><a href="https://mega.nz/file/1">Mega</a></td></tr></table>
+"""
+
+
+class FakeDatabase:
+    def __init__(self, index=None):
+        self.index = dict(index or {})
+        self.anime = []
+        self.downloads = {}
+        self.state = {}
+        self.pages = {}
+
+    def load_anime_index(self):
+        return dict(self.index)
+
+    def upsert_anime(self, anime):
+        self.anime.append(anime)
+        return len(self.anime)
+
+    def sync_downloads(self, anime_id, downloads):
+        self.downloads[anime_id] = list(downloads)
+        return len(self.downloads[anime_id]), 0
+
+    def save_download_pages(self, anime_id, pages):
+        fetched, current_urls = pages
+        stored = self.pages.setdefault(anime_id, {})
+        stored.update(fetched)
+        for page_url in list(stored):
+            if page_url not in current_urls:
+                del stored[page_url]
+
+    def load_download_pages(self, anime_id, max_age_seconds):
+        return {
+            page_url: DownloadPageState(fingerprint=fingerprint, fresh=max_age_seconds > 0)
+            for page_url, fingerprint in self.pages.get(anime_id, {}).items()
+        }
+
+    def load_downloads(self, anime_id, source_urls):
+        return [item for item in self.downloads.get(anime_id, []) if item.source_url in source_urls]
+
+    def write_batch(self, anime, downloads, images, pages=None, replace_downloads=False):
+        ids = {}
+        for item in anime:
+            ids[item.slug] = self.upsert_anime(item)
+            self.downloads[ids[item.slug]] = list(downloads[item.slug])
+        return ids, sum(len(items) for items in downloads.values()), 0
+
+    def set_state(self, key, value):
+        self.state[key] = value
+
+
+class FakeFetcher:
+    rate_limit_seconds = 0
+    rate_limiter = None
+
+    def __init__(self):
+        self.requested = []
+
+    def fetch_html(self, url):
+        self.requested.append(url)
+        return DETAIL_HTML if "/anime/" in url else EPISODE_HTML
+
+    request_html = fetch_html
+    fetch_if_modified = fetch_html
+    request_if_modified = fetch_html
+
+    def forget(self, url):
+        pass
+
+
+def test_parse_downloads_adds_typed_attributes():
+    downloads, _ = parse_downloads(
+        "https://example.com/anime/test-anime/", [], [("https://example.com/episode/test-1/", EPISODE_HTML)]
+    )
+    [download] = downloads
+    assert (download.size, download.resolution, download.provider) == ("50 MB", "480p", "Mega")
+    assert (download.size_bytes, download.resolution_px, download.provider_slug) == (50 * 1024**2, 480, "mega")
+
+
+def test_full_update_stores_anime_and_downloads(tmp_path: Path):
+    db = FakeDatabase()
+    updater = Updater(db, FakeFetcher(), tmp_path, process_images=False)
+    updater.full_update(["https://example.com/anime/test-anime/"])
+    assert [anime.slug for anime in db.anime] == ["test-anime"]
+    assert [download.url for download in db.downloads[1]] == ["https://mega.nz/file/1"]
+    assert "last_run" in db.state
+
+
+def test_daily_update_uses_preloaded_index(tmp_path: Path):
+    db = FakeDatabase()
+    Updater(db, FakeFetcher(), tmp_path, process_images=False).full_update(
+        ["https://example.com/anime/test-anime/"]
+    )
+    stored = db.anime[0]
+    db.index = {
+        "test-anime": AnimeIndexEntry(id=1, status="Ongoing", detail_hash=stored.detail_hash, updated_at=None),
+        "old-anime": AnimeIndexEntry(id=2, status="Completed", detail_hash="x", updated_at=None),
+    }
+    fetcher = FakeFetcher()
+    Updater(db, fetcher, tmp_path, process_images=False).daily_update(
+        ["https://example.com/anime/test-anime/", "https://example.com/anime/old-anime/"]
+    )
+    assert len(db.anime) == 1
+    assert "https://example.com/anime/old-anime/" not in fetcher.requested
+
+
+def test_write_behind_updates_index_after_flush(tmp_path: Path):
+    db = FakeDatabase()
+    updater = Updater(db, FakeFetcher(), tmp_path, process_images=False, write_batch_size=10)
+    updater.full_update(["https://example.com/anime/test-anime/", "https://example.com/anime/other/"])
+    assert sorted(anime.slug for anime in db.anime) == ["other", "test-anime"]
+    assert updater._index["test-anime"].detail_hash == db.anime[0].detail_hash
+
+
+def test_page_state_is_not_written_without_incremental_pages(tmp_path: Path):
+    db = FakeDatabase()
+    Updater(db, FakeFetcher(), tmp_path, process_images=False).full_update(["https://example.com/anime/test-anime/"])
+    Updater(db, FakeFetcher(), tmp_path, process_images=False, write_batch_size=10).full_update(
+        ["https://example.com/anime/other/"]
+    )
+    assert db.pages == {}
+    assert len(db.anime) == 2
+
+
+def test_incremental_daily_update_reuses_fresh_pages(tmp_path: Path):
+    db = FakeDatabase()
+    Updater(db, FakeFetcher(), tmp_path, process_images=False, incremental_pages=True).full_update(
+        ["https://example.com/anime/test-anime/"]
+    )
+    assert list(db.pages[1]) == ["https://example.com/episode/test-1/"]
+    stored = db.anime[0]
+    db.index = {
+        "test-anime": AnimeIndexEntry(id=1, status="Ongoing", detail_hash=stored.detail_hash, updated_at=None),
+    }
+
+    fetcher = FakeFetcher()
+    Updater(db, fetcher, tmp_path, process_images=False, incremental_pages=True).daily_update(
+        ["https://example.com/anime/test-anime/"]
+    )
+    assert fetcher.requested == ["https://example.com/anime/test-anime/"]
+    assert len(db.anime) == 1
+
+    fetcher = FakeFetcher()
+    Updater(
+        db, fetcher, tmp_path, process_images=False, incremental_pages=True, page_refresh_seconds=0
+    ).daily_update(["https://example.com/anime/test-anime/"])
+    assert "https://example.com/episode/test-1/" in fetcher.requested
+    assert len(db.anime) == 1
+
+
+def test_refetched_page_with_same_fingerprint_is_not_parsed(tmp_path: Path, monkeypatch):
+    db = FakeDatabase()
+    Updater(db, FakeFetcher(), tmp_path, process_images=False, incremental_pages=True).full_update(
+        ["https://example.com/anime/test-anime/"]
+    )
+    db.index = {"test-anime": AnimeIndexEntry(id=1, status="Ongoing", detail_hash="changed", updated_at=None)}
+    parsed = []
+    monkeypatch.setattr("scraper.updater.parse_download_page", lambda *args, **kwargs: parsed.append(args) or [])
+    metrics.REGISTRY.reset()
+    fetcher = FakeFetcher()
+    Updater(
+        db, fetcher, tmp_path, process_images=False, incremental_pages=True, page_refresh_seconds=0
+    ).daily_update(["https://example.com/anime/test-anime/"])
+    assert "https://example.com/episode/test-1/" in fetcher.requested
+    assert parsed == []
+    assert metrics.REGISTRY.counter("download_pages_unchanged_total") == 1
+    assert [download.url for download in db.downloads[2]] == ["https://mega.nz/file/1"]
+
+
+class FakeFrontier:
+    run_id = "test"
+    batch_size = 10
+
+    def __init__(self):
+        self.items = []
+        self.done = []
+        self.failed = []
+
+    def seed(self, items):
+        for url, kind, priority in items:
+            self.items.append(FrontierItem(id=len(self.items) + 1, url=url, kind=kind, attempts=1))
+
+    def claim(self, limit=None):
+        items, self.items = self.items, []
+        return items
+
+    def complete(self, items):
+        self.done.extend(item.url for item in items)
+
+    def fail(self, item, error):
+        self.failed.append(item.url)
+
+    def remaining(self):
+        return len(self.failed)
+
+
+class FailingFetcher(FakeFetcher):
+    def fetch_html(self, url):
+        if "broken" in url:
+            raise RuntimeError("boom")
+        return super().fetch_html(url)
+
+    request_html = fetch_html
+    fetch_if_modified = fetch_html
+    request_if_modified = fetch_html
+
+
+def test_frontier_run_records_failures_and_keeps_last_run(tmp_path: Path):
+    db = FakeDatabase()
+    frontier = FakeFrontier()
+    Updater(db, FailingFetcher(), tmp_path, process_images=False).full_update(
+        ["https://example.com/anime/test-anime/", "https://example.com/anime/broken/"], frontier=frontier
+    )
+    assert frontier.done == ["https://example.com/anime/test-anime/"]
+    assert frontier.failed == ["https://example.com/anime/broken/"]
+    assert "last_run" not in db.state
+
+
+def test_concurrent_run_logs_failures_and_keeps_going(tmp_path: Path):
+    db = FakeDatabase()
+    urls = ["https://example.com/anime/broken/"] + [f"https://example.com/anime/title-{index}/" for index in range(5)]
+    summary = Updater(db, FailingFetcher(), tmp_path, process_images=False, concurrency=2).full_update(urls)
+    assert summary.failed == 1
+    assert len(db.anime) == 5
+
+
+def test_frontier_completes_items_after_write_behind_flush(tmp_path: Path):
+    db = FakeDatabase()
+    frontier = FakeFrontier()
+    updater = Updater(db, FakeFetcher(), tmp_path, process_images=False, write_batch_size=10, concurrency=2)
+    updater.full_update(["https://example.com/anime/test-anime/", "https://example.com/anime/other/"], frontier=frontier)
+    assert sorted(frontier.done) == ["https://example.com/anime/other/", "https://example.com/anime/test-anime/"]
+    assert len(db.anime) == 2
+    assert "last_run" in db.state
+
+
+def test_staged_pipeline_matches_serial_run(tmp_path: Path):
+    urls = [f"https://example.com/anime/title-{index}/" for index in range(6)]
+    serial_db = FakeDatabase()
+    Updater(serial_db, FakeFetcher(), tmp_path, process_images=False).full_update(urls)
+    staged_db = FakeDatabase()
+    summary = Updater(
+        staged_db, FakeFetcher(), tmp_path, process_images=False, fetch_workers=3, persist_workers=2, stage_queue_size=2
+    ).full_update(urls)
+    assert sorted((anime.slug, anime.detail_hash) for anime in staged_db.anime) == sorted(
+        (anime.slug, anime.detail_hash) for anime in serial_db.anime
+    )
+    assert summary.stored == 6
+
+
+def test_staged_pipeline_reports_failures_to_frontier(tmp_path: Path):
+    db = FakeDatabase()
+    frontier = FakeFrontier()
+    Updater(db, FailingFetcher(), tmp_path, process_images=False, fetch_workers=2).full_update(
+        ["https://example.com/anime/test-anime/", "https://example.com/anime/broken/"], frontier=frontier
+    )
+    assert frontier.done == ["https://example.com/anime/test-anime/"]
+    assert frontier.failed == ["https://example.com/anime/broken/"]
+
+
+def test_parse_pool_metrics_reach_the_parent(tmp_path: Path):
+    metrics.REGISTRY.reset()
+    db = FakeDatabase()
+    Updater(db, FakeFetcher(), tmp_path, process_images=False, fetch_workers=1, parse_workers=1).full_update(
+        ["https://example.com/anime/test-anime/"]
+    )
+    assert [download.url for download in db.downloads[1]] == ["https://mega.nz/file/1"]
+    assert metrics.REGISTRY.histogram("parse_seconds", page="detail").count == 1
+    assert metrics.REGISTRY.histogram("parse_seconds", page="download_page").count == 1
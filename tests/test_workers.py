@@ -0,0 +1,42 @@
+from scraper import metrics
+from scraper.models import RunSummary
+from scraper.utils import slug_from_url
+from scraper.workers import merge_summaries, run_sharded, shard_of, shard_run_id, shard_urls
+
+
+def test_shards_are_stable_and_cover_every_url():
+    urls = [f"https://example.com/anime/title-{index}/" for index in range(50)]
+    shards = shard_urls(urls, 4)
+    assert sorted(url for shard in shards for url in shard) == sorted(urls)
+    assert [set(shard) for shard in shard_urls(reversed(urls), 4)] == [set(shard) for shard in shards]
+
+
+def test_merge_summaries_adds_counts_and_keeps_longest_elapsed():
+    merged = merge_summaries(
+        [
+            RunSummary(anime_seen=3, stored=2, downloads_added=10, elapsed_seconds=4.0),
+            RunSummary(anime_seen=2, failed=1, elapsed_seconds=6.5),
+        ]
+    )
+    assert merged.anime_seen == 5
+    assert merged.stored == 2
+    assert merged.failed == 1
+    assert merged.downloads_added == 10
+    assert merged.elapsed_seconds == 6.5
+
+
+def record_shard(anime_urls, rate_limiter, shard, run_id):
+    # Stands in for main.update in the worker processes.
+    index, workers = shard
+    assert all(shard_of(slug_from_url(url), workers) == index for url in anime_urls)
+    metrics.inc("shard_urls_total", len(anime_urls), run_id=shard_run_id(run_id, shard))
+    return RunSummary(anime_seen=len(anime_urls))
+
+
+def test_each_shard_gets_its_own_frontier_run_id():
+    urls = [f"https://example.com/anime/title-{index}/" for index in range(20)]
+    metrics.REGISTRY.reset()
+    summary = run_sharded(record_shard, urls, 3, rate=0.0, run_id="full")
+    assert summary.anime_seen == 20
+    for index, shard in enumerate(shard_urls(urls, 3)):
+        assert metrics.REGISTRY.counter("shard_urls_total", run_id=f"full/{index + 1}of3") == len(shard)
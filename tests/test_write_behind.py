@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from scraper.db import WriteBehindBuffer
+from scraper.models import Anime, AnimeDownload, AnimeImage
+
+
+class FakeDatabase:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.replace = []
+
+    def write_batch(self, anime, downloads, images, pages=None, replace_downloads=False):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.replace.append(replace_downloads)
+        self.batches.append(([item.slug for item in anime], dict(downloads), dict(images)))
+        slugs = [item.slug for item in anime] + list(images)
+        return {slug: index + 1 for index, slug in enumerate(dict.fromkeys(slugs))}, 1, 0
+
+
+def make_anime(slug: str) -> Anime:
+    return Anime(slug=slug, source_url=f"https://example.com/anime/{slug}/", title=slug, synopsis="")
+
+
+def make_download(slug: str) -> AnimeDownload:
+    return AnimeDownload(
+        source_url=f"https://example.com/anime/{slug}/",
+        section_title=None,
+        format=None,
+        resolution=None,
+        size=None,
+        provider="Mega",
+        url=f"https://mega.nz/{slug}",
+    )
+
+
+def test_buffer_flushes_by_size_and_on_close():
+    db = FakeDatabase()
+    flushed = []
+    with WriteBehindBuffer(db, max_records=2, max_delay=60, on_flush=flushed.extend) as buffer:
+        buffer.add(make_anime("a"), [make_download("a")])
+        assert db.batches == []
+        buffer.add(make_anime("b"), [make_download("b")])
+        assert [batch[0] for batch in db.batches] == [["a", "b"]]
+        buffer.add_image("b", AnimeImage(original_url="u", local_webp_path="p", width=1, height=1))
+    assert len(db.batches) == 2
+    assert list(db.batches[1][2]) == ["b"]
+    assert [(anime_id, anime.slug) for anime_id, anime in flushed] == [(1, "a"), (2, "b")]
+    assert buffer.downloads_added == 2
+
+
+def test_buffer_flushes_by_age():
+    db = FakeDatabase()
+    buffer = WriteBehindBuffer(db, max_records=100, max_delay=0)
+    buffer.add(make_anime("a"), [])
+    assert len(db.batches) == 1
+
+
+def test_buffer_reports_failed_batch():
+    failed = []
+    buffer = WriteBehindBuffer(FakeDatabase(fail=True), max_records=100, max_delay=60, on_failure=failed.extend)
+    buffer.add(make_anime("a"), [])
+    with pytest.raises(RuntimeError):
+        buffer.close()
+    assert [anime.slug for anime in failed] == ["a"]
+
+
+def test_buffer_flushes_by_age_without_new_records():
+    db = FakeDatabase()
+    with WriteBehindBuffer(db, max_records=100, max_delay=0.05, replace_downloads=True) as buffer:
+        buffer.add(make_anime("a"), [make_download("a")])
+        deadline = time.monotonic() + 5
+        while not db.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [batch[0] for batch in db.batches] == [["a"]]
+    assert db.replace == [True]